@@ -0,0 +1,19 @@
+import sys
+
+import pytest
+
+# Modules that keep a process-wide embedding cache open between calls
+_CACHE_MODULES = ("db.populate_embeddings", "embedding_service.main")
+
+
+@pytest.fixture(autouse=True)
+def embedding_cache_path(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    """Keep tests from reading or creating the user's ~/.cache embedding cache."""
+    path = tmp_path / "embeddings.sqlite3"
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(path))
+    yield path
+    # The next test's cache lives in its own tmp_path
+    for name in _CACHE_MODULES:
+        module = sys.modules.get(name)
+        if module is not None:
+            module.embedding_cache.close()
@@ -74,6 +74,13 @@ CREATE TABLE IF NOT EXISTS photos (
     embedding vector(384) -- populated from the caption
 );
 
+-- Caption JSONL files already loaded into photos, for incremental reloads
+CREATE TABLE IF NOT EXISTS photo_source_files (
+    filename TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
 -- TODO evaluate the necessity of these
 CREATE INDEX idx_trips_route ON trips USING GIST (route);
 CREATE INDEX idx_waypoints_loc_public ON waypoints USING GIST (location_public);
@@ -1,8 +1,11 @@
 import os
 
+import numpy as np
 import psycopg2
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+from lib.embedding_cache import LazyCache
+from lib.embedding_model import MODEL_NAME, get_model
+from psycopg2.extras import execute_values
 
 """
 Populate embeddings on waypoints and photos from text fields already stored in the DB.
@@ -14,11 +17,17 @@ Populate embeddings on waypoints and photos from text fields already stored in t
 # --- Configuration ---
 load_dotenv()
 DB_CONFIG = os.getenv("DATABASE_CONFIG")
+# Texts per model.encode call, and rows written back per commit (so a crash
+# part-way through a reload keeps the chunks already committed)
+ENCODE_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+COMMIT_EVERY = int(os.getenv("EMBEDDING_COMMIT_EVERY", "1024"))
 
-# Load the free model (downloads automatically on first run)
-# This model outputs 384-dimensional vectors
-print("Loading model (this may take a moment first time)...")
-model = SentenceTransformer("BAAI/bge-small-en-v1.5")
+# The free model (downloads automatically on first run), outputting 384-dimensional
+# vectors. Loaded on the first encode, so runs with nothing new to embed skip it.
+model = get_model(MODEL_NAME)
+# Embeddings survive reload-db.sh here, so only new or edited text is encoded.
+# Opened on first use, like the model.
+embedding_cache = LazyCache(model.cache_key)
 
 
 def strip_nul(s: str | None) -> str | None:
@@ -34,65 +43,42 @@ def get_embedding(text: str) -> list[float]:
     return model.encode(text).tolist()
 
 
-def populate_waypoint_embeddings() -> None:
-    """Populate embeddings on waypoints from their descriptions."""
-    try:
-        conn = psycopg2.connect(DB_CONFIG)
-        cur = conn.cursor()
-    except Exception as e:
-        print(f"CRITICAL: Could not connect to database. {e}")
-        return
+def get_embeddings(texts: list[str], batch_size: int = ENCODE_BATCH_SIZE) -> np.ndarray:
+    """get_embedding for many texts at once; one row per text. Uses the embedding cache if enabled."""
 
-    cur.execute(
-        """
-        SELECT id, description FROM waypoints
-        WHERE description IS NOT NULL AND TRIM(description) != '' AND embedding IS NULL;
-        """
-    )
-    rows = cur.fetchall()
+    def encode(batch: list[str]) -> np.ndarray:
+        return model.encode(
+            [text.replace("\n", " ") for text in batch],
+            batch_size=batch_size,
+            convert_to_numpy=True,
+        )
 
-    if not rows:
-        print("No waypoints with description and missing embedding. Nothing to do.")
-        cur.close()
-        conn.close()
-        return
+    return embedding_cache.encode(texts, encode)
 
-    print(
-        f"Processing {len(rows)} waypoint(s) with description and missing embedding..."
-    )
 
-    try:
-        for waypoint_id, description in rows:
-            description_clean = strip_nul(description)
-            if not description_clean or not description_clean.strip():
-                continue
-
-            embedding_vector = get_embedding(description_clean)
-
-            cur.execute(
-                """
-                UPDATE waypoints
-                SET embedding = %s::vector
-                WHERE id = %s;
-                """,
-                (embedding_vector, waypoint_id),
-            )
-
-        conn.commit()
-        print("\nSUCCESS: Waypoint embeddings populated and committed.")
+def embedding_chunks(
+    rows: list[tuple[int, str | None]], chunk_size: int
+) -> list[list[tuple[int, str]]]:
+    """
+    Clean (id, text) rows, drop empty texts, and split into chunks ordered by
+    text length, so each encode batch pads to similar lengths.
+    """
+    cleaned = []
+    for row_id, text in rows:
+        text = strip_nul(text)
+        if text and text.strip():
+            cleaned.append((row_id, text))
+    cleaned.sort(key=lambda row: len(row[1]))
+    return [cleaned[i : i + chunk_size] for i in range(0, len(cleaned), chunk_size)]
 
-    except Exception as e:
-        conn.rollback()
-        print("\nTRANSACTION ROLLED BACK (waypoints).")
-        raise e
 
-    finally:
-        cur.close()
-        conn.close()
+def vector_literal(vector: np.ndarray) -> str:
+    """pgvector text format, e.g. '[0.1,-0.2]'."""
+    return "[" + ",".join(map(repr, vector.tolist())) + "]"
 
 
-def populate_photo_embeddings() -> None:
-    """Populate embeddings on photos from their captions."""
+def _populate_embeddings(table: str, text_column: str) -> None:
+    """Embed text_column into embedding for rows of table that don't have one yet."""
     try:
         conn = psycopg2.connect(DB_CONFIG)
         cur = conn.cursor()
@@ -101,44 +87,46 @@ def populate_photo_embeddings() -> None:
         return
 
     cur.execute(
-        """
-        SELECT id, caption FROM photos
-        WHERE caption IS NOT NULL AND TRIM(caption) != '' AND embedding IS NULL;
+        f"""
+        SELECT id, {text_column} FROM {table}
+        WHERE {text_column} IS NOT NULL AND TRIM({text_column}) != '' AND embedding IS NULL;
         """
     )
     rows = cur.fetchall()
 
     if not rows:
-        print("No photos with caption and missing embedding. Nothing to do.")
+        print(f"No {table} with {text_column} and missing embedding. Nothing to do.")
         cur.close()
         conn.close()
         return
 
-    print(f"Processing {len(rows)} photo(s) with caption and missing embedding...")
+    print(f"Processing {len(rows)} {table} row(s) with {text_column} and missing embedding...")
 
+    done = 0
     try:
-        for photo_id, caption in rows:
-            caption_clean = strip_nul(caption)
-            if not caption_clean or not caption_clean.strip():
-                continue
-
-            embedding_vector = get_embedding(caption_clean)
-
-            cur.execute(
-                """
-                UPDATE photos
-                SET embedding = %s::vector
-                WHERE id = %s;
+        for chunk in embedding_chunks(rows, COMMIT_EVERY):
+            vectors = get_embeddings([text for _, text in chunk])
+            execute_values(
+                cur,
+                f"""
+                UPDATE {table} AS t
+                SET embedding = v.embedding
+                FROM (VALUES %s) AS v (id, embedding)
+                WHERE t.id = v.id;
                 """,
-                (embedding_vector, photo_id),
+                [(row_id, vector_literal(vector)) for (row_id, _), vector in zip(chunk, vectors)],
+                template="(%s, %s::vector)",
+                page_size=len(chunk),
             )
+            conn.commit()
+            done += len(chunk)
+            print(f"  {done}/{len(rows)} embedded")
 
-        conn.commit()
-        print("\nSUCCESS: Photo embeddings populated and committed.")
+        print(f"\nSUCCESS: {table.capitalize()} embeddings populated and committed.")
 
     except Exception as e:
         conn.rollback()
-        print("\nTRANSACTION ROLLED BACK (photos).")
+        print(f"\nTRANSACTION ROLLED BACK ({table}); {done} row(s) were already committed.")
         raise e
 
     finally:
@@ -146,6 +134,16 @@ def populate_photo_embeddings() -> None:
         conn.close()
 
 
+def populate_waypoint_embeddings() -> None:
+    """Populate embeddings on waypoints from their descriptions."""
+    _populate_embeddings("waypoints", "description")
+
+
+def populate_photo_embeddings() -> None:
+    """Populate embeddings on photos from their captions."""
+    _populate_embeddings("photos", "caption")
+
+
 if __name__ == "__main__":
     # Run both waypoint and photo embedding population.
     populate_waypoint_embeddings()
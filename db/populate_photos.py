@@ -1,23 +1,77 @@
+import hashlib
 import json
+import math
 import os
 import sys
-from datetime import datetime, timezone
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
+import numpy as np
 import psycopg2
 import psycopg2.extensions
 from dotenv import load_dotenv
-from timezonefinder import TimezoneFinder
-from zoneinfo import ZoneInfo
+from lib.elevation import ElevationProvider
+from lib.gps_utils import haversine_many
+from lib.timezones import TimezoneResolver, zone_info
+from psycopg2.extras import execute_values
+from sklearn.neighbors import BallTree
 
 # EXIF-style timestamp: "2024:07:27 07:38:52" (local time at photo location)
 PHOTO_TIMESTAMP_FMT = "%Y:%m:%d %H:%M:%S"
 # Filename timestamp e.g. "2024-08-04 17.02.35.jpg"
 PHOTO_FILENAME_TIMESTAMP_FMT = "%Y-%m-%d %H.%M.%S"
 
-# Global TimezoneFinder instance reused for all photos to avoid per-photo initialization cost.
-_timezone_finder = TimezoneFinder()
+# Photos per multi-row INSERT (override with PHOTOS_INSERT_BATCH_SIZE)
+PHOTO_INSERT_BATCH_SIZE = 1000
+
+# Single insert path for located and unlocated photos: PostGIS functions are
+# strict, so a NULL lon/lat yields a NULL location.
+_INSERT_PHOTOS_SQL = """
+    INSERT INTO photos (waypoint_id, filename, caption, time_taken, time_taken_local, time_taken_local_tz, location, location_metadata)
+    VALUES %s
+"""
+# Incremental mode: insert new photos, update changed ones, leave identical rows
+# untouched. The embedding is only cleared (for populate_embeddings to redo) when
+# the caption changed, and location_public only when the location moved (it is
+# recomputed by populate_public_locations). RETURNING reports which rows were new.
+_UPSERT_PHOTOS_SQL = """
+    INSERT INTO photos (waypoint_id, filename, caption, time_taken, time_taken_local, time_taken_local_tz, location, location_metadata)
+    VALUES %s
+    ON CONFLICT (filename) DO UPDATE SET
+        waypoint_id = EXCLUDED.waypoint_id,
+        caption = EXCLUDED.caption,
+        time_taken = EXCLUDED.time_taken,
+        time_taken_local = EXCLUDED.time_taken_local,
+        time_taken_local_tz = EXCLUDED.time_taken_local_tz,
+        location = EXCLUDED.location,
+        location_metadata = EXCLUDED.location_metadata,
+        embedding = CASE
+            WHEN photos.caption IS DISTINCT FROM EXCLUDED.caption THEN NULL
+            ELSE photos.embedding
+        END,
+        location_public = CASE
+            WHEN photos.location::text IS DISTINCT FROM EXCLUDED.location::text THEN NULL
+            ELSE photos.location_public
+        END
+    WHERE (
+        photos.waypoint_id, photos.caption, photos.time_taken, photos.time_taken_local,
+        photos.time_taken_local_tz, photos.location::text, photos.location_metadata
+    ) IS DISTINCT FROM (
+        EXCLUDED.waypoint_id, EXCLUDED.caption, EXCLUDED.time_taken, EXCLUDED.time_taken_local,
+        EXCLUDED.time_taken_local_tz, EXCLUDED.location::text, EXCLUDED.location_metadata
+    )
+    RETURNING (xmax = 0) AS inserted
+"""
+_PHOTO_ROW_TEMPLATE = (
+    "(%s, %s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s::jsonb)"
+)
+
+# Shared for all photos: caches answers per ~1 km grid cell, exact lookups near timezone borders
+_timezone_resolver = TimezoneResolver()
+# SRTM elevations for photos without an EXIF altitude (tiles shared with populate_waypoints' cache)
+_elevation_provider = ElevationProvider()
 
 
 def _timestamp_str_from_filename(filename: str | None) -> str | None:
@@ -35,6 +89,24 @@ def _timestamp_str_from_filename(filename: str | None) -> str | None:
         return None
 
 
+def _localize_photo_time(
+    local_ts_str: str | None, tz_name: str | None
+) -> tuple[datetime | None, datetime | None, str | None]:
+    """_parse_photo_time with the timezone already resolved."""
+    if not local_ts_str or not tz_name:
+        return (None, None, None)
+    try:
+        dt_naive = datetime.strptime(local_ts_str.strip(), PHOTO_TIMESTAMP_FMT)
+    except ValueError:
+        return (None, None, None)
+    tz = zone_info(tz_name)
+    if tz is None:
+        return (None, None, None)
+    utc_dt = dt_naive.replace(tzinfo=tz).astimezone(timezone.utc)
+    assert utc_dt.tzinfo is timezone.utc, "must return UTC timezone-aware datetime"
+    return (utc_dt, dt_naive, tz_name)
+
+
 def _parse_photo_time(
     local_ts_str: str | None, lat: float | None, lon: float | None
 ) -> tuple[datetime | None, datetime | None, str | None]:
@@ -49,20 +121,255 @@ def _parse_photo_time(
     """
     if not local_ts_str or lat is None or lon is None:
         return (None, None, None)
-    try:
-        dt_naive = datetime.strptime(local_ts_str.strip(), PHOTO_TIMESTAMP_FMT)
-    except ValueError:
-        return (None, None, None)
-    tz_name = _timezone_finder.timezone_at(lat=lat, lng=lon)
-    if not tz_name:
-        return (None, None, None)
-    try:
-        tz = ZoneInfo(tz_name)
-    except Exception:
-        return (None, None, None)
-    utc_dt = dt_naive.replace(tzinfo=tz).astimezone(timezone.utc)
-    assert utc_dt.tzinfo is timezone.utc, "must return UTC timezone-aware datetime"
-    return (utc_dt, dt_naive, tz_name)
+    return _localize_photo_time(local_ts_str, _timezone_resolver.timezone_at(lat, lon))
+
+
+EARTH_RADIUS_KM = 6371
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NO_END = np.iinfo(np.int64).max
+
+
+def _micros(t: datetime) -> int:
+    """Exact microseconds since the epoch, so comparisons match datetime comparisons."""
+    return (t - _EPOCH) // timedelta(microseconds=1)
+
+
+def _effective_windows(
+    windows: list[tuple[int, datetime | None, datetime | None]],
+) -> list[tuple[int, int | None, int]]:
+    """
+    (waypoint_id, start, end) in epoch microseconds, with the end of an open-ended
+    window (the last waypoint of a trip) filled in from the next window's start,
+    or _NO_END if there is none. `windows` must be ordered by start_time NULLS LAST.
+    """
+    result = []
+    for i, (wp_id, start, end) in enumerate(windows):
+        if end is None:
+            end = windows[i + 1][1] if i + 1 < len(windows) else None
+        result.append(
+            (
+                wp_id,
+                _micros(start) if start is not None else None,
+                _micros(end) if end is not None else _NO_END,
+            )
+        )
+    return result
+
+
+class WaypointTimeIndex:
+    """
+    Assigns timestamps to waypoint time windows with binary search.
+
+    `windows` are (waypoint_id, start_time, end_time) rows ordered by start_time
+    NULLS LAST. A time belongs to the first window (in that order) with
+    start <= t < end. Windows without a start never match. A window without an
+    end (the last waypoint of a trip) runs until the next window's start, or
+    forever if there is none.
+    """
+
+    def __init__(self, windows: list[tuple[int, datetime | None, datetime | None]]) -> None:
+        ids, starts, ends = [], [], []
+        for wp_id, start, end in _effective_windows(windows):
+            if start is None:
+                continue
+            ids.append(wp_id)
+            starts.append(start)
+            ends.append(end)
+
+        self._ids = ids
+        self._starts = np.array(starts, dtype=np.int64)
+        # Running maximum of the ends: the first window that hasn't ended by t is
+        # the first position where this exceeds t.
+        self._max_ends = np.maximum.accumulate(np.array(ends, dtype=np.int64))
+
+    def assign_many(self, times: list[datetime | None]) -> list[int | None]:
+        """Waypoint ID for each time (None for None times or no matching window)."""
+        known = [i for i, t in enumerate(times) if t is not None]
+        result: list[int | None] = [None] * len(times)
+        if not known or not self._ids:
+            return result
+
+        ts = np.array([_micros(times[i]) for i in known], dtype=np.int64)
+        # Windows [0, started) have start <= t; first_open is the first window with end > t
+        started = np.searchsorted(self._starts, ts, side="right")
+        first_open = np.searchsorted(self._max_ends, ts, side="right")
+        for i, s, j in zip(known, started.tolist(), first_open.tolist()):
+            if j < s:
+                result[i] = self._ids[j]
+        return result
+
+    def assign(self, t: datetime | None) -> int | None:
+        return self.assign_many([t])[0]
+
+
+class MatchRules(NamedTuple):
+    """Tunables for HybridWaypointMatcher."""
+
+    # A waypoint further than this from the photo is never picked by location
+    max_distance_km: float = 50.0
+    # How far outside a waypoint's time window a photo may fall and still match it
+    # by location (travel days, camera clocks in the wrong timezone)
+    time_slack: timedelta = timedelta(days=1)
+    # Nearest waypoints considered per photo
+    candidates: int = 8
+
+
+class HybridWaypointMatcher:
+    """
+    Picks a waypoint per photo from both its time and its location.
+
+    A photo's plain time match (WaypointTimeIndex) is kept whenever that waypoint
+    is within rules.max_distance_km of the photo. Otherwise the nearest waypoints
+    (ball tree, haversine metric) are candidates if within rules.max_distance_km
+    and within rules.time_slack of their time window; the candidate closest in
+    time wins, then the closest in distance, so a photo taken just outside its
+    waypoint's window (or with a timezone-shifted clock) still lands at the
+    waypoint where it was taken. Photos with no such candidate keep the plain
+    time match; photos without a time take the nearest waypoint within range.
+
+    `waypoints` are (id, start_time, end_time, lat, lon) rows ordered by
+    start_time NULLS LAST.
+    """
+
+    def __init__(
+        self,
+        waypoints: list[tuple[int, datetime | None, datetime | None, float | None, float | None]],
+        rules: MatchRules = MatchRules(),
+    ) -> None:
+        self.rules = rules
+        self.time_index = WaypointTimeIndex([w[:3] for w in waypoints])
+
+        windows = _effective_windows([w[:3] for w in waypoints])
+        located = [i for i, w in enumerate(waypoints) if w[3] is not None and w[4] is not None]
+        self._ids = [waypoints[i][0] for i in located]
+        self._coords = {waypoints[i][0]: waypoints[i][3:5] for i in located}
+        # A window without a start can only be matched by location, never by time
+        self._starts = np.array(
+            [windows[i][1] if windows[i][1] is not None else _NO_END for i in located],
+            dtype=np.int64,
+        )
+        self._ends = np.array([windows[i][2] for i in located], dtype=np.int64)
+        self._tree = (
+            BallTree(np.radians([waypoints[i][3:5] for i in located]), metric="haversine")
+            if located
+            else None
+        )
+
+    def match_many(
+        self,
+        times: list[datetime | None],
+        lats: list[float | None],
+        lons: list[float | None],
+    ) -> tuple[list[int | None], list[str]]:
+        """
+        Waypoint ID per photo, plus how it was matched: "time+location",
+        "location", "time" or "none".
+        """
+        ids = self.time_index.assign_many(times)
+        methods = ["time" if wp_id is not None else "none" for wp_id in ids]
+
+        located = [i for i in range(len(times)) if lats[i] is not None and lons[i] is not None]
+        if not located or self._tree is None:
+            return ids, methods
+
+        k = min(self.rules.candidates, len(self._ids))
+        points = np.radians([[lats[i], lons[i]] for i in located])
+        dist, cand = self._tree.query(points, k=k)
+        dist_km = dist * EARTH_RADIUS_KM
+        in_range = dist_km <= self.rules.max_distance_km
+
+        timed = np.array([times[i] is not None for i in located])
+        ts = np.array(
+            [_micros(times[i]) if times[i] is not None else 0 for i in located], dtype=np.int64
+        )[:, None]
+        starts, ends = self._starts[cand], self._ends[cand]
+        # How far (in microseconds) the photo falls outside each candidate's window
+        gap = np.maximum(np.maximum(starts - ts, ts - ends + 1), 0)
+        slack = self.rules.time_slack // timedelta(microseconds=1)
+        valid = in_range & (gap <= slack)
+
+        # An exact time match stands unless it is too far from where the photo was taken
+        time_matched = [row for row, i in enumerate(located) if ids[i] in self._coords]
+        keep_time = np.zeros(len(located), dtype=bool)
+        if time_matched:
+            coords = np.array([self._coords[ids[located[row]]] for row in time_matched])
+            keep_time[time_matched] = (
+                haversine_many(
+                    [lats[located[row]] for row in time_matched],
+                    [lons[located[row]] for row in time_matched],
+                    coords[:, 0],
+                    coords[:, 1],
+                )
+                <= self.rules.max_distance_km
+            )
+
+        # Otherwise closest in time first, then closest in distance
+        gap_rank = np.where(valid, gap.astype(np.float64), np.inf)
+        best_gap = gap_rank.min(axis=1)
+        dist_rank = np.where(gap_rank == best_gap[:, None], dist_km, np.inf)
+        best = np.argmin(dist_rank, axis=1)
+
+        for row, i in enumerate(located):
+            if timed[row]:
+                if keep_time[row]:
+                    methods[i] = "time+location"
+                elif np.isfinite(best_gap[row]):
+                    ids[i] = self._ids[cand[row, best[row]]]
+                    methods[i] = "time+location"
+            elif in_range[row, 0]:
+                ids[i] = self._ids[cand[row, 0]]
+                methods[i] = "location"
+        return ids, methods
+
+
+def _fill_missing_altitudes(locations: list[dict[str, Any]]) -> int:
+    """
+    Add an SRTM "altitude" (with "altitude_source": "srtm") to locations that have
+    lat/lon but no EXIF altitude. Looks them up in one batch. Returns the number filled.
+    """
+    todo = [
+        loc
+        for loc in locations
+        if loc.get("altitude") is None
+        and loc.get("latitude") is not None
+        and loc.get("longitude") is not None
+    ]
+    if not todo:
+        return 0
+    elevations = _elevation_provider.elevations(
+        [loc["latitude"] for loc in todo], [loc["longitude"] for loc in todo]
+    )
+    filled = 0
+    for loc, ele in zip(todo, elevations.tolist()):
+        if not math.isnan(ele):
+            loc["altitude"] = round(ele, 2)
+            loc["altitude_source"] = "srtm"
+            filled += 1
+    return filled
+
+
+def _record_photo_times(
+    records: list[dict[str, Any]],
+) -> list[tuple[datetime | None, datetime | None, str | None]]:
+    """_parse_photo_time for each JSONL record, resolving all timezones in one batch."""
+    # Timestamp is in local time at photo location; resolve timezone from lat/lon.
+    # Fall back to parsing filename (e.g. "2024-08-04 17.02.35.jpg") when missing.
+    ts_strs = [
+        data.get("timestamp") or _timestamp_str_from_filename(data.get("filename"))
+        for data in records
+    ]
+    lats, lons = _record_coordinates(records)
+    located = [
+        i
+        for i, (ts, lat, lon) in enumerate(zip(ts_strs, lats, lons))
+        if ts and lat is not None and lon is not None
+    ]
+    tz_names: list[str | None] = [None] * len(records)
+    resolved = _timezone_resolver.timezones([lats[i] for i in located], [lons[i] for i in located])
+    for i, tz_name in zip(located, resolved):
+        tz_names[i] = tz_name
+    return [_localize_photo_time(ts, tz_name) for ts, tz_name in zip(ts_strs, tz_names)]
 
 
 def connect_to_database(
@@ -82,6 +389,41 @@ def connect_to_database(
         return None
 
 
+def _load_waypoints(
+    cur: psycopg2.extensions.cursor,
+) -> list[tuple[int, datetime | None, datetime | None, float | None, float | None]]:
+    """(id, start_time, end_time, lat, lon) for every waypoint, in HybridWaypointMatcher order."""
+    cur.execute(
+        """
+        SELECT id, start_time, end_time, ST_Y(location::geometry), ST_X(location::geometry)
+        FROM waypoints ORDER BY start_time NULLS LAST
+        """
+    )
+    waypoints = cur.fetchall()
+    if not waypoints:
+        print(
+            "ERROR: No waypoints found. Populate waypoints before running photos ETL.",
+            file=sys.stderr,
+        )
+        raise RuntimeError("waypoints table is empty")
+    return waypoints
+
+
+def _record_coordinates(
+    records: list[dict[str, Any]],
+) -> tuple[list[float | None], list[float | None]]:
+    """(lats, lons) of JSONL records; None where the location is missing."""
+    locations = [data.get("location") or {} for data in records]
+    return (
+        [loc.get("latitude") for loc in locations],
+        [loc.get("longitude") for loc in locations],
+    )
+
+
+def _format_counts(counts: Counter[str]) -> str:
+    return ", ".join(f"{method}={n}" for method, n in sorted(counts.items())) or "none"
+
+
 def _latest_jsonl_photos_files(paths: list[Path]) -> list[Path]:
     """
     From jsonl paths like captions_2024-07_2026-02-25.jsonl, keep only the latest
@@ -105,14 +447,119 @@ def _latest_jsonl_photos_files(paths: list[Path]) -> list[Path]:
     return sorted(latest_per_ym.values(), key=lambda p: p.name)
 
 
+def _photo_row(
+    data: dict[str, Any],
+    times: tuple[datetime | None, datetime | None, str | None],
+    waypoint_id: int | None,
+) -> tuple:
+    """One JSONL record as a row for _INSERT_PHOTOS_SQL / _PHOTO_ROW_TEMPLATE."""
+    time_taken, time_taken_local, time_taken_local_tz = times
+    location = data.get("location") or {}
+    # location_metadata stores the full "location" object from the input
+    location_metadata = json.dumps(location) if location else None
+    return (
+        waypoint_id,
+        data.get("filename"),
+        data.get("caption"),
+        time_taken,
+        time_taken_local,
+        time_taken_local_tz,
+        location.get("longitude"),
+        location.get("latitude"),
+        location_metadata,
+    )
+
+
+def _insert_photo_rows(
+    cur: psycopg2.extensions.cursor, rows: list[tuple], batch_size: int
+) -> int:
+    """Multi-row INSERT of _photo_row rows, batch_size rows per statement. Returns the row count."""
+    if rows:
+        execute_values(
+            cur, _INSERT_PHOTOS_SQL, rows, template=_PHOTO_ROW_TEMPLATE, page_size=batch_size
+        )
+    return len(rows)
+
+
+def _upsert_photo_rows(
+    cur: psycopg2.extensions.cursor, rows: list[tuple], batch_size: int
+) -> Counter[str]:
+    """Upsert _photo_row rows. Returns counts of "inserted", "updated" and "unchanged" rows."""
+    counts: Counter[str] = Counter()
+    if not rows:
+        return counts
+    # Later rows for the same filename win, and one statement can't touch a row twice
+    rows = list({row[1]: row for row in rows}.values())
+    returned = execute_values(
+        cur,
+        _UPSERT_PHOTOS_SQL,
+        rows,
+        template=_PHOTO_ROW_TEMPLATE,
+        page_size=batch_size,
+        fetch=True,
+    )
+    counts["inserted"] = sum(1 for (inserted,) in returned if inserted)
+    counts["updated"] = len(returned) - counts["inserted"]
+    counts["unchanged"] = len(rows) - len(returned)
+    return counts
+
+
+def file_fingerprint(path: str | Path) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _loaded_fingerprints(cur: psycopg2.extensions.cursor) -> dict[str, str]:
+    """{file name: fingerprint} of JSONL files already loaded."""
+    # Also in init.sql; created here too for databases initialized before it existed
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS photo_source_files (
+            filename TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+    cur.execute("SELECT filename, sha256 FROM photo_source_files")
+    return dict(cur.fetchall())
+
+
+def _record_fingerprints(cur: psycopg2.extensions.cursor, fingerprints: dict[str, str]) -> None:
+    if not fingerprints:
+        return
+    execute_values(
+        cur,
+        """
+        INSERT INTO photo_source_files (filename, sha256) VALUES %s
+        ON CONFLICT (filename) DO UPDATE SET sha256 = EXCLUDED.sha256, loaded_at = now()
+        """,
+        list(fingerprints.items()),
+    )
+
+
 def run_photos_etl(
-    conn: psycopg2.extensions.connection, photos_dir: str | Path
+    conn: psycopg2.extensions.connection,
+    photos_dir: str | Path,
+    batch_size: int = PHOTO_INSERT_BATCH_SIZE,
+    incremental: bool = False,
 ) -> None:
     """
     Populate the photos table from JSONL files in photos_dir.
     Each line is a JSON object with filename, caption, timestamp, and location.
     Only the most recent file per year-month is processed (e.g. captions_2024-07_2026-02-28.jsonl
     is used and captions_2024-07_2026-02-25.jsonl is ignored).
+    Rows are inserted batch_size at a time.
+
+    By default the table is assumed empty and photo_source_files is left alone.
+    With incremental=True, files whose contents an earlier incremental run
+    already loaded are skipped and the rest are upserted by filename; a photo's
+    embedding is only cleared if its caption changed.
+    Photos that disappear from a file are not deleted.
     """
     photos_dir = Path(photos_dir)
     if not photos_dir.is_dir():
@@ -125,119 +572,114 @@ def run_photos_etl(
         )
         return
 
-    # -------------------------------------------------------------------------
-    # TODO: Waypoint timestamps (start_time / end_time) are not trustworthy.
-    #       Prefer exploring assignment by location (e.g. nearest waypoint by
-    #       distance, or point-in-polygon if we had regions) instead of time
-    #       windows. This time-based match is a stopgap.
-    # -------------------------------------------------------------------------
+    # Waypoint timestamps (start_time / end_time) are not trustworthy on their
+    # own, so photos are matched on both time and location. Tune MatchRules and
+    # re-run with `python db/populate_photos.py --rematch`.
     cur = conn.cursor()
-    cur.execute(
-        "SELECT id, start_time, end_time FROM waypoints ORDER BY start_time NULLS LAST"
-    )
-    waypoint_windows = cur.fetchall()  # list of (id, start_time, end_time)
-    if not waypoint_windows:
-        print(
-            "ERROR: No waypoints found. Populate waypoints before running photos ETL.",
-            file=sys.stderr,
-        )
-        raise RuntimeError("waypoints table is empty")
+    matcher = HybridWaypointMatcher(_load_waypoints(cur))
+    match_counts: Counter[str] = Counter()
+    # Only incremental runs read or write photo_source_files
+    loaded = _loaded_fingerprints(cur) if incremental else {}
+    fingerprints: dict[str, str] = {}
 
-    def waypoint_id_for_time(t: datetime | None) -> int | None:
-        if t is None:
-            return None
-        for i, (wp_id, start, end) in enumerate(waypoint_windows):
-            if start is None:
-                continue
-            if t < start:
-                continue
-            if end is not None:
-                if t < end:
-                    return wp_id
-                continue
-            # end is None (last waypoint of a trip): only match if no later waypoint has start <= t
-            next_start = (
-                waypoint_windows[i + 1][1] if i + 1 < len(waypoint_windows) else None
-            )
-            if next_start is None or t < next_start:
-                return wp_id
-        return None
+    def flush(rows: list[tuple]) -> Counter[str]:
+        if incremental:
+            return _upsert_photo_rows(cur, rows, batch_size)
+        return Counter(inserted=_insert_photo_rows(cur, rows, batch_size))
 
-    inserted_count = 0
+    row_counts: Counter[str] = Counter()
+    # Rows are buffered across files and sent batch_size at a time
+    pending: list[tuple] = []
     for path in sorted(jsonl_files):
+        if incremental:
+            fingerprint = file_fingerprint(path)
+            if loaded.get(path.name) == fingerprint:
+                print(f"Skipping {path} (unchanged since last load)")
+                continue
+            fingerprints[path.name] = fingerprint
+
         print(f"Processing {path}...")
+        records = []
         with open(path, "r") as f:
             for line in f:
                 line = line.strip()
                 if not line:
                     continue
                 try:
-                    data = json.loads(line)
+                    records.append(json.loads(line))
                 except json.JSONDecodeError as e:
                     print(f"Skipping invalid JSON in {path}: {e}")
                     continue
-                filename = data.get("filename")
-                caption = data.get("caption")
-                location = data.get("location") or {}
-                # location_metadata stores the full "location" object from the input
-                location_metadata = json.dumps(location) if location else None
-                lat = location.get("latitude")
-                lon = location.get("longitude")
-                # Only set geography point when we have valid lat/lon
-                if lat is not None and lon is not None:
-                    location_wkt = f"POINT({lon} {lat})"
-                else:
-                    location_wkt = None
-                # Timestamp is in local time at photo location; resolve timezone from lat/lon.
-                # Fall back to parsing filename (e.g. "2024-08-04 17.02.35.jpg") when missing.
-                ts_str = data.get("timestamp") or _timestamp_str_from_filename(filename)
-                time_taken, time_taken_local, time_taken_local_tz = _parse_photo_time(
-                    ts_str, lat, lon
-                )
-                waypoint_id = waypoint_id_for_time(time_taken)
-                if location_wkt:
-                    cur.execute(
-                        """
-                        INSERT INTO photos (waypoint_id, filename, caption, time_taken, time_taken_local, time_taken_local_tz, location, location_metadata, embedding)
-                        VALUES (%s, %s, %s, %s, %s, %s, ST_SetSRID(ST_GeomFromText(%s), 4326), %s::jsonb, %s)
-                    """,
-                        (
-                            waypoint_id,
-                            filename,
-                            caption,
-                            time_taken,
-                            time_taken_local,
-                            time_taken_local_tz,
-                            location_wkt,
-                            location_metadata,
-                            None,
-                        ),
-                    )
-                else:
-                    cur.execute(
-                        """
-                        INSERT INTO photos (waypoint_id, filename, caption, time_taken, time_taken_local, time_taken_local_tz, location, location_metadata, embedding)
-                        VALUES (%s, %s, %s, %s, %s, %s, NULL, %s::jsonb, %s)
-                    """,
-                        (
-                            waypoint_id,
-                            filename,
-                            caption,
-                            time_taken,
-                            time_taken_local,
-                            time_taken_local_tz,
-                            location_metadata,
-                            None,
-                        ),
-                    )
-                inserted_count += 1
-
-    if inserted_count == 0:
+
+        filled = _fill_missing_altitudes(
+            [data["location"] for data in records if data.get("location")]
+        )
+        if filled:
+            print(f"  Filled {filled} missing altitude(s) from SRTM")
+
+        photo_times = _record_photo_times(records)
+        waypoint_ids, methods = matcher.match_many(
+            [times[0] for times in photo_times],
+            *_record_coordinates(records),
+        )
+        match_counts.update(methods)
+
+        pending.extend(
+            _photo_row(data, times, waypoint_id)
+            for data, times, waypoint_id in zip(records, photo_times, waypoint_ids)
+        )
+        if len(pending) >= batch_size:
+            row_counts += flush(pending)
+            pending = []
+
+    row_counts += flush(pending)
+    if incremental:
+        _record_fingerprints(cur, fingerprints)
+    conn.commit()
+
+    if sum(row_counts.values()) == 0:
         print("No photo records to insert.")
         return
 
+    print(f"Loaded photo(s): {_format_counts(row_counts)}")
+    print(f"Waypoint matches: {_format_counts(match_counts)}")
+
+
+def rematch_photo_waypoints(
+    conn: psycopg2.extensions.connection, rules: MatchRules = MatchRules()
+) -> Counter[str]:
+    """
+    Re-run waypoint matching over every photo already in the database and update
+    photos.waypoint_id in batch. Returns the count per match method.
+    """
+    cur = conn.cursor()
+    matcher = HybridWaypointMatcher(_load_waypoints(cur), rules)
+    cur.execute(
+        "SELECT id, time_taken, ST_Y(location::geometry), ST_X(location::geometry) FROM photos"
+    )
+    photos = cur.fetchall()
+    if not photos:
+        print("No photos to match.")
+        return Counter()
+
+    waypoint_ids, methods = matcher.match_many(
+        [p[1] for p in photos], [p[2] for p in photos], [p[3] for p in photos]
+    )
+    execute_values(
+        cur,
+        """
+        UPDATE photos AS p SET waypoint_id = v.waypoint_id
+        FROM (VALUES %s) AS v (id, waypoint_id)
+        WHERE p.id = v.id
+        """,
+        [(p[0], wp_id) for p, wp_id in zip(photos, waypoint_ids)],
+        template="(%s, %s::integer)",
+        page_size=5000,
+    )
     conn.commit()
-    print(f"Inserted {inserted_count} photo(s).")
+    counts = Counter(methods)
+    print(f"Re-matched {len(photos)} photo(s): {_format_counts(counts)}")
+    return counts
 
 
 if __name__ == "__main__":
@@ -254,11 +696,22 @@ if __name__ == "__main__":
     if connection is None:
         sys.exit(1)
 
+    if "--rematch" in sys.argv[1:]:
+        # Only re-run waypoint matching for photos already loaded
+        try:
+            rematch_photo_waypoints(connection)
+        finally:
+            connection.close()
+        sys.exit(0)
+
     # Populate photos with descriptions
     photos_dir = os.path.join(os.getenv("INTERIM_DATA_DIR"), "photos")
     print(f"Populating photos from {photos_dir}...")
     try:
-        run_photos_etl(connection, photos_dir)
+        batch_size = int(os.getenv("PHOTOS_INSERT_BATCH_SIZE", PHOTO_INSERT_BATCH_SIZE))
+        run_photos_etl(
+            connection, photos_dir, batch_size, incremental="--incremental" in sys.argv[1:]
+        )
         print("Success!")
     except Exception:
         connection.close()
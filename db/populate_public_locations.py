@@ -13,21 +13,14 @@ from typing import Any
 import psycopg2
 import psycopg2.extensions
 from dotenv import load_dotenv
-from lib.gps_utils import (compute_obfuscated_location, haversine_distance,
-                           load_sensitive_zones)
-
-
-def _matching_zone(lat: float, lon: float, zones: list[dict[str, Any]]) -> dict[str, Any] | None:
-    for zone in zones:
-        if haversine_distance(lat, lon, zone["lat"], zone["lon"]) <= zone["radius"]:
-            return zone
-    return None
+from lib.gps_utils import SensitiveZoneIndex, load_sensitive_zones
 
 
 def run(
     conn: psycopg2.extensions.connection, sensitive_zones: list[dict[str, Any]]
 ) -> None:
     cur = conn.cursor()
+    zone_index = SensitiveZoneIndex(sensitive_zones)
 
     # --- Waypoints ---
     cur.execute(
@@ -35,12 +28,16 @@ def run(
         "FROM waypoints WHERE location IS NOT NULL"
     )
     waypoints = cur.fetchall()
+    new_lats, new_lons, zone_ids = zone_index.obfuscate_many(
+        [row[2] for row in waypoints], [row[3] for row in waypoints]
+    )
 
     updated_wp = 0
-    for wp_id, name, lat, lon in waypoints:
-        zone = _matching_zone(lat, lon, sensitive_zones)
-        if zone:
-            new_lat, new_lon = compute_obfuscated_location(zone, lat, lon)
+    for (wp_id, name, _, _), new_lat, new_lon, zone_id in zip(
+        waypoints, new_lats.tolist(), new_lons.tolist(), zone_ids.tolist()
+    ):
+        if zone_id >= 0:
+            zone = zone_index.zones[zone_id]
             cur.execute(
                 "UPDATE waypoints SET location_public = ST_SetSRID(ST_MakePoint(%s, %s), 4326) WHERE id = %s",
                 (new_lon, new_lat, wp_id),
@@ -61,12 +58,15 @@ def run(
         "FROM photos WHERE location IS NOT NULL"
     )
     photos = cur.fetchall()
+    new_lats, new_lons, zone_ids = zone_index.obfuscate_many(
+        [row[1] for row in photos], [row[2] for row in photos]
+    )
 
     obfuscated_photos = 0
-    for photo_id, lat, lon in photos:
-        zone = _matching_zone(lat, lon, sensitive_zones)
-        if zone:
-            new_lat, new_lon = compute_obfuscated_location(zone, lat, lon)
+    for (photo_id, _, _), new_lat, new_lon, zone_id in zip(
+        photos, new_lats.tolist(), new_lons.tolist(), zone_ids.tolist()
+    ):
+        if zone_id >= 0:
             cur.execute(
                 "UPDATE photos SET location_public = ST_SetSRID(ST_MakePoint(%s, %s), 4326) WHERE id = %s",
                 (new_lon, new_lat, photo_id),
@@ -1,31 +1,32 @@
-import contextlib
+import io
 import json
+import math
 import os
 import re
 import sys
-import xml.etree.ElementTree as ET
 from collections import defaultdict
 from pathlib import Path
 from typing import Any
 
 import psycopg2
 import psycopg2.extensions
-import srtm
 from dateutil import parser
 from dotenv import load_dotenv
+from lib.elevation import ElevationProvider
+from lib.gpx_reader import iter_gpx
 from psycopg2.extras import execute_values
 
-# Initialize elevation data (files will be cached in a local directory)
-elevation_data = srtm.get_data()
-
-NS = {"gpx": "http://www.topografix.com/GPX/1/1"}
+# SRTM elevation lookups (tiles are cached in a local directory and loaded once)
+elevation_provider = ElevationProvider()
 
 
 def _first_waypoint_time(path: Path) -> str:
     """Return the timestamp of the first waypoint in a GPX file (for sorting)."""
-    tree = ET.parse(path)
-    root = tree.getroot()
-    return root.find("gpx:wpt", NS).find("gpx:time", NS).text
+    # Waypoints precede tracks, so this stops reading long before the track points.
+    for kind, record in iter_gpx(path):
+        if kind == "wpt":
+            return record["time"]
+    raise ValueError(f"No waypoints found in {path}")
 
 
 def _slugify(name: str) -> str:
@@ -59,11 +60,6 @@ def connect_to_database(
         return None
 
 
-def get_text(elem: ET.Element, tag: str) -> str | None:
-    item = elem.find(tag, NS)
-    return item.text if item is not None else None
-
-
 # ---------------------------------------------------------------------------
 # Parsing: each source produces a list of trip dicts in a common format.
 #
@@ -88,37 +84,37 @@ def get_text(elem: ET.Element, tag: str) -> str | None:
 
 
 def parse_fp_gpx(path: Path) -> dict:
-    """Parse a FindPenguins GPX file into the common trip format."""
-    tree = ET.parse(path)
-    root = tree.getroot()
+    """Parse a FindPenguins GPX file into the common trip format.
 
-    trip_name = root.find("gpx:metadata", NS).find("gpx:name", NS).text
-
-    # Parse raw waypoints
+    Streams the file with iter_gpx rather than loading the whole document.
+    """
+    trip_name = None
     raw_wps = []
-    for wpt in root.findall("gpx:wpt", NS):
-        raw_wps.append(
-            {
-                "name": get_text(wpt, "gpx:name"),
-                "desc": get_text(wpt, "gpx:desc"),
-                "time": get_text(wpt, "gpx:time"),
-                "lat": float(wpt.get("lat")),
-                "lon": float(wpt.get("lon")),
-            }
-        )
-
-    # Parse tracks grouped by timestamp (FP groups all trkpts for a waypoint
+    # Tracks grouped by timestamp (FP groups all trkpts for a waypoint
     # under the destination waypoint's timestamp)
     grouped_tracks: dict[str, list[dict]] = defaultdict(list)
-    for pt in root.findall(".//gpx:trkpt", NS):
-        ts = get_text(pt, "gpx:time")
-        grouped_tracks[ts].append(
-            {
-                "lat": float(pt.get("lat")),
-                "lon": float(pt.get("lon")),
-                "time": ts,
-            }
-        )
+
+    for kind, record in iter_gpx(path):
+        if kind == "metadata":
+            trip_name = record["name"]
+        elif kind == "wpt":
+            raw_wps.append(
+                {
+                    "name": record["name"],
+                    "desc": record["desc"],
+                    "time": record["time"],
+                    "lat": record["lat"],
+                    "lon": record["lon"],
+                }
+            )
+        elif kind == "trkpt":
+            grouped_tracks[record["time"]].append(
+                {
+                    "lat": record["lat"],
+                    "lon": record["lon"],
+                    "time": record["time"],
+                }
+            )
 
     # Build common-format waypoints
     waypoints = []
@@ -236,12 +232,52 @@ def backfill_end_times(trips: list[dict]) -> None:
 # ---------------------------------------------------------------------------
 
 
+def _trip_dates(waypoints: list[dict]) -> tuple[str, str]:
+    start_date = waypoints[0]["start_time"]
+    end_date = waypoints[-1].get("end_time") or waypoints[-1]["start_time"]
+    return start_date, end_date
+
+
+def _track_source(trip: dict) -> str:
+    return "FindPenguins" if trip["source"] == "findpenguins" else "manual"
+
+
+def _tracks(trip: dict):
+    """Yield (index of destination waypoint, track points) for each track in a trip."""
+    for j, wp in enumerate(trip["waypoints"]):
+        track_points = wp.get("track_to_here")
+        if not track_points or j == 0:
+            continue
+        yield j, track_points
+
+
+def _track_wkt(track_points: list[dict]) -> str:
+    """LINESTRING WKT for a track; a single point becomes a zero-length line."""
+    if len(track_points) < 2:
+        p = track_points[0]
+        return f"LINESTRING({p['lon']} {p['lat']}, {p['lon']} {p['lat']})"
+    coords = ", ".join(f"{p['lon']} {p['lat']}" for p in track_points)
+    return f"LINESTRING({coords})"
+
+
+def _hydrate_elevation(track_points: list[dict]) -> None:
+    """Set p["ele"] on each track point from SRTM (None if unavailable), in one batch."""
+    elevations = elevation_provider.elevations(
+        [p["lat"] for p in track_points], [p["lon"] for p in track_points]
+    )
+    for p, ele in zip(track_points, elevations.tolist()):
+        p["ele"] = None if math.isnan(ele) else ele
+
+
 def insert_trip(cur: psycopg2.extensions.cursor, trip: dict) -> int:
-    """Insert a trip with its waypoints, tracks, and track_points. Returns trip_id."""
+    """Insert a trip with its waypoints, tracks, and track_points. Returns trip_id.
+
+    Issues a few statements per waypoint and track; see bulk_insert_trips for
+    loading many trips in a handful of round trips.
+    """
     waypoints = trip["waypoints"]
 
-    start_date = waypoints[0]["start_time"]
-    end_date = waypoints[-1].get("end_time") or waypoints[-1]["start_time"]
+    start_date, end_date = _trip_dates(waypoints)
 
     cur.execute(
         """
@@ -274,20 +310,9 @@ def insert_trip(cur: psycopg2.extensions.cursor, trip: dict) -> int:
         wp_ids.append(cur.fetchone()[0])
 
     # Insert tracks and track_points
-    track_source = "FindPenguins" if trip["source"] == "findpenguins" else "manual"
-    for j, wp in enumerate(waypoints):
-        track_points = wp.get("track_to_here")
-        if not track_points or j == 0:
-            continue
-
-        # Build LINESTRING
-        if len(track_points) < 2:
-            p = track_points[0]
-            wkt = f"LINESTRING({p['lon']} {p['lat']}, {p['lon']} {p['lat']})"
-        else:
-            coords = ", ".join(f"{p['lon']} {p['lat']}" for p in track_points)
-            wkt = f"LINESTRING({coords})"
-
+    track_source = _track_source(trip)
+    for j, track_points in _tracks(trip):
+        wp = waypoints[j]
         start_time = waypoints[j - 1]["start_time"]
         end_time = wp["start_time"]
 
@@ -298,19 +323,19 @@ def insert_trip(cur: psycopg2.extensions.cursor, trip: dict) -> int:
             VALUES (%s, %s, %s, %s, %s, %s, ST_GeomFromText(%s, 4326))
             RETURNING id
             """,
-            (trip_id, wp_ids[j - 1], wp_ids[j], track_source, start_time, end_time, wkt),
+            (
+                trip_id,
+                wp_ids[j - 1],
+                wp_ids[j],
+                track_source,
+                start_time,
+                end_time,
+                _track_wkt(track_points),
+            ),
         )
         track_id = cur.fetchone()[0]
 
-        # Hydrate elevation
-        for p in track_points:
-            try:
-                # Redirect stdout to devnull to silence the library's print statements
-                with contextlib.redirect_stdout(open(os.devnull, "w")):
-                    p["ele"] = elevation_data.get_elevation(p["lat"], p["lon"])
-            except Exception as e:
-                print(f"failed to load elevation: {e}")
-                p["ele"] = None
+        _hydrate_elevation(track_points)
 
         # Insert track points; use per-point time if available, else destination wp time
         fallback_time = wp["start_time"]
@@ -331,6 +356,179 @@ def insert_trip(cur: psycopg2.extensions.cursor, trip: dict) -> int:
     return trip_id
 
 
+# ---------------------------------------------------------------------------
+# Bulk insertion: COPY into temp staging tables, then set-based inserts
+# ---------------------------------------------------------------------------
+
+# Staging tables are keyed by position (trip_ord = index into the trips list,
+# wp_ord = index into that trip's waypoints). Trips, waypoints and tracks draw
+# their IDs from the real tables' sequences as rows are copied in, so IDs come
+# out in the same order insert_trip would have assigned them.
+_STAGING_DDL = """
+CREATE TEMP TABLE _stage_trips (
+    trip_ord INTEGER PRIMARY KEY,
+    id INTEGER NOT NULL DEFAULT nextval(pg_get_serial_sequence('trips', 'id')::regclass),
+    name TEXT, key TEXT, start_date DATE, end_date DATE, source TEXT
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE _stage_waypoints (
+    trip_ord INTEGER, wp_ord INTEGER,
+    id INTEGER NOT NULL DEFAULT nextval(pg_get_serial_sequence('waypoints', 'id')::regclass),
+    name TEXT, description TEXT, start_time TIMESTAMPTZ, end_time TIMESTAMPTZ,
+    lon DOUBLE PRECISION, lat DOUBLE PRECISION,
+    PRIMARY KEY (trip_ord, wp_ord)
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE _stage_tracks (
+    trip_ord INTEGER, wp_ord INTEGER, -- destination waypoint; the track starts at wp_ord - 1
+    id INTEGER NOT NULL DEFAULT nextval(pg_get_serial_sequence('tracks', 'id')::regclass),
+    source TEXT, start_time TIMESTAMPTZ, end_time_incl TIMESTAMPTZ, route TEXT,
+    PRIMARY KEY (trip_ord, wp_ord)
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE _stage_track_points (
+    trip_ord INTEGER, wp_ord INTEGER, point_ord INTEGER,
+    recorded_at TIMESTAMPTZ, lon DOUBLE PRECISION, lat DOUBLE PRECISION,
+    elevation_meters NUMERIC
+) ON COMMIT DROP;
+"""
+
+_STAGING_COLUMNS = {
+    "_stage_trips": ("trip_ord", "name", "key", "start_date", "end_date", "source"),
+    "_stage_waypoints": (
+        "trip_ord", "wp_ord", "name", "description", "start_time", "end_time", "lon", "lat",
+    ),
+    "_stage_tracks": ("trip_ord", "wp_ord", "source", "start_time", "end_time_incl", "route"),
+    "_stage_track_points": (
+        "trip_ord", "wp_ord", "point_ord", "recorded_at", "lon", "lat", "elevation_meters",
+    ),
+}
+
+# One round trip: resolve staged positions to IDs and insert everything
+_INSERT_FROM_STAGING = """
+INSERT INTO trips (id, name, key, start_date, end_date, source)
+SELECT id, name, key, start_date, end_date, source
+FROM _stage_trips ORDER BY id;
+
+INSERT INTO waypoints (id, trip_id, name, description, start_time, end_time, location)
+SELECT w.id, t.id, w.name, w.description, w.start_time, w.end_time,
+       ST_SetSRID(ST_MakePoint(w.lon, w.lat), 4326)
+FROM _stage_waypoints w
+JOIN _stage_trips t USING (trip_ord)
+ORDER BY w.id;
+
+INSERT INTO tracks
+(id, trip_id, start_waypoint_id, end_waypoint_id, source, start_time, end_time_incl, route)
+SELECT k.id, t.id, ws.id, we.id, k.source, k.start_time, k.end_time_incl,
+       ST_GeomFromText(k.route, 4326)
+FROM _stage_tracks k
+JOIN _stage_trips t USING (trip_ord)
+JOIN _stage_waypoints ws ON ws.trip_ord = k.trip_ord AND ws.wp_ord = k.wp_ord - 1
+JOIN _stage_waypoints we ON we.trip_ord = k.trip_ord AND we.wp_ord = k.wp_ord
+ORDER BY k.id;
+
+INSERT INTO track_points (track_id, recorded_at, location, elevation_meters)
+SELECT k.id, p.recorded_at, ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326), p.elevation_meters
+FROM _stage_track_points p
+JOIN _stage_tracks k ON k.trip_ord = p.trip_ord AND k.wp_ord = p.wp_ord
+ORDER BY k.id, p.point_ord;
+
+SELECT id FROM _stage_trips ORDER BY trip_ord;
+"""
+
+
+def staging_rows(trips: list[dict]) -> dict[str, list[tuple]]:
+    """Rows for each staging table (see _STAGING_COLUMNS). Hydrates track elevations."""
+    rows: dict[str, list[tuple]] = {table: [] for table in _STAGING_COLUMNS}
+
+    # Look up every track point's elevation in one batch
+    _hydrate_elevation([p for trip in trips for _, points in _tracks(trip) for p in points])
+
+    for trip_ord, trip in enumerate(trips):
+        waypoints = trip["waypoints"]
+        start_date, end_date = _trip_dates(waypoints)
+        rows["_stage_trips"].append(
+            (trip_ord, trip["name"], trip["key"], start_date, end_date, trip["source"])
+        )
+
+        for wp_ord, wp in enumerate(waypoints):
+            rows["_stage_waypoints"].append(
+                (
+                    trip_ord,
+                    wp_ord,
+                    wp["name"],
+                    wp.get("description"),
+                    wp["start_time"],
+                    wp["end_time"],
+                    wp["lon"],
+                    wp["lat"],
+                )
+            )
+
+        track_source = _track_source(trip)
+        for j, track_points in _tracks(trip):
+            rows["_stage_tracks"].append(
+                (
+                    trip_ord,
+                    j,
+                    track_source,
+                    waypoints[j - 1]["start_time"],
+                    waypoints[j]["start_time"],
+                    _track_wkt(track_points),
+                )
+            )
+            fallback_time = waypoints[j]["start_time"]
+            rows["_stage_track_points"].extend(
+                (trip_ord, j, k, p.get("time", fallback_time), p["lon"], p["lat"], p.get("ele"))
+                for k, p in enumerate(track_points)
+            )
+
+    return rows
+
+
+def _copy_text(value: Any) -> str:
+    """Format one value for COPY's text format."""
+    if value is None:
+        return r"\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_payload(rows: list[tuple]) -> io.StringIO:
+    """Rows as a COPY FROM STDIN (text format) stream."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_text(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+def bulk_insert_trips(cur: psycopg2.extensions.cursor, trips: list[dict]) -> list[int]:
+    """Insert many trips, as insert_trip would, in six round trips. Returns trip IDs in order.
+
+    Stages everything with COPY FROM STDIN into temp tables (dropped on commit),
+    then resolves waypoint/track IDs with set-based INSERT ... SELECT joins.
+    Must run inside the caller's transaction, at most once per transaction.
+    """
+    rows = staging_rows(trips)
+
+    cur.execute(_STAGING_DDL)
+    for table, columns in _STAGING_COLUMNS.items():
+        cur.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN", copy_payload(rows[table])
+        )
+        print(f"  Staged {len(rows[table])} rows into {table}")
+
+    cur.execute(_INSERT_FROM_STAGING)
+    return [row[0] for row in cur.fetchall()]
+
+
 # ---------------------------------------------------------------------------
 # Description ETL (unchanged, only applies to FP waypoints)
 # ---------------------------------------------------------------------------
@@ -459,13 +657,13 @@ if __name__ == "__main__":
     # 3. Backfill end-times across trip boundaries
     backfill_end_times(all_trips)
 
-    # 4. Insert all trips in chronological order
+    # 4. Insert all trips in chronological order, staged in bulk so the load
+    # is a handful of round trips rather than several per waypoint
     cur = connection.cursor()
     try:
         for trip in all_trips:
-            print(f"Inserting trip: {trip['name']} ({trip['source']})...")
-            insert_trip(cur, trip)
-            print("  Success!")
+            print(f"Staging trip: {trip['name']} ({trip['source']})...")
+        bulk_insert_trips(cur, all_trips)
         connection.commit()
         print(f"\nSUCCESS: Imported {len(all_trips)} trips.")
     except Exception:
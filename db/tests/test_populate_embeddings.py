@@ -0,0 +1,44 @@
+"""Tests for the batching helpers in populate_embeddings.py."""
+
+import numpy as np
+
+from db import populate_embeddings
+from db.populate_embeddings import embedding_chunks, get_embeddings, vector_literal
+
+
+def test_chunks_drop_empty_texts_and_sort_by_length() -> None:
+    rows = [(1, "a longer caption"), (2, None), (3, "short"), (4, "  "), (5, "mid\x00 text")]
+    assert embedding_chunks(rows, 2) == [[(3, "short"), (5, "mid text")], [(1, "a longer caption")]]
+
+
+def test_chunks_empty() -> None:
+    assert embedding_chunks([], 10) == []
+
+
+def test_vector_literal_round_trips() -> None:
+    vector = np.array([0.1, -2.5, 3e-8], dtype=np.float32)
+    literal = vector_literal(vector)
+    assert literal.startswith("[") and literal.endswith("]")
+    parsed = np.array([float(v) for v in literal[1:-1].split(",")], dtype=np.float32)
+    assert np.array_equal(parsed, vector)
+
+
+class FakeModel:
+    def __init__(self) -> None:
+        self.seen: list[str] = []
+
+    def encode(self, texts: list[str], **kwargs) -> np.ndarray:
+        self.seen.extend(texts)
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_get_embeddings_uses_the_cache(monkeypatch, embedding_cache_path) -> None:
+    model = FakeModel()
+    monkeypatch.setattr(populate_embeddings, "model", model)
+    assert not embedding_cache_path.exists()  # nothing opened at import
+
+    first = get_embeddings(["a caption", "another\ncaption"])
+    second = get_embeddings(["another caption", "new"])
+    assert model.seen == ["a caption", "another caption", "new"]
+    assert np.array_equal(first[1], second[0])
+    assert embedding_cache_path.exists()
@@ -0,0 +1,216 @@
+"""Tests for the pure helpers in populate_photos.py."""
+
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from db.populate_photos import (
+    _PHOTO_ROW_TEMPLATE,
+    _UPSERT_PHOTOS_SQL,
+    HybridWaypointMatcher,
+    MatchRules,
+    WaypointTimeIndex,
+    _parse_photo_time,
+    _photo_row,
+    _record_photo_times,
+    file_fingerprint,
+)
+
+
+def _dt(day: float) -> datetime:
+    return datetime(2024, 7, 1, tzinfo=timezone.utc) + timedelta(days=day)
+
+
+def _linear_waypoint_id_for_time(windows, t):
+    """The original O(windows) scan that WaypointTimeIndex replaces."""
+    if t is None:
+        return None
+    for i, (wp_id, start, end) in enumerate(windows):
+        if start is None:
+            continue
+        if t < start:
+            continue
+        if end is not None:
+            if t < end:
+                return wp_id
+            continue
+        next_start = windows[i + 1][1] if i + 1 < len(windows) else None
+        if next_start is None or t < next_start:
+            return wp_id
+    return None
+
+
+# ---------------------------------------------------------------------------
+# WaypointTimeIndex
+# ---------------------------------------------------------------------------
+
+
+class TestWaypointTimeIndex:
+    WINDOWS = [
+        (1, _dt(0), _dt(3)),
+        (2, _dt(3), None),  # last waypoint of a trip: open until the next start
+        (3, _dt(10), _dt(12)),
+        (4, _dt(12), None),  # last waypoint overall: open forever
+        (5, None, None),
+    ]
+
+    def test_closed_windows(self) -> None:
+        index = WaypointTimeIndex(self.WINDOWS)
+        assert index.assign(_dt(0)) == 1
+        assert index.assign(_dt(2.9)) == 1
+        assert index.assign(_dt(-1)) is None
+
+    def test_open_ended_window_runs_until_next_start(self) -> None:
+        index = WaypointTimeIndex(self.WINDOWS)
+        assert index.assign(_dt(3)) == 2
+        assert index.assign(_dt(9.99)) == 2
+        assert index.assign(_dt(10)) == 3
+
+    def test_last_open_ended_window_never_closes(self) -> None:
+        index = WaypointTimeIndex(self.WINDOWS)
+        assert index.assign(_dt(1000)) == 4
+
+    def test_none_time(self) -> None:
+        index = WaypointTimeIndex(self.WINDOWS)
+        assert index.assign_many([None, _dt(1), None]) == [None, 1, None]
+
+    def test_matches_linear_scan(self) -> None:
+        rng = random.Random(0)
+        for _ in range(200):
+            # Some duplicate starts, NULL starts last (as ORDER BY start_time NULLS LAST)
+            starts = sorted(rng.choice([rng.uniform(0, 50), 10.0]) for _ in range(10))
+            starts += [None] * rng.randint(0, 2)
+            windows = []
+            for wp_id, start in enumerate(starts):
+                # Overlapping, inverted and open-ended windows all occur in real data
+                end = None
+                if start is not None and rng.random() < 0.7:
+                    end = _dt(start + rng.uniform(-2, 10))
+                windows.append((wp_id, _dt(start) if start is not None else None, end))
+            times = [_dt(rng.uniform(-5, 70)) for _ in range(50)] + [
+                w[1] for w in windows if w[1] is not None
+            ]
+
+            expected = [_linear_waypoint_id_for_time(windows, t) for t in times]
+            assert WaypointTimeIndex(windows).assign_many(times) == expected
+
+
+# ---------------------------------------------------------------------------
+# HybridWaypointMatcher
+# ---------------------------------------------------------------------------
+
+
+class TestHybridWaypointMatcher:
+    # Two towns ~110 km apart, visited one after the other, then a trip end
+    WAYPOINTS = [
+        (1, _dt(0), _dt(3), 45.0, 10.0),
+        (2, _dt(3), None, 46.0, 10.0),
+        (3, _dt(10), None, 45.0, 10.0),  # back in town 1 later on
+    ]
+
+    def test_time_and_location_agree(self) -> None:
+        matcher = HybridWaypointMatcher(self.WAYPOINTS)
+        ids, methods = matcher.match_many([_dt(1)], [45.01], [10.0])
+        assert (ids, methods) == ([1], ["time+location"])
+
+    def test_travel_day_photo_goes_to_where_it_was_taken(self) -> None:
+        # Time says waypoint 2, but the photo was taken in town 1 a few hours
+        # after the window closed (e.g. before leaving on the travel day)
+        matcher = HybridWaypointMatcher(self.WAYPOINTS)
+        ids, methods = matcher.match_many([_dt(3.2)], [45.0], [10.0])
+        assert (ids, methods) == ([1], ["time+location"])
+
+    def test_revisited_location_is_disambiguated_by_time(self) -> None:
+        matcher = HybridWaypointMatcher(self.WAYPOINTS)
+        ids, _ = matcher.match_many([_dt(11)], [45.0], [10.0])
+        assert ids == [3]
+
+    def test_falls_back_to_time_when_far_from_every_waypoint(self) -> None:
+        matcher = HybridWaypointMatcher(self.WAYPOINTS)
+        ids, methods = matcher.match_many([_dt(1)], [50.0], [20.0])
+        assert (ids, methods) == ([1], ["time"])
+
+    def test_location_only(self) -> None:
+        matcher = HybridWaypointMatcher(self.WAYPOINTS)
+        ids, methods = matcher.match_many([None, None], [45.99, 0.0], [10.0, 0.0])
+        assert ids[0] == 2 and methods[0] == "location"
+        assert (ids[1], methods[1]) == (None, "none")
+
+    def test_time_only(self) -> None:
+        matcher = HybridWaypointMatcher(self.WAYPOINTS)
+        assert matcher.match_many([_dt(4)], [None], [None]) == ([2], ["time"])
+
+    def test_exact_time_match_beats_closer_waypoint_in_slack(self) -> None:
+        # Two earlier stops right where the photo was taken crowd the exact-time
+        # waypoint (~20 km away, within range) out of the nearest candidates
+        waypoints = [
+            (1, _dt(1.6), _dt(1.8), 45.0, 10.0),
+            (2, _dt(1.8), _dt(2.0), 45.005, 10.0),
+            (3, _dt(2.0), _dt(4.0), 45.18, 10.0),
+        ]
+        matcher = HybridWaypointMatcher(waypoints, MatchRules(candidates=2))
+        ids, methods = matcher.match_many([_dt(2.1)], [45.0], [10.0])
+        assert (ids, methods) == ([3], ["time+location"])
+
+    def test_slack_is_configurable(self) -> None:
+        rules = MatchRules(time_slack=timedelta(hours=1))
+        matcher = HybridWaypointMatcher(self.WAYPOINTS, rules)
+        ids, methods = matcher.match_many([_dt(3.2)], [45.0], [10.0])
+        assert (ids, methods) == ([2], ["time"])
+
+
+# ---------------------------------------------------------------------------
+# Batched inserts
+# ---------------------------------------------------------------------------
+
+
+class TestPhotoRow:
+    TIMES = (_dt(0), _dt(0).replace(tzinfo=None), "UTC")
+
+    def test_row_matches_template(self) -> None:
+        row = _photo_row({"filename": "a.jpg"}, self.TIMES, 7)
+        assert len(row) == _PHOTO_ROW_TEMPLATE.count("%s")
+
+    def test_located_photo(self) -> None:
+        location = {"latitude": 45.5, "longitude": -79.25, "altitude": 12.0}
+        row = _photo_row({"filename": "a.jpg", "caption": "Lake", "location": location}, self.TIMES, 7)
+        assert row[:3] == (7, "a.jpg", "Lake")
+        assert row[6:8] == (-79.25, 45.5)  # lon, lat for ST_MakePoint
+        assert json.loads(row[8]) == location
+
+    def test_unlocated_photo_uses_same_row_shape(self) -> None:
+        row = _photo_row({"filename": "b.jpg"}, (None, None, None), None)
+        assert row == (None, "b.jpg", None, None, None, None, None, None, None)
+
+
+class TestIncrementalLoad:
+    def test_fingerprint_is_content_hash(self, tmp_path) -> None:
+        path = tmp_path / "captions_2024-07_2026-02-28.jsonl"
+        path.write_bytes(b'{"filename": "a.jpg"}\n')
+        assert file_fingerprint(path) == hashlib.sha256(b'{"filename": "a.jpg"}\n').hexdigest()
+
+        before = file_fingerprint(path)
+        path.write_bytes(b'{"filename": "a.jpg", "caption": "Lake"}\n')
+        assert file_fingerprint(path) != before
+
+    def test_upsert_shares_insert_row_shape(self) -> None:
+        assert _UPSERT_PHOTOS_SQL.count("%s") == 1
+        assert "ON CONFLICT (filename)" in _UPSERT_PHOTOS_SQL
+
+
+class TestRecordPhotoTimes:
+    def test_batch_matches_single_parse(self) -> None:
+        records = [
+            {"filename": "a.jpg", "timestamp": "2024:08:04 17:02:35",
+             "location": {"latitude": 45.5, "longitude": -73.6}},
+            {"filename": "2024-08-04 17.02.35.jpg", "location": {"latitude": 49.3, "longitude": -123.1}},
+            {"filename": "c.jpg", "timestamp": "2024:08:04 17:02:35"},
+            {"filename": "d.jpg", "location": {"latitude": 45.5, "longitude": -73.6}},
+        ]
+        result = _record_photo_times(records)
+        assert result[0] == _parse_photo_time("2024:08:04 17:02:35", 45.5, -73.6)
+        assert result[0][2] == "America/Toronto"
+        assert result[1][0] == datetime(2024, 8, 5, 0, 2, 35, tzinfo=timezone.utc)
+        assert result[1][2] == "America/Vancouver"
+        assert result[2:] == [(None, None, None)] * 2
@@ -4,9 +4,17 @@ import json
 import textwrap
 from pathlib import Path
 
+import numpy as np
 import pytest
 
-from db.populate_waypoints import backfill_end_times, parse_fp_gpx, parse_manual_trips
+import db.populate_waypoints as populate_waypoints
+from db.populate_waypoints import (
+    backfill_end_times,
+    copy_payload,
+    parse_fp_gpx,
+    parse_manual_trips,
+    staging_rows,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -337,3 +345,56 @@ class TestBackfillEndTimes:
 
         assert trips[0]["waypoints"][0]["end_time"] == "2024-01-10"  # unchanged
         assert trips[0]["waypoints"][1]["end_time"] == "2024-02-01"  # filled
+
+
+# ---------------------------------------------------------------------------
+# Bulk loading: staging rows and COPY payload
+# ---------------------------------------------------------------------------
+
+
+class _FakeElevation:
+    def elevations(self, lats: list[float], lons: list[float]) -> np.ndarray:
+        return np.full(len(lats), 100.0)
+
+
+class TestStagingRows:
+    @pytest.fixture(autouse=True)
+    def _no_srtm(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(populate_waypoints, "elevation_provider", _FakeElevation())
+
+    def test_rows_reference_trips_and_waypoints_by_position(self, tmp_path: Path) -> None:
+        gpx_file = tmp_path / "test.gpx"
+        gpx_file.write_text(MINIMAL_GPX)
+        json_file = tmp_path / "trips.json"
+        json_file.write_text(json.dumps(MINIMAL_MANUAL_JSON))
+        trips = [parse_fp_gpx(gpx_file)] + parse_manual_trips(json_file)
+
+        rows = staging_rows(trips)
+
+        assert [r[:3] for r in rows["_stage_trips"]] == [
+            (0, "Test Trip", "test-trip"),
+            (1, "Pre-trip", "pre-trip"),
+        ]
+        assert [r[:3] for r in rows["_stage_waypoints"]] == [
+            (0, 0, "Place A"),
+            (0, 1, "Place B"),
+            (0, 2, "Place C"),
+            (1, 0, "Home"),
+            (1, 1, "Nearby"),
+        ]
+        # One track per waypoint after the first, keyed by the destination waypoint
+        assert [(r[0], r[1], r[2]) for r in rows["_stage_tracks"]] == [
+            (0, 1, "FindPenguins"), (0, 2, "FindPenguins"), (1, 1, "manual"),
+        ]
+        assert rows["_stage_tracks"][0][5] == "LINESTRING(-79.0 45.0, -79.5 45.5, -80.0 46.0)"
+        assert [r[:3] for r in rows["_stage_track_points"]] == [
+            (0, 1, 0), (0, 1, 1), (0, 1, 2), (0, 2, 0), (0, 2, 1), (1, 1, 0), (1, 1, 1),
+        ]
+        # Manual track points have no time, so fall back to the destination waypoint's
+        manual_point = rows["_stage_track_points"][-1]
+        assert manual_point[3] == "2024-09-15T00:00:00Z"
+        assert manual_point[6] == 100.0
+
+    def test_copy_payload_escapes_text_format(self) -> None:
+        payload = copy_payload([(1, None, "tab\there", "line\nbreak", "back\\slash", 1.5)])
+        assert payload.read() == "1\t\\N\ttab\\there\tline\\nbreak\tback\\\\slash\t1.5\n"
@@ -0,0 +1,95 @@
+"""
+Micro-batching for the embedding service.
+
+Encoding one text at a time leaves most of the model's throughput unused, and
+with a threaded server concurrent requests would otherwise contend for the
+model one by one. MicroBatcher collects texts submitted by concurrent request
+threads for up to a few milliseconds, runs one batched encode, and hands each
+caller its own rows.
+"""
+
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Runs encode_batch on texts from concurrent submit() calls in one worker thread.
+
+    A batch is sent as soon as max_batch_size texts are waiting, or max_wait_ms
+    after its first text arrived. A single submit() larger than max_batch_size
+    still runs as one batch.
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[list[str]], np.ndarray],
+        max_wait_ms: float = 5.0,
+        max_batch_size: int = 64,
+    ) -> None:
+        self.encode_batch = encode_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: queue.Queue[tuple[list[str], Future]] = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for the next batch."""
+        return self._queue.qsize()
+
+    def submit(self, texts: list[str]) -> np.ndarray:
+        """Encode texts (one row each), batched with other threads' texts. Blocks until done."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name="embedding micro-batcher", daemon=True
+                    )
+                    self._worker.start()
+
+    def _collect(self) -> list[tuple[list[str], Future]]:
+        """Block for the first request, then gather more until the batch is full or the wait ends."""
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = np.asarray(self.encode_batch(texts))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for item_texts, future in batch:
+                future.set_result(vectors[start : start + len(item_texts)])
+                start += len(item_texts)
@@ -0,0 +1,78 @@
+"""
+Response formats for /embed, chosen by the request's Accept header.
+
+JSON (the HF feature-extraction format) stays the default. Clients that embed
+many texts can ask for the raw vectors instead, skipping float formatting and
+parsing, and for float16 to halve the bytes again:
+
+  application/json                     [[f1, f2, ...], ...]
+  application/x-float32                little-endian float32, rows back to back
+  application/x-float16                little-endian float16, rows back to back
+  application/x-float32+base64         base64 of the float32 bytes
+  application/x-float16+base64         base64 of the float16 bytes
+
+application/octet-stream is accepted as an alias for application/x-float32.
+Binary responses carry the shape in X-Embedding-Count and X-Embedding-Dim.
+"""
+
+import base64
+import json
+
+import numpy as np
+
+JSON = "application/json"
+
+_DTYPES = {
+    "application/x-float32": np.dtype("<f4"),
+    "application/x-float16": np.dtype("<f2"),
+}
+_ALIASES = {"application/octet-stream": "application/x-float32"}
+
+
+def negotiate(accept: str | None) -> str:
+    """
+    The response media type for an Accept header: the first supported type it
+    lists, in the client's order of preference (q values). JSON when nothing matches.
+    """
+    if not accept:
+        return JSON
+    ranked = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranked.append((-q, position, _ALIASES.get(media_type.lower(), media_type.lower())))
+    for neg_q, _, media_type in sorted(ranked):
+        if neg_q >= 0:
+            break  # q=0 means "not acceptable"
+        if media_type == JSON or media_type.removesuffix("+base64") in _DTYPES:
+            return media_type
+        if media_type in ("*/*", "application/*"):
+            return JSON
+    return JSON
+
+
+def serialize(vectors: np.ndarray, media_type: str) -> bytes:
+    """Encode a (count, dim) array of vectors as media_type (from negotiate)."""
+    if media_type == JSON:
+        return json.dumps(vectors.tolist()).encode("utf-8")
+    raw = np.ascontiguousarray(vectors, dtype=_DTYPES[media_type.removesuffix("+base64")]).tobytes()
+    if media_type.endswith("+base64"):
+        return base64.b64encode(raw)
+    return raw
+
+
+def deserialize(body: bytes, media_type: str, dim: int) -> np.ndarray:
+    """Inverse of serialize, for clients and tests."""
+    if media_type == JSON:
+        return np.array(json.loads(body), dtype=np.float32).reshape(-1, dim)
+    if media_type.endswith("+base64"):
+        body = base64.b64decode(body)
+    dtype = _DTYPES[_ALIASES.get(media_type, media_type).removesuffix("+base64")]
+    return np.frombuffer(body, dtype=dtype).reshape(-1, dim)
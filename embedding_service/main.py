@@ -4,81 +4,414 @@ as waypoint embeddings (BAAI/bge-small-en-v1.5). Used by the Go server for
 semantic search.
 """
 
+import gc
 import json
 import os
+import signal
 import sys
+import threading
+import time
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
+from embedding_service import formats, metrics
+from embedding_service.batching import MicroBatcher
+from embedding_service.query_cache import QueryCache
+from lib.embedding_cache import LazyCache, normalize_text
+from lib.embedding_model import MODEL_NAME, get_model
 
-# Same model as db/populate_embeddings.py and scripts/test_search.py
-MODEL_NAME = "BAAI/bge-small-en-v1.5"
+# Same model as db/populate_embeddings.py and scripts/experiments/search.py.
+# Loaded on first use; main() starts loading it in the background at startup.
+model = get_model(MODEL_NAME)
+# Shared with db/populate_embeddings.py: repeated queries skip the model.
+# Opened on the first request, in the process that serves it.
+embedding_cache = LazyCache(model.cache_key)
 
-# Load model once at startup (can take a few seconds on first run)
-print("Loading model...", file=sys.stderr)
-model = SentenceTransformer(MODEL_NAME)
-print("Model ready.", file=sys.stderr)
+# Served on GET /metrics in the Prometheus text format
+registry = metrics.Registry()
+KNOWN_PATHS = ("/embed", "/health", "/stats", "/metrics")
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+REQUESTS = registry.register(
+    metrics.Counter("embedding_requests_total", "HTTP requests by path and status.", ("path", "status"))
+)
+INPUTS = registry.register(metrics.Counter("embedding_inputs_total", "Texts received on /embed."))
+REQUEST_SECONDS = registry.register(
+    metrics.Histogram("embedding_request_seconds", "Time to handle a /embed request.", LATENCY_BUCKETS)
+)
+PHASE_SECONDS = registry.register(
+    metrics.Histogram(
+        "embedding_phase_seconds",
+        "Time per phase: decode (request JSON), tokenize, inference (model forward pass), serialize (response).",
+        LATENCY_BUCKETS,
+        ("phase",),
+    )
+)
+BATCH_SIZE = registry.register(
+    metrics.Histogram(
+        "embedding_batch_size", "Texts per model call.", (1, 2, 4, 8, 16, 32, 64, 128, 256)
+    )
+)
+registry.register(
+    metrics.Gauge(
+        "embedding_batch_queue_depth",
+        "Requests waiting for the next model call.",
+        lambda: batcher.queue_depth,
+    )
+)
+registry.register(
+    metrics.Gauge(
+        "embedding_query_cache_hits_total",
+        "In-memory query cache hits.",
+        lambda: query_cache.hits,
+        kind="counter",
+    )
+)
+registry.register(
+    metrics.Gauge(
+        "embedding_query_cache_misses_total",
+        "In-memory query cache misses.",
+        lambda: query_cache.misses,
+        kind="counter",
+    )
+)
+
+
+def _forward(loaded, texts: list[str]) -> tuple[np.ndarray, float]:
+    """
+    What SentenceTransformer.encode does for one batch, in two timed steps:
+    returns (vectors, seconds spent tokenizing).
+    """
+    import torch
+    from sentence_transformers.util import batch_to_device
+
+    # preprocess() replaced tokenize() in sentence-transformers 6
+    tokenize = getattr(loaded, "preprocess", None) or loaded.tokenize
+    start = time.perf_counter()
+    features = tokenize(texts)
+    tokenize_seconds = time.perf_counter() - start
+    with torch.inference_mode():
+        output = loaded(batch_to_device(features, loaded.device))
+    return output["sentence_embedding"].float().cpu().numpy(), tokenize_seconds
+
+
+def _encode_batch(texts: list[str]):
+    """model.encode for the batcher, recording batch size and tokenize/inference time."""
+    loaded = model.get()
+    start = time.perf_counter()
+    if hasattr(loaded, "preprocess") or hasattr(loaded, "tokenize"):
+        vectors, tokenize_seconds = _forward(loaded, texts)
+    else:
+        # Anything else with an encode(); no separate tokenize step to time
+        vectors, tokenize_seconds = loaded.encode(texts), 0.0
+    elapsed = time.perf_counter() - start
+
+    BATCH_SIZE.observe(len(texts))
+    PHASE_SECONDS.observe(tokenize_seconds, "tokenize")
+    PHASE_SECONDS.observe(elapsed - tokenize_seconds, "inference")
+    return vectors
+
+
+# Concurrent requests are encoded together: the batcher waits up to
+# EMBEDDING_SERVICE_BATCH_WAIT_MS for more texts, up to EMBEDDING_SERVICE_BATCH_SIZE
+batcher = MicroBatcher(
+    _encode_batch,
+    max_wait_ms=float(os.environ.get("EMBEDDING_SERVICE_BATCH_WAIT_MS", "5")),
+    max_batch_size=int(os.environ.get("EMBEDDING_SERVICE_BATCH_SIZE", "64")),
+)
+
+# Recent query vectors, in memory; hit/miss counts are served on GET /stats
+query_cache = QueryCache(
+    max_size=int(os.environ.get("EMBEDDING_SERVICE_QUERY_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("EMBEDDING_SERVICE_QUERY_CACHE_TTL", "3600")),
+)
+
+# Most texts accepted in one /embed request
+MAX_INPUTS = int(os.environ.get("EMBEDDING_SERVICE_MAX_INPUTS", "256"))
+
+# Pre-fork restarts: a worker that exits within WORKER_STABLE_SECONDS of starting
+# counts as a failure; backoff doubles per failure up to the cap
+WORKER_STABLE_SECONDS = 30
+WORKER_MAX_FAILURES = 5
+WORKER_MAX_BACKOFF_SECONDS = 30
+
+
+def encode_many(texts: list[str]) -> np.ndarray:
+    """Normalize and encode texts to 384-dim float32 vectors (one row each), in one batched model call."""
+    texts = [normalize_text(text or "") for text in texts]
+    # model expects at least some input; empty -> zero vector
+    vectors = np.zeros((len(texts), 384), dtype=np.float32)
+    todo = []
+    for i, text in enumerate(texts):
+        if text:
+            cached = query_cache.get(text)
+            if cached is None:
+                todo.append(i)
+            else:
+                vectors[i] = cached
+    if todo:
+        encoded = embedding_cache.encode([texts[i] for i in todo], batcher.submit)
+        for i, vector in zip(todo, np.asarray(encoded, dtype=np.float32)):
+            vectors[i] = vector
+            # A copy, so the cache doesn't keep the whole batch array alive
+            query_cache.put(texts[i], vector.copy())
+    return vectors
 
 
 def encode(text: str) -> list[float]:
     """Normalize and encode text to a 384-dim vector."""
-    text = (text or "").replace("\n", " ").strip()
-    if not text:
-        return [0.0] * 384  # model expects at least some input; empty -> zero vector
-    return model.encode(text).tolist()
+    return encode_many([text])[0].tolist()
 
 
-def handle_embed(body: bytes) -> tuple[int, list[list[float]] | dict[str, str]]:
+def embed(body: bytes) -> tuple[int, np.ndarray | dict[str, str]]:
     """
-    Parse JSON body {"inputs": "..."}, return (status_code, response).
-    On success returns (200, [[f1, f2, ...]]) matching the HF wire format.
+    Parse JSON body {"inputs": "..."} or {"inputs": ["...", ...]}, return (status_code, response).
+    On success the response is a (len(inputs), 384) float32 array, otherwise an error dict.
     """
+    start = time.perf_counter()
     try:
         data = json.loads(body.decode("utf-8"))
     except (json.JSONDecodeError, UnicodeDecodeError):
         return 400, {"error": "invalid JSON"}
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - start, "decode")
 
-    text = data.get("inputs")
-    if text is None:
+    inputs = data.get("inputs") if isinstance(data, dict) else None
+    if inputs is None:
         return 400, {"error": "missing field: inputs"}
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    elif not isinstance(inputs, list) or not all(isinstance(text, str) for text in inputs):
+        return 400, {"error": "inputs must be a string or a list of strings"}
+    if len(inputs) > MAX_INPUTS:
+        return 400, {"error": f"too many inputs: {len(inputs)} (max {MAX_INPUTS})"}
+
+    INPUTS.inc(amount=len(inputs))
+    return 200, encode_many(inputs)
+
+
+def handle_embed(body: bytes) -> tuple[int, list[list[float]] | dict[str, str]]:
+    """
+    embed() with the JSON response body.
+    On success returns (200, [[f1, f2, ...], ...]), one vector per input, matching the HF wire format.
+    """
+    status, resp = embed(body)
+    if isinstance(resp, np.ndarray):
+        return status, resp.tolist()
+    return status, resp
+
+
+# Index of this pre-forked worker (0..workers-1); None when serving from a single process
+worker_index: int | None = None
+
+
+def handle_stats() -> dict[str, dict]:
+    """Body of GET /stats."""
+    return {
+        "worker": {"index": worker_index, "pid": os.getpid()},
+        "query_cache": query_cache.stats(),
+    }
 
-    embedding = encode(text)
-    return 200, [embedding]
+
+def _init_worker(index: int) -> None:
+    """Per-process setup in a forked worker."""
+    global worker_index
+    worker_index = index
+    # Caches and metrics are per process; label the series so scrapes of different workers don't mix
+    registry.const_labels = {"worker": str(index)}
+    # SQLite connections must not cross a fork: drop any inherited one, reopen on first use
+    embedding_cache.close()
+
+
+def _prepare_fork(workers: int) -> None:
+    """
+    Load the model in the parent so workers share its weights copy-on-write,
+    without starting a tokenizers or torch thread pool that would not survive the fork.
+    """
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    try:
+        import torch
+    except ImportError:
+        torch = None
+    if torch is not None:
+        # Split the cores between workers instead of each using all of them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    model.get()
+    # Keep the loaded objects out of later collections, whose refcount and GC
+    # header writes would copy their pages into every worker
+    gc.freeze()
+
+
+def _serve_workers(server, workers: int, metrics_port: int | None = None) -> None:
+    """
+    Pre-fork: serve on the already-bound socket from `workers` child processes,
+    restarting any that die, until SIGTERM/SIGINT. With metrics_port, worker i
+    also serves on its own port metrics_port + i, so each can be scraped.
+
+    A worker that keeps dying soon after starting is restarted with exponential
+    backoff, and after WORKER_MAX_FAILURES such exits in a row the service stops.
+    """
+    children: dict[int, int] = {}  # pid -> worker index
+    started: dict[int, float] = {}  # worker index -> monotonic start time
+    failures: dict[int, int] = {}  # worker index -> consecutive early exits
+    stopping = False
+    failed = False
+
+    def spawn(index: int) -> None:
+        started[index] = time.monotonic()
+        pid = os.fork()
+        if pid:
+            children[pid] = index
+            return
+        # Child: the parent handles Ctrl-C and stops children with SIGTERM
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            _init_worker(index)
+            if metrics_port is not None:
+                own = type(server)(
+                    (server.server_address[0], metrics_port + index), server.RequestHandlerClass
+                )
+                threading.Thread(target=own.serve_forever, name="worker port", daemon=True).start()
+            server.serve_forever()
+        except BaseException as e:
+            print(f"[ERROR] Worker {os.getpid()} failed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for index in range(workers):
+        spawn(index)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if stopping or index is None:
+            continue
+        if time.monotonic() - started[index] < WORKER_STABLE_SECONDS:
+            failures[index] = failures.get(index, 0) + 1
+        else:
+            failures[index] = 1
+        if failures[index] >= WORKER_MAX_FAILURES:
+            print(
+                f"[ERROR] Worker {index} exited {failures[index]} times in a row; stopping",
+                file=sys.stderr,
+            )
+            failed = True
+            stop(signal.SIGTERM, None)
+            continue
+        delay = min(2 ** (failures[index] - 1), WORKER_MAX_BACKOFF_SECONDS)
+        print(
+            f"[WARNING] Worker {index} ({pid}) exited ({status}); restarting in {delay}s",
+            file=sys.stderr,
+        )
+        time.sleep(delay)
+        if not stopping:
+            spawn(index)
+    server.server_close()
+    if failed:
+        raise SystemExit(1)
 
 
 def main() -> None:
     port = int(os.environ.get("EMBEDDING_SERVICE_PORT", "5001"))
     host = os.environ.get("EMBEDDING_SERVICE_HOST", "127.0.0.1")
+    # Worker processes sharing the socket; 1 serves from this process
+    workers = int(os.environ.get("EMBEDDING_SERVICE_WORKERS", "1"))
+    # First of the per-worker ports (worker i on this + i), for scraping each worker's /metrics
+    worker_port = os.environ.get("EMBEDDING_SERVICE_WORKER_PORT")
 
-    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
     class Handler(BaseHTTPRequestHandler):
-        def do_GET(self) -> None:
-            if self.path.rstrip("/") == "/health":
-                self.send_response(200)
-                self.send_header("Content-Type", "application/json")
-                self.end_headers()
-                self.wfile.write(b'{"status":"ok"}')
-                return
-            self.send_response(404)
+        def _send(
+            self, status: int, content_type: str, body: bytes, headers: dict[str, str] | None = None
+        ) -> None:
+            path = self.path.rstrip("/")
+            REQUESTS.inc(path if path in KNOWN_PATHS else "other", str(status))
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
             self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            path = self.path.rstrip("/")
+            if path == "/health":
+                self._send(200, "application/json", b'{"status":"ok"}')
+            elif path == "/stats":
+                self._send(200, "application/json", json.dumps(handle_stats()).encode("utf-8"))
+            elif path == "/metrics":
+                self._send(200, metrics.CONTENT_TYPE, registry.render().encode("utf-8"))
+            else:
+                self._send(404, "application/json", b'{"error":"not found"}')
 
         def do_POST(self) -> None:
             if self.path.rstrip("/") != "/embed":
-                self.send_response(404)
-                self.end_headers()
-                self.wfile.write(b'{"error":"not found"}')
+                self._send(404, "application/json", b'{"error":"not found"}')
                 return
 
+            start = time.perf_counter()
             content_length = int(self.headers.get("Content-Length", 0))
             body = self.rfile.read(content_length)
-            status, resp = handle_embed(body)
+            status, resp = embed(body)
 
-            self.send_response(status)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps(resp).encode("utf-8"))
+            serialize_start = time.perf_counter()
+            if isinstance(resp, np.ndarray):
+                # JSON unless the client asked for raw float32/float16 (see formats.py)
+                content_type = formats.negotiate(self.headers.get("Accept"))
+                payload = formats.serialize(resp, content_type)
+                extra_headers = {}
+                if content_type != formats.JSON:
+                    extra_headers = {
+                        "X-Embedding-Count": str(resp.shape[0]),
+                        "X-Embedding-Dim": str(resp.shape[1]),
+                    }
+            else:
+                content_type = "application/json"
+                payload = json.dumps(resp).encode("utf-8")
+                extra_headers = {}
+            PHASE_SECONDS.observe(time.perf_counter() - serialize_start, "serialize")
+
+            self._send(status, content_type, payload, extra_headers)
+            REQUEST_SECONDS.observe(time.perf_counter() - start)
+
+    # One thread per connection, so concurrent requests can share a batch
+    server = ThreadingHTTPServer((host, port), Handler)
+
+    if workers > 1:
+        if not hasattr(os, "fork"):
+            raise SystemExit("[ERROR] EMBEDDING_SERVICE_WORKERS > 1 needs os.fork (not available on Windows)")
+        _prepare_fork(workers)
+        print(
+            f"Embedding service listening on http://{host}:{port} with {workers} workers",
+            file=sys.stderr,
+        )
+        if worker_port:
+            print(
+                f"Worker ports {worker_port}-{int(worker_port) + workers - 1} (one per worker)",
+                file=sys.stderr,
+            )
+        _serve_workers(server, workers, int(worker_port) if worker_port else None)
+        return
 
-    server = HTTPServer((host, port), Handler)
+    # Loading takes a few seconds; overlap it with startup instead of blocking the socket
+    model.warm_up()
     print(f"Embedding service listening on http://{host}:{port}", file=sys.stderr)
     server.serve_forever()
 
@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_service.batching import MicroBatcher
+
+
+class FakeEncoder:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.batches.append(list(texts))
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def test_concurrent_requests_share_a_batch() -> None:
+    encoder = FakeEncoder()
+    batcher = MicroBatcher(encoder, max_wait_ms=200, max_batch_size=1000)
+    texts = [f"text {'x' * i}" for i in range(20)]
+    results: dict[int, np.ndarray] = {}
+    barrier = threading.Barrier(len(texts))
+
+    def call(i: int) -> None:
+        barrier.wait()
+        results[i] = batcher.submit([texts[i]])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(encoder.batches) < len(texts)
+    assert sorted(t for batch in encoder.batches for t in batch) == sorted(texts)
+    for i, text in enumerate(texts):
+        assert results[i].shape == (1, 2)
+        assert results[i][0, 0] == len(text)
+
+
+def test_batch_size_limit_and_multi_text_requests() -> None:
+    encoder = FakeEncoder()
+    batcher = MicroBatcher(encoder, max_wait_ms=0, max_batch_size=2)
+    result = batcher.submit(["a", "bb", "ccc"])
+    assert result[:, 0].tolist() == [1, 2, 3]
+    assert encoder.batches == [["a", "bb", "ccc"]]
+    assert batcher.submit([]).size == 0
+
+
+def test_errors_reach_every_caller() -> None:
+    def fail(texts):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher(fail, max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="model exploded"):
+        batcher.submit(["a"])
+    with pytest.raises(RuntimeError):
+        batcher.submit(["b"])
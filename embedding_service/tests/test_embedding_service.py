@@ -1,4 +1,10 @@
-from embedding_service.main import handle_embed, encode
+import json
+
+import pytest
+
+from embedding_service import main
+from embedding_service.main import MAX_INPUTS, encode, handle_embed
+from lib.embedding_model import LazyModel
 
 
 def test_handle_embed_valid() -> None:
@@ -28,3 +34,52 @@ def test_handle_embed_empty_inputs() -> None:
 
 def test_encode_dimension() -> None:
     assert len(encode("some travel query")) == 384
+
+
+def test_handle_embed_list_inputs() -> None:
+    status, resp = handle_embed(b'{"inputs": ["hello world", "", "hello world"]}')
+    assert status == 200
+    assert len(resp) == 3
+    assert resp[0] == resp[2] == encode("hello world")
+    assert resp[1] == [0.0] * 384
+
+
+def test_handle_embed_invalid_inputs() -> None:
+    for body in (b'{"inputs": 5}', b'{"inputs": ["a", 1]}'):
+        status, resp = handle_embed(body)
+        assert status == 400
+        assert resp == {"error": "inputs must be a string or a list of strings"}
+
+
+def test_handle_embed_too_many_inputs() -> None:
+    body = json.dumps({"inputs": ["a"] * (MAX_INPUTS + 1)}).encode()
+    status, resp = handle_embed(body)
+    assert status == 400
+    assert "too many inputs" in resp["error"]
+    assert handle_embed(b'{"inputs": []}') == (200, [])
+
+
+class FakeSentenceTransformer:
+    device = "cpu"
+
+    def preprocess(self, texts):
+        import torch
+
+        return {"lengths": torch.tensor([[float(len(t))] for t in texts])}
+
+    def __call__(self, features):
+        return {"sentence_embedding": features["lengths"].repeat(1, 384)}
+
+
+def test_encode_batch_times_phases_without_patching_the_model(monkeypatch) -> None:
+    pytest.importorskip("torch")
+    pytest.importorskip("sentence_transformers")
+    fake = FakeSentenceTransformer()
+    monkeypatch.setattr(main, "model", LazyModel(loader=lambda name, backend: fake))
+    tokenized = main.PHASE_SECONDS.count("tokenize")
+
+    vectors = main._encode_batch(["ab", "abcd"])
+    assert vectors.shape == (2, 384)
+    assert vectors[:, 0].tolist() == [2.0, 4.0]
+    assert main.PHASE_SECONDS.count("tokenize") == tokenized + 1
+    assert vars(fake) == {}  # no methods rebound on the shared model
@@ -0,0 +1,40 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+
+from embedding_service.formats import JSON, deserialize, negotiate, serialize
+
+
+def test_negotiate() -> None:
+    assert negotiate(None) == JSON
+    assert negotiate("") == JSON
+    assert negotiate("*/*") == JSON
+    assert negotiate("application/x-float16") == "application/x-float16"
+    assert negotiate("application/octet-stream") == "application/x-float32"
+    assert negotiate("application/x-float32+base64, application/json") == "application/x-float32+base64"
+    assert negotiate("application/json;q=0.5, application/x-float16;q=0.9") == "application/x-float16"
+    assert negotiate("application/x-float16;q=0, text/html") == JSON
+    assert negotiate("image/png") == JSON
+
+
+@pytest.mark.parametrize(
+    "media_type",
+    [JSON, "application/x-float32", "application/x-float16", "application/x-float32+base64", "application/x-float16+base64"],
+)
+def test_round_trip(media_type: str) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(0, 0.1, (3, 384)).astype(np.float32)
+    decoded = deserialize(serialize(vectors, media_type), media_type, 384)
+    assert decoded.shape == (3, 384)
+    tolerance = 1e-3 if "float16" in media_type else 0
+    assert np.allclose(decoded, vectors, atol=tolerance, rtol=tolerance)
+
+
+def test_binary_layout() -> None:
+    vectors = np.array([[1.0, -2.0]], dtype=np.float32)
+    assert serialize(vectors, "application/x-float32") == np.array([1.0, -2.0], "<f4").tobytes()
+    assert serialize(vectors, "application/x-float16") == b"\x00\x3c\x00\xc0"
+    assert base64.b64decode(serialize(vectors, "application/x-float16+base64")) == b"\x00\x3c\x00\xc0"
+    assert json.loads(serialize(vectors, JSON)) == [[1.0, -2.0]]
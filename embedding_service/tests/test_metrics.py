@@ -0,0 +1,49 @@
+from embedding_service.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_render_text_format() -> None:
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests.", ("path", "status")))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", (0.1, 1.0), ("phase",)))
+    registry.register(Gauge("queue_depth", "Queue depth.", lambda: 3))
+
+    requests.inc("/embed", "200")
+    requests.inc("/embed", "200", amount=2)
+    requests.inc('/a"b', "404")
+    latency.observe(0.05, "decode")
+    latency.observe(0.1, "decode")
+    latency.observe(2.5, "decode")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{path="/embed",status="200"} 3' in lines
+    assert 'requests_total{path="/a\\"b",status="404"} 1' in lines
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{phase="decode",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{phase="decode",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{phase="decode",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{phase="decode"} 2.65' in lines
+    assert 'latency_seconds_count{phase="decode"} 3' in lines
+    assert "queue_depth 3" in lines
+    assert latency.count("decode") == 3
+
+
+def test_unlabelled_counter_starts_at_zero() -> None:
+    registry = Registry()
+    registry.register(Counter("inputs_total", "Inputs."))
+    assert "inputs_total 0" in registry.render().splitlines()
+
+
+def test_const_labels_on_every_series() -> None:
+    registry = Registry()
+    registry.const_labels = {"worker": "2"}
+    registry.register(Counter("inputs_total", "Inputs."))
+    registry.register(Gauge("queue_depth", "Queue depth.", lambda: 3))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", (0.1,), ("phase",)))
+    latency.observe(0.05, "decode")
+
+    lines = registry.render().splitlines()
+    assert 'inputs_total{worker="2"} 0' in lines
+    assert 'queue_depth{worker="2"} 3' in lines
+    assert 'latency_seconds_bucket{phase="decode",worker="2",le="0.1"} 1' in lines
+    assert 'latency_seconds_count{phase="decode",worker="2"} 1' in lines
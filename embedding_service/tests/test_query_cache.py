@@ -0,0 +1,42 @@
+from embedding_service.query_cache import QueryCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hits_misses_and_lru_eviction() -> None:
+    cache = QueryCache(max_size=2, ttl_seconds=60, clock=FakeClock())
+    assert cache.get("a") is None
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]  # "a" is now most recently used
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("c") == [3.0]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"], stats["evictions"]) == (2, 2, 2, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_entries_expire() -> None:
+    clock = FakeClock()
+    cache = QueryCache(max_size=10, ttl_seconds=60, clock=clock)
+    cache.put("a", [1.0])
+    clock.now = 59
+    assert cache.get("a") == [1.0]
+    clock.now = 61
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_size_zero_disables() -> None:
+    cache = QueryCache(max_size=0)
+    cache.put("a", [1.0])
+    assert cache.get("a") is None
@@ -0,0 +1,182 @@
+"""
+SRTM elevation lookups for whole coordinate arrays.
+
+srtm.py's get_elevation works one point at a time and re-parses bytes on every
+call. ElevationProvider instead memory-maps each 1x1 degree .hgt tile once (as a
+big-endian int16 grid), looks up all points of a tile with one numpy index
+operation, and caches results by coordinate so repeated points (track
+points sharing a waypoint, photos from the same spot) are free.
+
+Tiles are read from srtm.py's local cache directory; missing tiles are
+downloaded through srtm.py on first use.
+"""
+
+import contextlib
+import io
+import math
+import os
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+# srtm.py treats values outside this range (e.g. the -32768 void marker) as missing
+MIN_VALID_ELEVATION = -1000
+MAX_VALID_ELEVATION = 10000
+
+
+def srtm_tile_name(lat: float, lon: float) -> str:
+    """Name of the 1x1 degree SRTM tile containing (lat, lon), e.g. 'N45W080.hgt'."""
+    lat0, lon0 = math.floor(lat), math.floor(lon)
+    return (
+        f"{'N' if lat0 >= 0 else 'S'}{abs(lat0):02d}"
+        f"{'E' if lon0 >= 0 else 'W'}{abs(lon0):03d}.hgt"
+    )
+
+
+class ElevationProvider:
+    """
+    Elevation (meters) from SRTM tiles for arrays of coordinates.
+
+    interpolate=True blends the four surrounding grid posts bilinearly; otherwise
+    the post srtm.py's get_elevation would pick is used, so results match it exactly.
+
+    Lookups always use the exact coordinates. Results are cached by coordinate, or
+    with cache_decimals by coordinate rounded to that many places (5 is ~1 m), which
+    makes nearby points share a cache entry: a later point can then get the elevation
+    of an earlier one within that distance, possibly from the neighbouring post.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path | None = None,
+        interpolate: bool = False,
+        cache_decimals: int | None = None,
+        download: bool = True,
+    ) -> None:
+        self.cache_dir = Path(cache_dir or Path.home() / ".cache" / "srtm")
+        self.interpolate = interpolate
+        self.cache_decimals = cache_decimals
+        self.download = download
+        self._tiles: dict[str, np.ndarray | None] = {}
+        self._cache: dict[tuple[float, float], float] = {}
+        self._srtm = None
+
+    def _download(self, name: str) -> bytes | None:
+        """Fetch a tile through srtm.py (which writes it to cache_dir); None if there is none."""
+        if self._srtm is None:
+            import srtm
+
+            self._srtm = srtm.get_data(local_cache_dir=str(self.cache_dir))
+        if name not in self._srtm.srtm1_files and name not in self._srtm.srtm3_files:
+            return None  # ocean: no tile exists
+        # srtm.py prints progress; keep it out of the ETL output
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self._srtm.retrieve_or_load_file_data(name)
+
+    def _load_tile(self, name: str) -> np.ndarray | None:
+        path = self.cache_dir / name
+        if not path.exists():
+            zipped = path.with_name(name + ".zip")
+            if zipped.exists():
+                with zipfile.ZipFile(zipped) as z:
+                    data = z.read(z.namelist()[0])
+            elif self.download:
+                data = self._download(name)
+            else:
+                data = None
+            if not data:
+                return None
+            if not path.exists():
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(data)
+
+        side = math.isqrt(os.path.getsize(path) // 2)
+        return np.memmap(path, dtype=">i2", mode="r", shape=(side, side))
+
+    def _tile(self, name: str) -> np.ndarray | None:
+        if name not in self._tiles:
+            try:
+                self._tiles[name] = self._load_tile(name)
+            except Exception as e:
+                print(f"[WARNING] Failed to load elevation tile {name}: {e}")
+                self._tiles[name] = None
+        return self._tiles[name]
+
+    def _lookup_tile(
+        self, grid: np.ndarray, lat0: int, lon0: int, lats: np.ndarray, lons: np.ndarray
+    ) -> np.ndarray:
+        """Elevations for points inside one tile; NaN where the data is void."""
+        n = grid.shape[0] - 1
+        # Row 0 is the tile's north edge
+        r = (lat0 + 1 - lats) * n
+        c = (lons - lon0) * n
+        r0 = np.clip(np.floor(r).astype(np.intp), 0, n)
+        c0 = np.clip(np.floor(c).astype(np.intp), 0, n)
+
+        def valid(values: np.ndarray) -> np.ndarray:
+            values = values.astype(np.float64)
+            bad = (values < MIN_VALID_ELEVATION) | (values > MAX_VALID_ELEVATION)
+            values[bad] = np.nan
+            return values
+
+        nearest = valid(grid[r0, c0])
+        if not self.interpolate:
+            return nearest
+
+        r0 = np.minimum(r0, n - 1)
+        c0 = np.minimum(c0, n - 1)
+        fr = np.clip(r - r0, 0.0, 1.0)
+        fc = np.clip(c - c0, 0.0, 1.0)
+        top = valid(grid[r0, c0]) * (1 - fc) + valid(grid[r0, c0 + 1]) * fc
+        bottom = valid(grid[r0 + 1, c0]) * (1 - fc) + valid(grid[r0 + 1, c0 + 1]) * fc
+        blended = top * (1 - fr) + bottom * fr
+        # Next to a void post, fall back to the single nearest post
+        return np.where(np.isnan(blended), nearest, blended)
+
+    def elevations(self, lats: ArrayLike, lons: ArrayLike) -> np.ndarray:
+        """Elevation for each (lat, lon) pair; NaN where there is no data."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        out = np.full(lats.shape, np.nan)
+        if lats.size == 0:
+            return out
+
+        if self.cache_decimals is None:
+            keys = list(zip(lats.tolist(), lons.tolist()))
+        else:
+            keys = list(
+                zip(
+                    np.round(lats, self.cache_decimals).tolist(),
+                    np.round(lons, self.cache_decimals).tolist(),
+                )
+            )
+        missing = []
+        for i, key in enumerate(keys):
+            if key in self._cache:
+                out[i] = self._cache[key]
+            else:
+                missing.append(i)
+        if missing:
+            todo = np.array(missing)
+            # Normalize the tile's lower-left corner, then group points by tile
+            lat0 = np.floor(lats[todo]).astype(np.int64)
+            lon0 = np.floor(lons[todo]).astype(np.int64)
+            for a, b in np.unique(np.stack([lat0, lon0], axis=1), axis=0).tolist():
+                in_tile = todo[(lat0 == a) & (lon0 == b)]
+                grid = self._tile(srtm_tile_name(a, b))
+                if grid is None:
+                    values = np.full(len(in_tile), np.nan)
+                else:
+                    values = self._lookup_tile(grid, a, b, lats[in_tile], lons[in_tile])
+                out[in_tile] = values
+                for i, value in zip(in_tile.tolist(), values.tolist()):
+                    self._cache[keys[i]] = value
+
+        return out
+
+    def elevation(self, lat: float, lon: float) -> float | None:
+        """Single-point convenience wrapper; None where there is no data."""
+        value = float(self.elevations([lat], [lon])[0])
+        return None if math.isnan(value) else value
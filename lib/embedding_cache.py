@@ -0,0 +1,178 @@
+"""
+On-disk cache of text embeddings, keyed on (model name, normalized text).
+
+reload-db.sh drops the database, and with it every stored embedding, so without
+a cache each reload re-encodes every description and caption. EmbeddingCache
+keeps float32 vectors in a SQLite file outside the database, addressed by a
+SHA-256 of the model name and text, so a rebuild only encodes text that changed.
+db/populate_embeddings.py and embedding_service/main.py share the same file.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_PATH = Path.home() / ".cache" / "travel-log" / "embeddings.sqlite3"
+
+# SQLite's default limit on bound parameters per statement is 999 on older builds
+_LOOKUP_CHUNK = 500
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace (including newlines); the model's tokenizer ignores it anyway."""
+    return " ".join(text.split())
+
+
+def text_key(model_name: str, text: str) -> str:
+    """Cache key: SHA-256 of the model name and normalized text."""
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def default_cache_path() -> Path | None:
+    """EMBEDDING_CACHE_PATH if set ("" disables the cache), otherwise DEFAULT_PATH."""
+    path = os.getenv("EMBEDDING_CACHE_PATH")
+    if path is None:
+        return DEFAULT_PATH
+    return Path(path) if path else None
+
+
+class EmbeddingCache:
+    """
+    Embeddings of one model, persisted in a SQLite file.
+
+    Safe to share between threads, and between processes (the ETL and the
+    embedding service) through SQLite's own locking.
+    """
+
+    def __init__(self, path: str | Path, model_name: str) -> None:
+        self.path = Path(path)
+        self.model_name = model_name
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """Cached vector for each text; None where it isn't cached."""
+        keys = [text_key(self.model_name, text) for text in texts]
+        found: dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start : start + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return [found.get(key) for key in keys]
+
+    def put_many(self, texts: list[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rows = [
+            (text_key(self.model_name, text), self.model_name, vector.shape[0], vector.tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def encode(
+        self, texts: list[str], encode_fn: Callable[[list[str]], np.ndarray]
+    ) -> np.ndarray:
+        """
+        Vectors for texts (one row each), calling encode_fn only for the distinct
+        normalized texts that aren't cached yet, and caching its results.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        cached = self.get_many(texts)
+        missing = list(dict.fromkeys(normalize_text(t) for t, v in zip(texts, cached) if v is None))
+        if missing:
+            encoded = np.asarray(encode_fn(missing), dtype=np.float32)
+            self.put_many(missing, encoded)
+            fresh = dict(zip(missing, encoded))
+            cached = [
+                fresh[normalize_text(t)] if v is None else v for t, v in zip(texts, cached)
+            ]
+        return np.stack(cached)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model_name,)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_cache(model_name: str) -> EmbeddingCache | None:
+    """The shared cache at default_cache_path(), or None if disabled or unusable."""
+    path = default_cache_path()
+    if path is None:
+        return None
+    try:
+        return EmbeddingCache(path, model_name)
+    except (OSError, sqlite3.Error) as e:
+        print(f"[WARNING] Embedding cache disabled ({path}): {e}")
+        return None
+
+
+class LazyCache:
+    """
+    open_cache(model_name) on first use, so importing a module that holds one
+    doesn't create the cache file. Safe to call from several threads.
+    """
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+        self._cache: EmbeddingCache | None = None
+        self._opened = False
+        self._lock = threading.Lock()
+
+    def get(self) -> EmbeddingCache | None:
+        """The open cache, opening it now if no one has yet; None if disabled or unusable."""
+        if not self._opened:
+            with self._lock:
+                if not self._opened:
+                    self._cache = open_cache(self.model_name)
+                    self._opened = True
+        return self._cache
+
+    def encode(
+        self, texts: list[str], encode_fn: Callable[[list[str]], np.ndarray]
+    ) -> np.ndarray:
+        """EmbeddingCache.encode, or plain encode_fn when the cache is disabled."""
+        cache = self.get()
+        if cache is None:
+            return encode_fn(texts)
+        return cache.encode(texts, encode_fn)
+
+    def close(self) -> None:
+        """Close the cache if it was opened; the next get() opens it again."""
+        with self._lock:
+            if self._cache is not None:
+                self._cache.close()
+            self._cache = None
+            self._opened = False
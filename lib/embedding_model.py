@@ -0,0 +1,135 @@
+"""
+Shared, lazily loaded sentence embedding model.
+
+Importing sentence_transformers (and torch) and loading the model takes several
+seconds, which every script used to pay at import time, even for --help, a
+no-op run or a run served entirely from the embedding cache. get_model returns
+a process-wide LazyModel that only loads on the first encode, and can be warmed
+in a background thread so the load overlaps other startup work.
+
+The inference backend is chosen with EMBEDDING_BACKEND:
+  torch      (default) PyTorch
+  onnx       ONNX Runtime, same fp32 weights
+  onnx-int8  ONNX Runtime with dynamically int8-quantized weights, exported once
+             to EMBEDDING_ONNX_DIR for the EMBEDDING_ONNX_QUANTIZATION target
+             (avx2 by default; also arm64, avx512, avx512_vnni)
+Both ONNX backends need `pip install optimum[onnxruntime]`.
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+# Same model for the ETL, the embedding service and experiments; DB columns are vector(384)
+MODEL_NAME = "BAAI/bge-small-en-v1.5"
+EMBEDDING_DIM = 384
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_ONNX_DIR = Path.home() / ".cache" / "travel-log" / "onnx"
+
+
+def default_backend() -> str:
+    backend = os.getenv("EMBEDDING_BACKEND", "torch").strip().lower() or "torch"
+    if backend not in BACKENDS:
+        raise ValueError(f"EMBEDDING_BACKEND must be one of {', '.join(BACKENDS)}, not {backend!r}")
+    return backend
+
+
+def _load_quantized(model_name: str) -> Any:
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    target = os.getenv("EMBEDDING_ONNX_QUANTIZATION", "avx2")
+    local_dir = Path(os.getenv("EMBEDDING_ONNX_DIR") or DEFAULT_ONNX_DIR) / model_name.replace("/", "--")
+    file_name = f"onnx/model_qint8_{target}.onnx"
+    if not (local_dir / file_name).exists():
+        print(f"Quantizing {model_name} for {target} into {local_dir}...", file=sys.stderr)
+        model = SentenceTransformer(model_name, backend="onnx")
+        model.save(str(local_dir))
+        export_dynamic_quantized_onnx_model(
+            model, target, str(local_dir), file_suffix=f"qint8_{target}"
+        )
+    return SentenceTransformer(str(local_dir), backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def load_sentence_transformer(model_name: str, backend: str = "torch") -> Any:
+    """A SentenceTransformer for model_name on one of BACKENDS."""
+    if backend == "onnx-int8":
+        return _load_quantized(model_name)
+
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    return SentenceTransformer(model_name)
+
+
+class LazyModel:
+    """Loads the model on first use; safe to call from several threads."""
+
+    def __init__(
+        self, model_name: str = MODEL_NAME, backend: str = "torch", loader=load_sentence_transformer
+    ) -> None:
+        self.model_name = model_name
+        self.backend = backend
+        self._loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds: float | None = None
+
+    @property
+    def cache_key(self) -> str:
+        """Name for the embedding cache. fp32 ONNX matches PyTorch; int8 vectors differ slightly."""
+        return f"{self.model_name}#int8" if self.backend == "onnx-int8" else self.model_name
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self) -> Any:
+        """The loaded model, loading it now if no one has yet."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    print(f"Loading model {self.model_name} ({self.backend})...", file=sys.stderr)
+                    start = time.perf_counter()
+                    self._model = self._loader(self.model_name, self.backend)
+                    self.load_seconds = time.perf_counter() - start
+                    print(f"Model ready ({self.load_seconds:.1f}s).", file=sys.stderr)
+        return self._model
+
+    def warm_up(self) -> threading.Thread:
+        """Start loading in a background thread; the first encode waits for it if needed."""
+
+        def load() -> None:
+            try:
+                self.get()
+            except Exception as e:
+                # The next encode retries the load and raises
+                print(f"[WARNING] Background model load failed: {e}", file=sys.stderr)
+
+        thread = threading.Thread(target=load, name=f"warm-up {self.model_name}", daemon=True)
+        thread.start()
+        return thread
+
+    def encode(self, sentences: str | list[str], **kwargs: Any) -> np.ndarray:
+        """SentenceTransformer.encode on the loaded model."""
+        return self.get().encode(sentences, **kwargs)
+
+
+_models: dict[tuple[str, str], LazyModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model_name: str = MODEL_NAME, backend: str | None = None) -> LazyModel:
+    """The process-wide LazyModel for model_name on backend (default: EMBEDDING_BACKEND)."""
+    backend = backend or default_backend()
+    with _models_lock:
+        if (model_name, backend) not in _models:
+            _models[model_name, backend] = LazyModel(model_name, backend)
+        return _models[model_name, backend]
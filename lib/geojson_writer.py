@@ -0,0 +1,175 @@
+"""
+Shared GeoJSON output for the scripts that ship map data to the frontend
+(process_gpx, inaturalist_to_geojson, ebird_to_geojson).
+
+By default files are written exactly as before: indented JSON, full precision.
+Compact mode drops the whitespace, --precision rounds coordinates, and
+--compress writes pre-compressed sidecar files (trip.geojson.gz / .br) next
+to the plain file so the static host can serve them directly.
+"""
+
+import gzip
+import json
+import os
+import stat
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import click
+
+COMPRESSORS = ("gzip", "brotli")
+_SIDECAR_SUFFIX = {"gzip": ".gz", "brotli": ".br"}
+
+
+class OutputFormat(NamedTuple):
+    compact: bool = False
+    precision: int | None = None  # decimal places kept in coordinates; None = unchanged
+    compress: tuple[str, ...] = ()  # any of COMPRESSORS
+
+
+def output_format_options(f):
+    """Click decorator adding --compact, --precision and --compress to a command."""
+    f = click.option(
+        "--compress",
+        type=click.Choice(COMPRESSORS),
+        multiple=True,
+        help="Also write a pre-compressed sidecar file (.gz / .br). Repeatable.",
+    )(f)
+    f = click.option(
+        "--precision",
+        type=click.IntRange(0, 15),
+        default=None,
+        help="Round coordinates to this many decimal places (6 is ~0.1 m). Default: unchanged.",
+    )(f)
+    f = click.option(
+        "--compact",
+        is_flag=True,
+        default=False,
+        help="Write minified JSON instead of indented JSON.",
+    )(f)
+    return f
+
+
+def _round_coordinates(coords: Any, precision: int) -> Any:
+    if coords and isinstance(coords[0], (int, float)):
+        return [round(c, precision) for c in coords]
+    return [_round_coordinates(c, precision) for c in coords]
+
+
+def _quantize_geometry(geometry: dict[str, Any] | None, precision: int) -> dict[str, Any] | None:
+    if geometry is None:
+        return None
+    if geometry.get("type") == "GeometryCollection":
+        return {
+            **geometry,
+            "geometries": [_quantize_geometry(g, precision) for g in geometry["geometries"]],
+        }
+    return {**geometry, "coordinates": _round_coordinates(geometry["coordinates"], precision)}
+
+
+def quantize_coordinates(geojson: dict[str, Any], precision: int) -> dict[str, Any]:
+    """Return a copy of a FeatureCollection with every coordinate rounded to `precision` places."""
+    return {
+        **geojson,
+        "features": [
+            {**feature, "geometry": _quantize_geometry(feature.get("geometry"), precision)}
+            for feature in geojson["features"]
+        ],
+    }
+
+
+def encode_geojson(geojson: dict[str, Any], fmt: OutputFormat = OutputFormat()) -> bytes:
+    """Serialize a FeatureCollection according to `fmt` (compression aside)."""
+    if fmt.precision is not None:
+        geojson = quantize_coordinates(geojson, fmt.precision)
+    if fmt.compact:
+        text = json.dumps(geojson, separators=(",", ":"))
+    else:
+        text = json.dumps(geojson, indent=2)
+    return text.encode("utf-8")
+
+
+def _compressor(method: str) -> Callable[[bytes], bytes]:
+    """The compression function for `method`; exits if its package is missing."""
+    if method == "gzip":
+        # mtime=0 keeps the output byte-identical across runs
+        return lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    try:
+        import brotli
+    except ImportError:
+        raise SystemExit(
+            "[ERROR] Brotli output requires the 'brotli' package (pip install brotli)."
+        )
+    return lambda data: brotli.compress(data, quality=11)
+
+
+def _new_file_mode(path: Path) -> int:
+    """Permissions a plain open() would leave: the existing file's, else 0666 minus the umask."""
+    try:
+        return stat.S_IMODE(path.stat().st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def write_bytes_atomic(path: str | Path, data: bytes) -> None:
+    """
+    Write to a temp file next to `path`, then rename it into place, so readers
+    (and deploy copies) never see a half-written file.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        # mkstemp creates the file 0600; keep the output readable by the web server
+        os.fchmod(fd, _new_file_mode(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def output_paths(path: str | Path, fmt: OutputFormat) -> list[str]:
+    """Every file write_geojson produces for `path`: the file itself, then any sidecars."""
+    methods = dict.fromkeys(fmt.compress)  # de-duplicate, keep order
+    return [str(path)] + [f"{path}{_SIDECAR_SUFFIX[m]}" for m in methods]
+
+
+def write_geojson(
+    path: str | Path, geojson: dict[str, Any], fmt: OutputFormat = OutputFormat()
+) -> list[tuple[str, int]]:
+    """
+    Atomically write a FeatureCollection to `path`, plus any compressed sidecars.
+
+    Returns [(written path, size in bytes), ...], starting with `path` itself.
+    """
+    # Resolve compressors first, so a missing package fails before anything is written
+    compressors = [_compressor(method) for method in dict.fromkeys(fmt.compress)]
+    data = encode_geojson(geojson, fmt)
+    write_bytes_atomic(path, data)
+    written = [(str(path), len(data))]
+
+    for compress, sidecar in zip(compressors, output_paths(path, fmt)[1:]):
+        compressed = compress(data)
+        write_bytes_atomic(sidecar, compressed)
+        written.append((sidecar, len(compressed)))
+
+    return written
+
+
+def size_report(
+    geojson: dict[str, Any], written: list[tuple[str, int]], fmt: OutputFormat
+) -> str:
+    """One-line summary of output sizes and the bytes saved versus the default format."""
+    parts = [f"{Path(p).name}: {size:,} bytes" for p, size in written]
+    if fmt.compact or fmt.precision is not None or fmt.compress:
+        baseline = len(encode_geojson(geojson))
+        smallest = min(size for _, size in written)
+        saved = baseline - smallest
+        pct = 100 * saved / baseline if baseline else 0.0
+        parts.append(f"saved {saved:,} bytes ({pct:.0f}%) vs indented JSON")
+    return ", ".join(parts)
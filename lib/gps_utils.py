@@ -1,8 +1,12 @@
 import json
 import math
 import os
+from collections import defaultdict
 from typing import Any
 
+import numpy as np
+from numpy.typing import ArrayLike
+
 ROUND_TO = 6  # Round new lat/lon values to make obfuscation less obvious
 
 
@@ -72,6 +76,249 @@ def compute_obfuscated_location(
     return calculate_destination_point(lat, lon, config["displacement"], config["bearing"])
 
 
+# ---------------------------------------------------------------------------
+# Vectorized counterparts. These take NumPy arrays (or anything array-like) and
+# mirror the scalar functions above step for step, so results match them to
+# within floating point noise, and rounded outputs match exactly.
+# ---------------------------------------------------------------------------
+
+
+def haversine_many(
+    lats: ArrayLike, lons: ArrayLike, lat0: ArrayLike, lon0: ArrayLike
+) -> np.ndarray:
+    """
+    Array version of haversine_distance: distance in km from each (lats[i], lons[i])
+    to (lat0, lon0). lat0/lon0 may be scalars or arrays that broadcast against lats/lons.
+    """
+    R = 6371  # Earth radius in km
+
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    lat0 = np.asarray(lat0, dtype=np.float64)
+    lon0 = np.asarray(lon0, dtype=np.float64)
+
+    # Same argument order as haversine_distance(lats, lons, lat0, lon0)
+    phi1, phi2 = np.radians(lats), np.radians(lat0)
+    dphi = np.radians(lat0 - lats)
+    dlambda = np.radians(lon0 - lons)
+
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return R * c
+
+
+def calculate_destination_points(
+    lats: ArrayLike,
+    lons: ArrayLike,
+    distance_km: ArrayLike,
+    bearing_degrees: ArrayLike,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Array version of calculate_destination_point. distance_km and bearing_degrees may be
+    scalars or per-point arrays. Returns (new_lats, new_lons), rounded to ROUND_TO as round() would.
+    """
+    R = 6371  # Earth radius in km
+
+    lat_rad = np.radians(np.asarray(lats, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lons, dtype=np.float64))
+    bearing_rad = np.radians(np.asarray(bearing_degrees, dtype=np.float64))
+    angular = np.asarray(distance_km, dtype=np.float64) / R
+
+    new_lat_rad = np.arcsin(
+        np.sin(lat_rad) * np.cos(angular)
+        + np.cos(lat_rad) * np.sin(angular) * np.cos(bearing_rad)
+    )
+
+    new_lon_rad = lon_rad + np.arctan2(
+        np.sin(bearing_rad) * np.sin(angular) * np.cos(lat_rad),
+        np.cos(angular) - np.sin(lat_rad) * np.sin(new_lat_rad),
+    )
+
+    final_lat = np.degrees(new_lat_rad)
+    final_lon = normalize_longitude(np.degrees(new_lon_rad))
+
+    return _round_many(final_lat), _round_many(final_lon)
+
+
+def _round_many(values: ArrayLike) -> np.ndarray:
+    """
+    Round to ROUND_TO decimals exactly like round() does per value. np.round scales by
+    10**ROUND_TO first and rounds halves to even, so values that scale to within float
+    noise of a half are rounded again with round().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, ROUND_TO)
+    scaled = values * 10**ROUND_TO
+    near_half = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if near_half.size:
+        rounded = np.array(rounded)
+        for i in near_half.tolist():
+            rounded.flat[i] = round(float(values.flat[i]), ROUND_TO)
+    return rounded[()]
+
+
+def compute_obfuscated_locations(
+    config: dict[str, Any], lats: ArrayLike, lons: ArrayLike
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Array version of compute_obfuscated_location: displace every point by the same
+    zone's "displacement" and "bearing".
+    """
+    return calculate_destination_points(lats, lons, config["displacement"], config["bearing"])
+
+
+def points_within_zone(lats: ArrayLike, lons: ArrayLike, zone: dict[str, Any]) -> np.ndarray:
+    """
+    Boolean mask of the points within zone["radius"] km of the zone center.
+
+    Agrees exactly with `haversine_distance(lat, lon, zone["lat"], zone["lon"]) <= radius`:
+    the vectorized math can differ from `math` in the last bit, so points that land right
+    on the boundary are re-checked with the scalar function.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    radius = zone["radius"]
+
+    dist = haversine_many(lats, lons, zone["lat"], zone["lon"])
+    inside = dist <= radius
+    borderline = np.flatnonzero(np.abs(dist - radius) <= 1e-9 * max(radius, 1.0))
+    for i in borderline.tolist():
+        inside.flat[i] = (
+            haversine_distance(lats.flat[i], lons.flat[i], zone["lat"], zone["lon"]) <= radius
+        )
+    return inside
+
+
+class SensitiveZoneIndex:
+    """
+    Spatial index over sensitive zones for fast "which zone is this point in?" lookups.
+
+    Each zone's bounding box is rasterized onto a lat/lon grid of cell_size_deg cells,
+    so a lookup only runs the haversine test against zones whose box touches the
+    point's cell instead of scanning every zone. When zones overlap, the first one in
+    the original list wins — the same result as a linear scan.
+
+    Usage:
+        index = SensitiveZoneIndex(load_sensitive_zones())
+        zone = index.match(lat, lon)              # zone dict or None
+        zone_ids = index.match_many(lats, lons)   # index into index.zones, -1 if none
+    """
+
+    def __init__(self, zones: list[dict[str, Any]], cell_size_deg: float = 1.0) -> None:
+        self.zones = list(zones)
+        self._cell_size = cell_size_deg
+        self._n_cols = math.ceil(360 / cell_size_deg)
+
+        # cell key -> zone indices, in ascending order so first-match order is kept
+        self._grid: dict[int, list[int]] = defaultdict(list)
+        for i, zone in enumerate(self.zones):
+            for key in self._zone_cells(zone):
+                self._grid[key].append(i)
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    def _zone_cells(self, zone: dict[str, Any]) -> set[int]:
+        """Grid cells overlapped by the zone's bounding box."""
+        R = 6371  # Earth radius in km
+        margin = 1e-6  # degrees; keeps boundary points from slipping past the box
+
+        angular = zone["radius"] / R
+        dlat = math.degrees(angular) + margin
+        lat_min = max(zone["lat"] - dlat, -90.0)
+        lat_max = min(zone["lat"] + dlat, 90.0)
+
+        # Widest longitude span of a circle of this angular radius. Zones touching a
+        # pole (or big enough to wrap) cover every column.
+        lat_rad = math.radians(zone["lat"])
+        if lat_min <= -90 or lat_max >= 90 or math.sin(angular) >= math.cos(lat_rad):
+            cols = range(self._n_cols)
+        else:
+            dlon = math.degrees(math.asin(math.sin(angular) / math.cos(lat_rad))) + margin
+            lon = normalize_longitude(zone["lon"])
+            first = math.floor((lon - dlon + 180) / self._cell_size)
+            last = math.floor((lon + dlon + 180) / self._cell_size)
+            cols = range(first, last + 1)
+
+        first_row = math.floor((lat_min + 90) / self._cell_size)
+        last_row = math.floor((lat_max + 90) / self._cell_size)
+        return {
+            row * self._n_cols + col % self._n_cols
+            for row in range(first_row, last_row + 1)
+            for col in cols
+        }
+
+    def _cell_keys(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        rows = np.floor((lats + 90) / self._cell_size).astype(np.int64)
+        cols = np.floor((normalize_longitude(lons) + 180) / self._cell_size).astype(np.int64)
+        return rows * self._n_cols + cols % self._n_cols
+
+    def match(self, lat: float, lon: float) -> dict[str, Any] | None:
+        """Return the first zone whose radius contains (lat, lon), or None."""
+        row = math.floor((lat + 90) / self._cell_size)
+        col = math.floor((normalize_longitude(lon) + 180) / self._cell_size)
+        for i in self._grid.get(row * self._n_cols + col % self._n_cols, ()):
+            zone = self.zones[i]
+            if haversine_distance(lat, lon, zone["lat"], zone["lon"]) <= zone["radius"]:
+                return zone
+        return None
+
+    def match_many(self, lats: ArrayLike, lons: ArrayLike) -> np.ndarray:
+        """
+        Batch version of match. Returns an int array with, for each point, the index
+        into self.zones of its first matching zone, or -1 if it's in no zone.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        result = np.full(lats.shape, -1, dtype=np.intp)
+        if not self.zones or lats.size == 0:
+            return result
+
+        # Group points by grid cell so each cell's candidate zones are tested once
+        # against all of its points.
+        keys = self._cell_keys(lats.ravel(), lons.ravel())
+        order = np.argsort(keys, kind="stable")
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+
+        flat_result = result.ravel()
+        flat_lats, flat_lons = lats.ravel(), lons.ravel()
+        for key, start, end in zip(unique_keys.tolist(), starts, ends):
+            candidates = self._grid.get(key)
+            if not candidates:
+                continue
+            pending = order[start:end]
+            for i in candidates:
+                inside = points_within_zone(flat_lats[pending], flat_lons[pending], self.zones[i])
+                flat_result[pending[inside]] = i
+                pending = pending[~inside]
+                if pending.size == 0:
+                    break
+
+        return flat_result.reshape(lats.shape)
+
+    def obfuscate_many(
+        self, lats: ArrayLike, lons: ArrayLike
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Displace every point that falls in a zone by that zone's displacement and bearing.
+        Returns (new_lats, new_lons, zone_ids); points outside all zones are unchanged
+        and have zone_id -1.
+        """
+        lats = np.array(lats, dtype=np.float64)
+        lons = np.array(lons, dtype=np.float64)
+        zone_ids = self.match_many(lats, lons)
+        hit = zone_ids >= 0
+        if hit.any():
+            displacements = np.array([z["displacement"] for z in self.zones], dtype=np.float64)
+            bearings = np.array([z["bearing"] for z in self.zones], dtype=np.float64)
+            lats[hit], lons[hit] = calculate_destination_points(
+                lats[hit], lons[hit], displacements[zone_ids[hit]], bearings[zone_ids[hit]]
+            )
+        return lats, lons, zone_ids
+
+
 def load_sensitive_zones() -> list[dict[str, Any]]:
     """
     Load sensitive zones from $PRIVATE_DATA_DIR/sensitive_locations.json.
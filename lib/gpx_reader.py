@@ -0,0 +1,82 @@
+"""
+Streaming GPX 1.1 reader.
+
+ET.parse builds the whole document in memory, which is fine for FindPenguins
+exports but not for dense Garmin activities with millions of <trkpt>s. iter_gpx
+walks the file with iterparse and yields one record per element of interest,
+dropping each element from the tree as soon as it has been read, so the reader
+itself stays flat regardless of file size. Whatever a caller keeps from the
+records (e.g. a segment buffered for obfuscation) is on the caller.
+
+Records are (kind, data) tuples:
+
+  ("metadata", {"name": str | None})
+  ("wpt", {"lat": float, "lon": float, "name": str | None, "desc": str | None,
+           "time": str | None})
+  ("trkpt", {"lat": float, "lon": float, "time": str | None,
+             "transport": str | None})
+  ("trkseg_end", {})    -- emitted after the last <trkpt> of each <trkseg>
+
+Records come out in document order. In a valid GPX 1.1 file that means metadata
+first, then every waypoint, then the tracks.
+"""
+
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+GPX_NS = "http://www.topografix.com/GPX/1/1"
+NS = {"gpx": GPX_NS}
+
+_METADATA = f"{{{GPX_NS}}}metadata"
+_WPT = f"{{{GPX_NS}}}wpt"
+_TRK = f"{{{GPX_NS}}}trk"
+_TRKSEG = f"{{{GPX_NS}}}trkseg"
+_TRKPT = f"{{{GPX_NS}}}trkpt"
+
+# Elements whose finished children can be dropped from the tree once read
+_CONTAINERS = {f"{{{GPX_NS}}}gpx", _TRK, _TRKSEG}
+
+
+def _child_text(elem: ET.Element, path: str) -> str | None:
+    child = elem.find(path, NS)
+    return child.text if child is not None else None
+
+
+def iter_gpx(source: str | Path) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Stream records out of a GPX file. See the module docstring for the record format."""
+    stack: list[ET.Element] = []
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        tag = elem.tag
+
+        if tag == _TRKPT:
+            yield "trkpt", {
+                "lat": float(elem.get("lat")),
+                "lon": float(elem.get("lon")),
+                "time": _child_text(elem, "gpx:time"),
+                "transport": _child_text(elem, "gpx:extension/gpx:transport") or None,
+            }
+        elif tag == _WPT:
+            yield "wpt", {
+                "lat": float(elem.get("lat")),
+                "lon": float(elem.get("lon")),
+                "name": _child_text(elem, "gpx:name"),
+                "desc": _child_text(elem, "gpx:desc"),
+                "time": _child_text(elem, "gpx:time"),
+            }
+        elif tag == _TRKSEG:
+            yield "trkseg_end", {}
+        elif tag == _METADATA:
+            yield "metadata", {"name": _child_text(elem, "gpx:name")}
+
+        # Drop finished top-level, track and segment children so the tree never
+        # holds more than the element currently being read.
+        if stack and stack[-1].tag in _CONTAINERS:
+            stack[-1].remove(elem)
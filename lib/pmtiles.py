@@ -0,0 +1,269 @@
+"""
+Minimal PMTiles v3 archive writer (and tile reader, for tests and spot checks).
+
+PMTiles packs a whole tile pyramid into one file that a static host can serve
+with HTTP range requests: a fixed 127-byte header, a root directory, JSON
+metadata, optional leaf directories, then the tile data. Tiles are addressed by
+a Hilbert-curve tile ID, so directories stay small and nearby tiles sit next to
+each other on disk.
+
+Spec: https://github.com/protomaps/PMTiles/blob/main/spec/v3/spec.md
+"""
+
+import gzip
+import json
+import struct
+from pathlib import Path
+from typing import Any
+
+from lib.geojson_writer import write_bytes_atomic
+
+HEADER_SIZE = 127
+# The header and root directory must fit in the first 16 KiB so a client can
+# fetch both with one request.
+_ROOT_BUDGET = 16384 - HEADER_SIZE
+
+COMPRESSION_NONE = 1
+COMPRESSION_GZIP = 2
+TILE_TYPE_MVT = 1
+
+
+def zxy_to_tile_id(z: int, x: int, y: int) -> int:
+    """Hilbert-curve tile ID: all tiles of lower zooms first, then the Hilbert index within z."""
+    n = 1 << z
+    if not (0 <= x < n and 0 <= y < n):
+        raise ValueError(f"Tile {z}/{x}/{y} is out of range")
+    tile_id = ((1 << (2 * z)) - 1) // 3
+    s = n >> 1
+    while s:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        tile_id += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = n - 1 - x, n - 1 - y
+            x, y = y, x
+        s >>= 1
+    return tile_id
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _read_varint(buf: bytes, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the archive byte-identical across runs
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+# Directory entry: (tile_id, offset, length, run_length). run_length 0 marks a
+# pointer to a leaf directory rather than tile data.
+Entry = tuple[int, int, int, int]
+
+
+def _serialize_directory(entries: list[Entry]) -> bytes:
+    """Column-oriented varint encoding from the spec, gzipped."""
+    out = bytearray(_varint(len(entries)))
+    last_id = 0
+    for tile_id, _, _, _ in entries:
+        out += _varint(tile_id - last_id)
+        last_id = tile_id
+    for _, _, _, run_length in entries:
+        out += _varint(run_length)
+    for _, _, length, _ in entries:
+        out += _varint(length)
+    for i, (_, offset, _, _) in enumerate(entries):
+        prev = entries[i - 1] if i else None
+        if prev is not None and offset == prev[1] + prev[2]:
+            out += _varint(0)  # contiguous with the previous entry
+        else:
+            out += _varint(offset + 1)
+    return _gzip(bytes(out))
+
+
+def _deserialize_directory(data: bytes) -> list[Entry]:
+    buf = gzip.decompress(data)
+    n, pos = _read_varint(buf, 0)
+    ids, runs, lengths, offsets = [], [], [], []
+    last_id = 0
+    for _ in range(n):
+        delta, pos = _read_varint(buf, pos)
+        last_id += delta
+        ids.append(last_id)
+    for column in (runs, lengths):
+        for _ in range(n):
+            value, pos = _read_varint(buf, pos)
+            column.append(value)
+    for i in range(n):
+        value, pos = _read_varint(buf, pos)
+        offsets.append(offsets[i - 1] + lengths[i - 1] if value == 0 else value - 1)
+    return list(zip(ids, offsets, lengths, runs))
+
+
+def _build_directories(entries: list[Entry]) -> tuple[bytes, bytes]:
+    """
+    Returns (root directory, leaf directories). Small archives get a single root
+    directory; larger ones are split into leaves, growing the leaf size until the
+    root fits in its budget.
+    """
+    root = _serialize_directory(entries)
+    if len(root) <= _ROOT_BUDGET:
+        return root, b""
+
+    leaf_size = 4096
+    while True:
+        root_entries: list[Entry] = []
+        leaves = bytearray()
+        for start in range(0, len(entries), leaf_size):
+            chunk = entries[start : start + leaf_size]
+            leaf = _serialize_directory(chunk)
+            root_entries.append((chunk[0][0], len(leaves), len(leaf), 0))
+            leaves += leaf
+        root = _serialize_directory(root_entries)
+        if len(root) <= _ROOT_BUDGET:
+            return root, bytes(leaves)
+        leaf_size = int(leaf_size * 1.2)
+
+
+def _e7(degrees: float) -> int:
+    return int(round(degrees * 10_000_000))
+
+
+def write_pmtiles(
+    path: str | Path,
+    tiles: dict[tuple[int, int, int], bytes],
+    metadata: dict[str, Any],
+    bounds: tuple[float, float, float, float],
+    tile_type: int = TILE_TYPE_MVT,
+    tile_compression: int = COMPRESSION_GZIP,
+) -> int:
+    """
+    Atomically write a PMTiles archive.
+
+    tiles maps (z, x, y) to already-encoded (and already-compressed, per
+    tile_compression) tile bytes. bounds is (min_lon, min_lat, max_lon, max_lat).
+    Identical tiles are stored once. Returns the archive size in bytes.
+    """
+    if not tiles:
+        raise ValueError("No tiles to write")
+
+    by_id = sorted((zxy_to_tile_id(z, x, y), data) for (z, x, y), data in tiles.items())
+
+    entries: list[Entry] = []
+    tile_data = bytearray()
+    offsets: dict[bytes, int] = {}
+    for tile_id, data in by_id:
+        offset = offsets.get(data)
+        if offset is None:
+            offset = offsets[data] = len(tile_data)
+            tile_data += data
+        last = entries[-1] if entries else None
+        if (
+            last is not None
+            and last[1] == offset
+            and last[0] + last[3] == tile_id
+        ):
+            # Consecutive identical tiles share one run-length entry
+            entries[-1] = (last[0], last[1], last[2], last[3] + 1)
+        else:
+            entries.append((tile_id, offset, len(data), 1))
+
+    root, leaves = _build_directories(entries)
+    meta = _gzip(json.dumps(metadata, separators=(",", ":")).encode("utf-8"))
+
+    root_offset = HEADER_SIZE
+    meta_offset = root_offset + len(root)
+    leaves_offset = meta_offset + len(meta)
+    data_offset = leaves_offset + len(leaves)
+
+    zooms = [z for z, _, _ in tiles]
+    min_lon, min_lat, max_lon, max_lat = bounds
+    header = struct.pack(
+        "<7sB8QQQQBBBBBBiiiiBii",
+        b"PMTiles",
+        3,
+        root_offset, len(root),
+        meta_offset, len(meta),
+        leaves_offset, len(leaves),
+        data_offset, len(tile_data),
+        len(tiles),  # addressed tiles
+        len(entries),  # tile entries
+        len(offsets),  # distinct tile contents
+        1,  # clustered: tile data is in tile ID order
+        COMPRESSION_GZIP,  # internal (directory/metadata) compression
+        tile_compression,
+        tile_type,
+        min(zooms),
+        max(zooms),
+        _e7(min_lon), _e7(min_lat), _e7(max_lon), _e7(max_lat),
+        min(zooms),
+        _e7((min_lon + max_lon) / 2), _e7((min_lat + max_lat) / 2),
+    )
+    assert len(header) == HEADER_SIZE
+
+    data = header + root + meta + leaves + bytes(tile_data)
+    write_bytes_atomic(path, data)
+    return len(data)
+
+
+def read_header(data: bytes) -> dict[str, Any]:
+    """Decode the fixed-size header of an in-memory PMTiles archive."""
+    fields = struct.unpack("<7sB8QQQQBBBBBBiiiiBii", data[:HEADER_SIZE])
+    if fields[0] != b"PMTiles" or fields[1] != 3:
+        raise ValueError("Not a PMTiles v3 archive")
+    keys = (
+        "root_offset", "root_length", "metadata_offset", "metadata_length",
+        "leaf_offset", "leaf_length", "data_offset", "data_length",
+        "addressed_tiles", "tile_entries", "tile_contents", "clustered",
+        "internal_compression", "tile_compression", "tile_type", "min_zoom", "max_zoom",
+        "min_lon_e7", "min_lat_e7", "max_lon_e7", "max_lat_e7",
+        "center_zoom", "center_lon_e7", "center_lat_e7",
+    )
+    return dict(zip(keys, fields[2:]))
+
+
+def read_metadata(data: bytes) -> dict[str, Any]:
+    header = read_header(data)
+    start = header["metadata_offset"]
+    return json.loads(gzip.decompress(data[start : start + header["metadata_length"]]))
+
+
+def read_tile(data: bytes, z: int, x: int, y: int) -> bytes | None:
+    """Look up one tile (still tile-compressed) in an in-memory archive; None if absent."""
+    header = read_header(data)
+    tile_id = zxy_to_tile_id(z, x, y)
+    start, length = header["root_offset"], header["root_length"]
+    for _ in range(4):  # root + leaves; the spec allows at most three levels
+        entries = _deserialize_directory(data[start : start + length])
+        found = None
+        for entry in entries:
+            if entry[0] > tile_id:
+                break
+            found = entry
+        if found is None:
+            return None
+        entry_id, offset, entry_length, run_length = found
+        if run_length == 0:
+            start, length = header["leaf_offset"] + offset, entry_length
+            continue
+        if tile_id >= entry_id + run_length:
+            return None
+        begin = header["data_offset"] + offset
+        return data[begin : begin + entry_length]
+    return None
@@ -0,0 +1,84 @@
+"""
+Polyline simplification for map output.
+
+Tracks are simplified with Douglas-Peucker on a local equirectangular projection,
+so tolerances are in meters. The projection is only approximate over very long
+lines (e.g. flights), which is fine for deciding which points are visible at a
+given zoom.
+"""
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+EARTH_RADIUS_M = 6371000
+# Ground resolution at the equator for zoom 0 with 256px web-map tiles
+METERS_PER_PIXEL_Z0 = 156543.03392
+
+
+def zoom_tolerance_m(zoom: float, pixels: float = 1.0) -> float:
+    """Tolerance (meters) equivalent to `pixels` screen pixels at a web-map zoom level."""
+    return METERS_PER_PIXEL_Z0 * pixels / 2**zoom
+
+
+def _project(lats: np.ndarray, lons: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Project to local x/y meters around the line's mean latitude."""
+    lat0 = np.radians(lats.mean())
+    # Unwrap so a line crossing the antimeridian doesn't jump 360 degrees
+    lons = np.unwrap(lons, period=360)
+    x = EARTH_RADIUS_M * np.radians(lons) * np.cos(lat0)
+    y = EARTH_RADIUS_M * np.radians(lats)
+    return x, y
+
+
+def douglas_peucker_mask(
+    lats: ArrayLike,
+    lons: ArrayLike,
+    tolerance_m: float,
+    keep: ArrayLike | None = None,
+) -> np.ndarray:
+    """
+    Boolean mask of the points to keep when simplifying a polyline to tolerance_m.
+
+    The first and last points, and any point flagged in `keep` (e.g. waypoint
+    anchors), are always kept; the line is simplified independently between them.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    n = len(lats)
+    if n <= 2 or tolerance_m <= 0:
+        return np.ones(n, dtype=bool)
+
+    mask = np.zeros(n, dtype=bool)
+    mask[[0, n - 1]] = True
+    if keep is not None:
+        mask |= np.asarray(keep, dtype=bool)
+
+    x, y = _project(lats, lons)
+
+    # Iterative rather than recursive, so million-point tracks can't hit the
+    # recursion limit.
+    fixed = np.flatnonzero(mask)
+    stack = [(a, b) for a, b in zip(fixed[:-1].tolist(), fixed[1:].tolist()) if b - a > 1]
+    while stack:
+        a, b = stack.pop()
+        dx, dy = x[b] - x[a], y[b] - y[a]
+        px, py = x[a + 1 : b] - x[a], y[a + 1 : b] - y[a]
+        seg_len2 = dx * dx + dy * dy
+        if seg_len2 == 0:
+            dist = np.hypot(px, py)
+        else:
+            # Distance to the segment (not the infinite line), so out-and-back
+            # stretches aren't collapsed.
+            t = np.clip((px * dx + py * dy) / seg_len2, 0.0, 1.0)
+            dist = np.hypot(px - t * dx, py - t * dy)
+
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_m:
+            k = a + 1 + i
+            mask[k] = True
+            if k - a > 1:
+                stack.append((a, k))
+            if b - k > 1:
+                stack.append((k, b))
+
+    return mask
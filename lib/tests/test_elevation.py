@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import srtm
+
+from lib.elevation import ElevationProvider, srtm_tile_name
+
+SIDE = 121  # a small 30 arc-second grid; real tiles are 1201 or 3601 posts per side
+
+
+@pytest.fixture
+def tile_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    grid = rng.integers(0, 3000, (SIDE, SIDE)).astype(">i2")
+    grid[10, 10] = -32768  # void
+    grid.tofile(tmp_path / "N45W080.hgt")
+    return tmp_path, grid
+
+
+def test_tile_names():
+    assert srtm_tile_name(45.5, -79.5) == "N45W080.hgt"
+    assert srtm_tile_name(-0.5, 0.5) == "S01E000.hgt"
+
+
+def test_matches_srtm_library(tile_dir):
+    path, _ = tile_dir
+    reference = srtm.get_data(local_cache_dir=str(path))
+    provider = ElevationProvider(cache_dir=path, cache_decimals=12, download=False)
+
+    rng = np.random.default_rng(1)
+    lats = rng.uniform(45, 46, 2000)
+    lons = rng.uniform(-80, -79, 2000)
+    expected = [reference.get_elevation(lat, lon) for lat, lon in zip(lats, lons)]
+
+    result = provider.elevations(lats, lons)
+    assert [None if np.isnan(v) else v for v in result.tolist()] == expected
+
+
+def test_void_and_missing_tiles_are_nan(tile_dir):
+    path, _ = tile_dir
+    provider = ElevationProvider(cache_dir=path, cache_decimals=12, download=False)
+    n = SIDE - 1
+    void_lat, void_lon = 46 - 10.5 / n, -80 + 10.5 / n
+    assert provider.elevation(void_lat, void_lon) is None
+    assert provider.elevation(10.0, 10.0) is None  # no tile on disk
+
+
+def test_bilinear_interpolation(tile_dir):
+    path, grid = tile_dir
+    provider = ElevationProvider(
+        cache_dir=path, interpolate=True, cache_decimals=12, download=False
+    )
+    n = SIDE - 1
+    # Halfway between posts (50, 60) and (50, 61)
+    lat, lon = 46 - 50 / n, -80 + 60.5 / n
+    expected = (int(grid[50, 60]) + int(grid[50, 61])) / 2
+    assert provider.elevation(lat, lon) == pytest.approx(expected, abs=0.1)
+
+
+def test_tiles_are_loaded_once_and_results_cached(tile_dir, monkeypatch):
+    path, _ = tile_dir
+    provider = ElevationProvider(cache_dir=path, download=False)
+    loads = []
+    original = provider._load_tile
+    monkeypatch.setattr(provider, "_load_tile", lambda name: loads.append(name) or original(name))
+
+    first = provider.elevations([45.2, 45.3, 45.2], [-79.2, -79.3, -79.2])
+    second = provider.elevations([45.2], [-79.2])
+    assert loads == ["N45W080.hgt"]
+    assert first[0] == first[2] == second[0]
+
+
+def test_points_either_side_of_a_post_boundary(tile_dir):
+    path, _ = tile_dir
+    reference = srtm.get_data(local_cache_dir=str(path))
+    # Both round to -79.5 at 5 decimals, but fall on different grid posts
+    lat, lons = 45.5, [-79.500002, -79.499998]
+    expected = [reference.get_elevation(lat, lon) for lon in lons]
+    assert expected[0] != expected[1]
+
+    provider = ElevationProvider(cache_dir=path, download=False)
+    assert [provider.elevation(lat, lon) for lon in lons] == expected
+    assert provider.elevations([lat, lat], lons).tolist() == expected
+
+    # Rounded cache keys: exact lookups, but later points may reuse a nearby entry
+    rounded = ElevationProvider(cache_dir=path, cache_decimals=5, download=False)
+    assert rounded.elevations([lat, lat], lons).tolist() == expected
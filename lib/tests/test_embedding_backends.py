@@ -0,0 +1,43 @@
+"""
+Parity of the ONNX backends with PyTorch. Needs optimum[onnxruntime] and the
+model (downloaded on first run), so it is skipped when either is unavailable.
+"""
+
+import numpy as np
+import pytest
+
+from lib.embedding_model import MODEL_NAME, load_sentence_transformer
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum")
+
+SENTENCES = [
+    "ancient temples and history",
+    "relaxing beaches with clear water",
+    "A narrow street market in the old town, with stalls selling spices and lanterns.",
+    "Snow-capped peaks above a glacier lake at sunrise",
+    "penguins",
+]
+
+# Minimum cosine similarity of each backend's vectors to the PyTorch vectors
+THRESHOLDS = {"onnx": 0.9999, "onnx-int8": 0.98}
+
+
+@pytest.fixture(scope="module")
+def torch_vectors():
+    try:
+        model = load_sentence_transformer(MODEL_NAME, "torch")
+    except OSError as e:
+        pytest.skip(f"model unavailable: {e}")
+    return model.encode(SENTENCES, normalize_embeddings=True)
+
+
+@pytest.mark.parametrize("backend", sorted(THRESHOLDS))
+def test_backend_matches_torch(backend, torch_vectors, tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_ONNX_DIR", str(tmp_path))
+    vectors = load_sentence_transformer(MODEL_NAME, backend).encode(
+        SENTENCES, normalize_embeddings=True
+    )
+    assert vectors.shape == torch_vectors.shape
+    cosine = np.sum(vectors * torch_vectors, axis=1)
+    assert cosine.min() >= THRESHOLDS[backend], cosine
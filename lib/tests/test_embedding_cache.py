@@ -0,0 +1,71 @@
+import numpy as np
+
+from lib.embedding_cache import EmbeddingCache, LazyCache, default_cache_path, text_key
+
+
+class CountingEncoder:
+    def __init__(self) -> None:
+        self.seen: list[str] = []
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.seen.extend(texts)
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_only_uncached_texts_are_encoded(tmp_path):
+    cache = EmbeddingCache(tmp_path / "e.sqlite3", "model-a")
+    encoder = CountingEncoder()
+
+    first = cache.encode(["a cat", "banana", "a cat"], encoder)
+    assert encoder.seen == ["a cat", "banana"]
+    assert first.shape == (3, 3)
+    assert np.array_equal(first[0], first[2])
+
+    second = cache.encode(["banana", "a\ncat ", "new"], encoder)
+    assert encoder.seen == ["a cat", "banana", "new"]  # whitespace differences are cache hits
+    assert np.array_equal(second[0], first[1])
+    assert np.array_equal(second[1], first[0])
+
+
+def test_persists_and_is_keyed_by_model(tmp_path):
+    path = tmp_path / "e.sqlite3"
+    cache = EmbeddingCache(path, "model-a")
+    cache.encode(["hello"], CountingEncoder())
+    cache.close()
+
+    reopened = EmbeddingCache(path, "model-a")
+    assert len(reopened) == 1
+    assert reopened.get_many(["hello", "other"])[1] is None
+    assert reopened.get_many(["hello"])[0] is not None
+    assert EmbeddingCache(path, "model-b").get_many(["hello"]) == [None]
+    assert text_key("model-a", "hello") != text_key("model-b", "hello")
+
+
+def test_cache_path_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+    assert default_cache_path() is None
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "x.sqlite3"))
+    assert default_cache_path() == tmp_path / "x.sqlite3"
+
+
+def test_lazy_cache_opens_on_first_use(monkeypatch, tmp_path):
+    path = tmp_path / "e.sqlite3"
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(path))
+    cache = LazyCache("model-a")
+    assert not path.exists()
+
+    encoder = CountingEncoder()
+    cache.encode(["hello", "hello"], encoder)
+    assert path.exists()
+    cache.close()
+    cache.encode(["hello"], encoder)  # reopened, served from disk
+    assert encoder.seen == ["hello"]
+
+
+def test_lazy_cache_disabled(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+    cache = LazyCache("model-a")
+    encoder = CountingEncoder()
+    cache.encode(["hello", "hello"], encoder)
+    assert cache.get() is None
+    assert encoder.seen == ["hello", "hello"]
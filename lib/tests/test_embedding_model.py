@@ -0,0 +1,74 @@
+import threading
+
+import numpy as np
+
+import pytest
+
+from lib.embedding_model import LazyModel, default_backend, get_model
+
+
+class FakeModel:
+    def encode(self, sentences, **kwargs):
+        return np.array([len(s) for s in sentences] if isinstance(sentences, list) else len(sentences))
+
+
+def test_loads_once_on_first_encode():
+    loads = []
+
+    def loader(name, backend):
+        loads.append(name)
+        return FakeModel()
+
+    model = LazyModel("fake", loader=loader)
+    assert not model.loaded and loads == []
+
+    threads = [threading.Thread(target=model.encode, args=(["abc"],)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loads == ["fake"]
+    assert model.encode(["abcd", "ab"]).tolist() == [4, 2]
+
+
+def test_warm_up_loads_in_background():
+    model = LazyModel("fake", loader=lambda name, backend: FakeModel())
+    model.warm_up().join()
+    assert model.loaded
+    assert model.load_seconds is not None
+
+
+def test_failed_load_is_retried():
+    attempts = []
+
+    def loader(name, backend):
+        attempts.append(name)
+        if len(attempts) == 1:
+            raise OSError("offline")
+        return FakeModel()
+
+    model = LazyModel("fake", loader=loader)
+    model.warm_up().join()
+    assert not model.loaded
+    assert model.encode("abc") == 3
+    assert len(attempts) == 2
+
+
+def test_get_model_is_shared_and_lazy():
+    assert get_model("some/model") is get_model("some/model")
+    assert not get_model("some/model").loaded
+
+
+def test_backend_from_env(monkeypatch):
+    monkeypatch.delenv("EMBEDDING_BACKEND", raising=False)
+    assert default_backend() == "torch"
+    monkeypatch.setenv("EMBEDDING_BACKEND", "ONNX-int8")
+    assert default_backend() == "onnx-int8"
+    model = get_model("some/model")
+    assert model.backend == "onnx-int8"
+    assert model is not get_model("some/model", "torch")
+    assert model.cache_key != get_model("some/model", "torch").cache_key
+    assert get_model("some/model", "onnx").cache_key == "some/model"
+    monkeypatch.setenv("EMBEDDING_BACKEND", "tensorflow")
+    with pytest.raises(ValueError):
+        default_backend()
@@ -0,0 +1,107 @@
+import gzip
+import json
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+from lib.geojson_writer import (
+    OutputFormat,
+    output_paths,
+    quantize_coordinates,
+    size_report,
+    write_geojson,
+)
+
+GEOJSON = {
+    "type": "FeatureCollection",
+    "features": [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [-75.123456789, 40.987654321]},
+            "properties": {"title": "Point", "global_count": 3.14159265},
+        },
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "LineString",
+                "coordinates": [[10.11111111, 1.22222222], [11.33333333, 2.44444444]],
+            },
+            "properties": {"transport": None},
+        },
+    ],
+}
+
+
+def test_default_format_matches_indented_json(tmp_path: Path) -> None:
+    out = tmp_path / "out.geojson"
+    written = write_geojson(out, GEOJSON)
+    assert out.read_text(encoding="utf-8") == json.dumps(GEOJSON, indent=2)
+    assert written == [(str(out), out.stat().st_size)]
+
+
+def test_compact_is_smaller_and_equivalent(tmp_path: Path) -> None:
+    out = tmp_path / "out.geojson"
+    write_geojson(out, GEOJSON, OutputFormat(compact=True))
+    text = out.read_text(encoding="utf-8")
+    assert "\n" not in text
+    assert json.loads(text) == GEOJSON
+    assert len(text) < len(json.dumps(GEOJSON, indent=2))
+
+
+def test_quantize_rounds_coordinates_only() -> None:
+    rounded = quantize_coordinates(GEOJSON, 3)
+    assert rounded["features"][0]["geometry"]["coordinates"] == [-75.123, 40.988]
+    assert rounded["features"][1]["geometry"]["coordinates"] == [[10.111, 1.222], [11.333, 2.444]]
+    # Properties and the input are left alone
+    assert rounded["features"][0]["properties"]["global_count"] == 3.14159265
+    assert GEOJSON["features"][0]["geometry"]["coordinates"] == [-75.123456789, 40.987654321]
+
+
+def test_gzip_sidecar(tmp_path: Path) -> None:
+    out = tmp_path / "out.geojson"
+    fmt = OutputFormat(compact=True, compress=("gzip", "gzip"))
+    written = write_geojson(out, GEOJSON, fmt)
+
+    assert [p for p, _ in written] == output_paths(out, fmt) == [str(out), f"{out}.gz"]
+    assert gzip.decompress(Path(f"{out}.gz").read_bytes()) == out.read_bytes()
+
+
+def test_no_temp_files_left_behind(tmp_path: Path) -> None:
+    write_geojson(tmp_path / "out.geojson", GEOJSON, OutputFormat(compress=("gzip",)))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.geojson", "out.geojson.gz"]
+
+
+def test_size_report_mentions_savings(tmp_path: Path) -> None:
+    fmt = OutputFormat(compact=True, precision=5)
+    written = write_geojson(tmp_path / "out.geojson", GEOJSON, fmt)
+    report = size_report(GEOJSON, written, fmt)
+    assert "out.geojson" in report
+    assert "saved" in report
+    # Nothing to compare against in the default format
+    assert "saved" not in size_report(GEOJSON, written, OutputFormat())
+
+
+def test_output_gets_default_permissions(tmp_path: Path) -> None:
+    umask = os.umask(0o022)
+    try:
+        out = tmp_path / "out.geojson"
+        write_geojson(out, GEOJSON, OutputFormat(compress=("gzip",)))
+        assert stat.S_IMODE(out.stat().st_mode) == 0o644
+        assert stat.S_IMODE(Path(f"{out}.gz").stat().st_mode) == 0o644
+
+        out.chmod(0o640)
+        write_geojson(out, GEOJSON)
+        assert stat.S_IMODE(out.stat().st_mode) == 0o640
+    finally:
+        os.umask(umask)
+
+
+def test_missing_brotli_fails_before_writing(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setitem(sys.modules, "brotli", None)  # import brotli raises ImportError
+    out = tmp_path / "out.geojson"
+    with pytest.raises(SystemExit):
+        write_geojson(out, GEOJSON, OutputFormat(compress=("gzip", "brotli")))
+    assert list(tmp_path.iterdir()) == []
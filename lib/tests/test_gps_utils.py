@@ -1,8 +1,18 @@
+import random
+
+import numpy as np
 import pytest
 
 from lib.gps_utils import (
+    ROUND_TO,
+    SensitiveZoneIndex,
+    _round_many,
     calculate_destination_point,
+    calculate_destination_points,
+    compute_obfuscated_location,
+    compute_obfuscated_locations,
     haversine_distance,
+    haversine_many,
     normalize_longitude,
 )
 
@@ -41,3 +51,165 @@ def test_calculate_destination_deterministic():
     result1 = calculate_destination_point(40.0, -75.0, 5.0, 90.0)
     result2 = calculate_destination_point(40.0, -75.0, 5.0, 90.0)
     assert result1 == result2
+
+
+# --- Vectorized counterparts ---
+
+
+def _random_points(n: int, seed: int = 0) -> tuple[list[float], list[float]]:
+    rng = random.Random(seed)
+    lats = [rng.uniform(-85, 85) for _ in range(n)]
+    lons = [rng.uniform(-180, 180) for _ in range(n)]
+    return lats, lons
+
+
+def test_haversine_many_matches_scalar():
+    lats, lons = _random_points(1000)
+    result = haversine_many(lats, lons, 40.0, -75.0)
+    expected = [haversine_distance(lat, lon, 40.0, -75.0) for lat, lon in zip(lats, lons)]
+    assert result.shape == (1000,)
+    assert result.tolist() == pytest.approx(expected, rel=1e-12)
+
+
+def test_haversine_many_broadcasts_over_centers():
+    # One point against several zone centers at once
+    centers_lat = np.array([40.0, 34.0522, 10.0])
+    centers_lon = np.array([-75.0, -118.2437, 20.0])
+    result = haversine_many(40.7128, -74.0060, centers_lat, centers_lon)
+    expected = [
+        haversine_distance(40.7128, -74.0060, lat, lon)
+        for lat, lon in zip(centers_lat, centers_lon)
+    ]
+    assert result.tolist() == pytest.approx(expected, rel=1e-12)
+
+
+def test_normalize_longitude_accepts_arrays():
+    result = normalize_longitude(np.array([181.0, -181.0, 90.0]))
+    assert result.tolist() == pytest.approx([-179.0, 179.0, 90.0])
+
+
+def test_calculate_destination_points_matches_scalar_exactly():
+    # Rounded to ROUND_TO, so outputs should be identical to the scalar version
+    lats, lons = _random_points(1000, seed=1)
+    rng = random.Random(2)
+    distances = [rng.uniform(0, 20) for _ in lats]
+    bearings = [rng.uniform(0, 360) for _ in lats]
+
+    new_lats, new_lons = calculate_destination_points(lats, lons, distances, bearings)
+    expected = [
+        calculate_destination_point(lat, lon, d, b)
+        for lat, lon, d, b in zip(lats, lons, distances, bearings)
+    ]
+    assert list(zip(new_lats.tolist(), new_lons.tolist())) == expected
+
+
+def test_round_many_matches_round_on_halves():
+    # Half-way values at ROUND_TO decimals (a trailing 5), where np.round (half to
+    # even after scaling) and round() (correctly rounded) disagree for many of them
+    rng = random.Random(4)
+    values = [float(f"{rng.uniform(-180, 180):.{ROUND_TO}f}5") for _ in range(2000)]
+    assert _round_many(values).tolist() == [round(v, ROUND_TO) for v in values]
+    assert _round_many(values[0]) == round(values[0], ROUND_TO)
+
+
+def test_calculate_destination_points_wraps_longitude():
+    # Heading east across the antimeridian
+    new_lats, new_lons = calculate_destination_points([0.0], [179.99], 10.0, 90.0)
+    assert (new_lats[0], new_lons[0]) == calculate_destination_point(0.0, 179.99, 10.0, 90.0)
+    assert new_lons[0] < 0
+
+
+def test_compute_obfuscated_locations_matches_scalar():
+    config = {"displacement": 6.2, "bearing": 137}
+    lats, lons = _random_points(100, seed=3)
+    new_lats, new_lons = compute_obfuscated_locations(config, lats, lons)
+    expected = [compute_obfuscated_location(config, lat, lon) for lat, lon in zip(lats, lons)]
+    assert list(zip(new_lats.tolist(), new_lons.tolist())) == expected
+
+
+# --- SensitiveZoneIndex ---
+
+
+def _zone(key: str, lat: float, lon: float, radius: float) -> dict:
+    return {"key": key, "lat": lat, "lon": lon, "radius": radius, "displacement": 3.0, "bearing": 45.0}
+
+
+def _linear_scan(lat: float, lon: float, zones: list[dict]) -> int:
+    for i, zone in enumerate(zones):
+        if haversine_distance(lat, lon, zone["lat"], zone["lon"]) <= zone["radius"]:
+            return i
+    return -1
+
+
+def test_zone_index_match_inside_and_outside():
+    zone = _zone("A", 40.0, -75.0, 5)
+    index = SensitiveZoneIndex([zone])
+    assert index.match(*calculate_destination_point(40.0, -75.0, 4.9, 30.0)) is zone
+    assert index.match(*calculate_destination_point(40.0, -75.0, 5.1, 30.0)) is None
+
+
+def test_zone_index_overlapping_zones_first_wins():
+    first = _zone("First", 40.0, -75.0, 10)
+    second = _zone("Second", 40.01, -75.01, 10)
+    index = SensitiveZoneIndex([first, second])
+    assert index.match(40.005, -75.005) is first
+    assert index.match_many([40.005], [-75.005]).tolist() == [0]
+
+
+def test_zone_index_zone_spanning_antimeridian():
+    zone = _zone("Fiji-ish", -17.0, 179.95, 20)
+    index = SensitiveZoneIndex([zone])
+    east_lat, east_lon = calculate_destination_point(-17.0, 179.95, 15.0, 90.0)
+    assert east_lon < 0  # wrapped
+    assert index.match(east_lat, east_lon) is zone
+    assert index.match_many([east_lat], [east_lon]).tolist() == [0]
+
+
+def test_zone_index_zone_near_pole():
+    zone = _zone("Pole", 89.95, 0.0, 20)
+    index = SensitiveZoneIndex([zone])
+    assert index.match(89.99, 170.0) is zone
+
+
+def test_zone_index_empty():
+    index = SensitiveZoneIndex([])
+    assert index.match(40.0, -75.0) is None
+    assert index.match_many([40.0, 41.0], [-75.0, -76.0]).tolist() == [-1, -1]
+
+
+def test_zone_index_match_many_agrees_with_linear_scan():
+    rng = random.Random(4)
+    zones = [
+        _zone(f"z{i}", rng.uniform(-60, 60), rng.uniform(-180, 180), rng.uniform(1, 200))
+        for i in range(50)
+    ]
+    # Sample points near zone centers so a good share of them hit something
+    lats, lons = [], []
+    for _ in range(2000):
+        zone = rng.choice(zones)
+        lat, lon = calculate_destination_point(
+            zone["lat"], zone["lon"], rng.uniform(0, zone["radius"] * 1.5), rng.uniform(0, 360)
+        )
+        lats.append(lat)
+        lons.append(lon)
+
+    index = SensitiveZoneIndex(zones)
+    expected = [_linear_scan(lat, lon, zones) for lat, lon in zip(lats, lons)]
+    assert index.match_many(lats, lons).tolist() == expected
+    assert [
+        zones.index(z) if (z := index.match(lat, lon)) is not None else -1
+        for lat, lon in zip(lats, lons)
+    ] == expected
+
+
+def test_zone_index_obfuscate_many():
+    zone = _zone("A", 40.0, -75.0, 5)
+    index = SensitiveZoneIndex([zone])
+    near = calculate_destination_point(40.0, -75.0, 1.0, 0.0)
+    far = calculate_destination_point(40.0, -75.0, 20.0, 90.0)
+
+    new_lats, new_lons, zone_ids = index.obfuscate_many([near[0], far[0]], [near[1], far[1]])
+
+    assert zone_ids.tolist() == [0, -1]
+    assert (new_lats[0], new_lons[0]) == compute_obfuscated_location(zone, *near)
+    assert (new_lats[1], new_lons[1]) == far
@@ -0,0 +1,77 @@
+import textwrap
+from pathlib import Path
+
+from lib.gpx_reader import iter_gpx
+
+GPX = textwrap.dedent("""\
+    <?xml version="1.0" encoding="UTF-8"?>
+    <gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">
+      <metadata><name>Test Trip</name></metadata>
+      <wpt lat="45.0" lon="-79.0">
+        <name>Place A</name>
+        <desc>First stop</desc>
+        <time>2024-10-01T12:00:00+00:00</time>
+      </wpt>
+      <wpt lat="46.0" lon="-80.0"></wpt>
+      <trk><name>Track</name>
+        <trkseg>
+          <trkpt lat="45.0" lon="-79.0"><time>2024-10-05T12:00:00+00:00</time></trkpt>
+          <trkpt lat="45.5" lon="-79.5"><extension><transport>bus</transport></extension></trkpt>
+        </trkseg>
+        <trkseg>
+          <trkpt lat="46.0" lon="-80.0"/>
+        </trkseg>
+      </trk>
+    </gpx>
+""")
+
+
+def write_gpx(tmp_path: Path) -> Path:
+    path = tmp_path / "test.gpx"
+    path.write_text(GPX, encoding="utf-8")
+    return path
+
+
+def test_records_in_document_order(tmp_path: Path) -> None:
+    kinds = [kind for kind, _ in iter_gpx(write_gpx(tmp_path))]
+    assert kinds == ["metadata", "wpt", "wpt", "trkpt", "trkpt", "trkseg_end", "trkpt", "trkseg_end"]
+
+
+def test_metadata_name(tmp_path: Path) -> None:
+    records = list(iter_gpx(write_gpx(tmp_path)))
+    assert records[0] == ("metadata", {"name": "Test Trip"})
+
+
+def test_waypoint_fields(tmp_path: Path) -> None:
+    wpts = [r for kind, r in iter_gpx(write_gpx(tmp_path)) if kind == "wpt"]
+    assert wpts[0] == {
+        "lat": 45.0,
+        "lon": -79.0,
+        "name": "Place A",
+        "desc": "First stop",
+        "time": "2024-10-01T12:00:00+00:00",
+    }
+    # Missing child elements come back as None
+    assert wpts[1] == {"lat": 46.0, "lon": -80.0, "name": None, "desc": None, "time": None}
+
+
+def test_track_point_fields(tmp_path: Path) -> None:
+    trkpts = [r for kind, r in iter_gpx(write_gpx(tmp_path)) if kind == "trkpt"]
+    assert trkpts[0] == {"lat": 45.0, "lon": -79.0, "time": "2024-10-05T12:00:00+00:00", "transport": None}
+    assert trkpts[1]["transport"] == "bus"
+    assert trkpts[2]["time"] is None
+
+
+def test_large_track_streams(tmp_path: Path) -> None:
+    # Enough points that the parser reads the file in several chunks
+    n = 50_000
+    trkpts = "".join(f'<trkpt lat="{i * 1e-4}" lon="0.0"/>' for i in range(n))
+    path = tmp_path / "big.gpx"
+    path.write_text(
+        '<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">'
+        f"<trk><trkseg>{trkpts}</trkseg></trk></gpx>",
+        encoding="utf-8",
+    )
+    lats = [r["lat"] for kind, r in iter_gpx(path) if kind == "trkpt"]
+    assert len(lats) == n
+    assert lats[-1] == (n - 1) * 1e-4
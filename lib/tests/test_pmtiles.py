@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from lib.pmtiles import (
+    HEADER_SIZE,
+    read_header,
+    read_metadata,
+    read_tile,
+    write_pmtiles,
+    zxy_to_tile_id,
+)
+
+
+def test_tile_ids_follow_hilbert_order():
+    assert zxy_to_tile_id(0, 0, 0) == 0
+    assert [zxy_to_tile_id(1, x, y) for x, y in [(0, 0), (0, 1), (1, 1), (1, 0)]] == [1, 2, 3, 4]
+    assert zxy_to_tile_id(2, 0, 0) == 5
+
+
+def test_tile_ids_are_unique_per_zoom():
+    ids = {zxy_to_tile_id(4, x, y) for x in range(16) for y in range(16)}
+    assert ids == set(range(zxy_to_tile_id(4, 0, 0), zxy_to_tile_id(4, 0, 0) + 256))
+
+
+def test_tile_id_out_of_range():
+    with pytest.raises(ValueError):
+        zxy_to_tile_id(1, 2, 0)
+
+
+def test_round_trip(tmp_path):
+    tiles = {(0, 0, 0): b"world", (1, 0, 0): b"nw", (1, 1, 1): b"se"}
+    path = tmp_path / "out.pmtiles"
+    size = write_pmtiles(path, tiles, {"name": "test"}, (-10.0, -5.0, 20.0, 15.0))
+
+    data = path.read_bytes()
+    assert len(data) == size
+    header = read_header(data)
+    assert header["root_offset"] == HEADER_SIZE
+    assert (header["min_zoom"], header["max_zoom"]) == (0, 1)
+    assert header["min_lon_e7"] == -100_000_000
+    assert read_metadata(data) == {"name": "test"}
+    for (z, x, y), content in tiles.items():
+        assert read_tile(data, z, x, y) == content
+    assert read_tile(data, 1, 0, 1) is None
+
+
+def test_identical_tiles_are_stored_once(tmp_path):
+    tiles = {(2, x, y): b"same" for x in range(4) for y in range(4)}
+    path = tmp_path / "out.pmtiles"
+    write_pmtiles(path, tiles, {}, (0.0, 0.0, 1.0, 1.0))
+
+    data = path.read_bytes()
+    header = read_header(data)
+    assert header["tile_contents"] == 1
+    assert header["tile_entries"] == 1  # one run covering all 16 tiles
+    assert header["data_length"] == 4
+    assert read_tile(data, 2, 3, 2) == b"same"
+
+
+def test_large_archive_uses_leaf_directories(tmp_path):
+    rng = random.Random(0)
+    tiles = {
+        (9, x, y): f"{x}/{y}".encode() * rng.randint(1, 50)
+        for x in range(512)
+        for y in range(512)
+        if rng.random() < 0.3
+    }
+    path = tmp_path / "out.pmtiles"
+    write_pmtiles(path, tiles, {}, (-180.0, -85.0, 180.0, 85.0))
+
+    data = path.read_bytes()
+    header = read_header(data)
+    assert header["leaf_length"] > 0
+    assert header["root_offset"] + header["root_length"] <= 16384
+    for (z, x, y), content in list(tiles.items())[::997]:
+        assert read_tile(data, z, x, y) == content
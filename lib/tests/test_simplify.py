@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from lib.simplify import douglas_peucker_mask, zoom_tolerance_m
+
+# ~1.1 m of latitude
+LAT_1M = 1e-5
+
+
+def test_collinear_points_are_removed():
+    lats = np.linspace(0.0, 0.01, 50)
+    lons = np.zeros(50)
+    mask = douglas_peucker_mask(lats, lons, tolerance_m=1.0)
+    assert mask.tolist() == [True] + [False] * 48 + [True]
+
+
+def test_endpoints_always_kept():
+    mask = douglas_peucker_mask([0.0, 0.0, 0.0], [0.0, 0.001, 0.002], tolerance_m=1e6)
+    assert mask[0] and mask[-1]
+
+
+def test_zero_tolerance_keeps_everything():
+    lats = np.linspace(0.0, 0.01, 10)
+    assert douglas_peucker_mask(lats, np.zeros(10), tolerance_m=0.0).all()
+
+
+def test_deviation_above_tolerance_is_kept():
+    # Middle point is ~11 m off the straight line
+    lats = [0.0, 10 * LAT_1M, 0.0]
+    lons = [0.0, 0.001, 0.002]
+    assert douglas_peucker_mask(lats, lons, tolerance_m=5.0).tolist() == [True, True, True]
+    assert douglas_peucker_mask(lats, lons, tolerance_m=20.0).tolist() == [True, False, True]
+
+
+def test_keep_points_survive_simplification():
+    lats = np.linspace(0.0, 0.01, 20)
+    lons = np.zeros(20)
+    keep = np.zeros(20, dtype=bool)
+    keep[7] = True
+    mask = douglas_peucker_mask(lats, lons, tolerance_m=1.0, keep=keep)
+    assert np.flatnonzero(mask).tolist() == [0, 7, 19]
+
+
+def test_out_and_back_is_not_collapsed():
+    # Turnaround point lies on the infinite line through the endpoints but far
+    # from the segment between them.
+    lats = [0.0, 0.0, 0.0]
+    lons = [0.0, 0.01, 0.001]
+    assert douglas_peucker_mask(lats, lons, tolerance_m=10.0)[1]
+
+
+def test_antimeridian_crossing_is_simplified_locally():
+    lons = [179.998, 179.999, -180.0, -179.999]
+    lats = [0.0, 0.0, 0.0, 0.0]
+    assert douglas_peucker_mask(lats, lons, tolerance_m=1.0).tolist() == [True, False, False, True]
+
+
+def test_zoom_tolerance_halves_per_level():
+    assert zoom_tolerance_m(0) == pytest.approx(156543.03392)
+    assert zoom_tolerance_m(11) == pytest.approx(zoom_tolerance_m(10) / 2)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from timezonefinder import TimezoneFinder
+
+from lib.timezones import TimezoneResolver, zone_info
+
+
+class CountingFinder:
+    """Zones split at longitude -79.5, counting lookups."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def timezone_at(self, lat: float, lng: float) -> str:
+        self.calls += 1
+        return "America/Toronto" if lng >= -79.5 else "America/Chicago"
+
+
+@pytest.fixture(scope="module")
+def finder():
+    return TimezoneFinder()
+
+
+def test_clustered_points_share_a_cell_lookup():
+    counting = CountingFinder()
+    resolver = TimezoneResolver(finder=counting)
+    rng = np.random.default_rng(0)
+    lats = 45.0 + rng.uniform(0.001, 0.009, 1000)
+    lons = -79.0 + rng.uniform(0.001, 0.009, 1000)
+
+    assert resolver.timezones(lats, lons) == ["America/Toronto"] * 1000
+    assert counting.calls == 5  # the cell's corners and center
+
+
+def test_border_cells_use_exact_lookups():
+    resolver = TimezoneResolver(finder=CountingFinder(), cell_degrees=1.0)
+    lats = [45.5, 45.5, 45.5]
+    lons = [-79.6, -79.4, -79.5]
+    assert resolver.timezones(lats, lons) == ["America/Chicago", "America/Toronto", "America/Toronto"]
+
+
+def test_missing_coordinates():
+    resolver = TimezoneResolver(finder=CountingFinder())
+    assert resolver.timezones([np.nan, 45.0], [-79.0, np.nan]) == [None, None]
+    assert resolver.timezones([], []) == []
+
+
+def test_matches_timezone_finder(finder):
+    # Around Lake Ontario / Lake Erie: Toronto, New York and Detroit zones meet
+    resolver = TimezoneResolver(finder=finder)
+    rng = np.random.default_rng(1)
+    lats = rng.uniform(41.5, 45.5, 3000)
+    lons = rng.uniform(-84.0, -74.0, 3000)
+    expected = [finder.timezone_at(lat=round(a, 5), lng=round(b, 5)) for a, b in zip(lats, lons)]
+    assert resolver.timezones(lats, lons) == expected
+
+
+def test_zone_info_is_cached():
+    assert zone_info("Europe/Paris") is zone_info("Europe/Paris")
+    assert zone_info("Not/AZone") is None
@@ -0,0 +1,163 @@
+import struct
+
+from lib.vector_tiles import BUFFER, EXTENT, build_tiles, feature_bounds, lonlat_to_world
+
+# --- Minimal MVT decoder, enough to check what build_tiles encodes ---
+
+
+def _varint(buf: bytes, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf: bytes):
+    pos = 0
+    while pos < len(buf):
+        key, pos = _varint(buf, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _varint(buf, pos)
+        elif wire_type == 1:
+            value, pos = buf[pos : pos + 8], pos + 8
+        else:
+            length, pos = _varint(buf, pos)
+            value, pos = buf[pos : pos + length], pos + length
+        yield number, value
+
+
+def _packed(buf: bytes) -> list[int]:
+    out, pos = [], 0
+    while pos < len(buf):
+        value, pos = _varint(buf, pos)
+        out.append(value)
+    return out
+
+
+def _unzigzag(v: int) -> int:
+    return (v >> 1) ^ -(v & 1)
+
+
+def _decode_value(buf: bytes):
+    for number, value in _fields(buf):
+        if number == 1:
+            return value.decode()
+        if number == 3:
+            return struct.unpack("<d", value)[0]
+        if number == 6:
+            return _unzigzag(value)
+        if number == 7:
+            return bool(value)
+
+
+def _decode_geometry(commands: list[int]) -> list[list[tuple[int, int]]]:
+    parts, x, y, i = [], 0, 0, 0
+    while i < len(commands):
+        cmd, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        for _ in range(count):
+            x += _unzigzag(commands[i])
+            y += _unzigzag(commands[i + 1])
+            i += 2
+            if cmd == 1:
+                parts.append([])
+            parts[-1].append((x, y))
+    return parts
+
+
+def decode_tile(data: bytes) -> dict[str, list[tuple[int, list, dict]]]:
+    layers = {}
+    for _, layer_buf in _fields(data):
+        name, keys, values, raw = None, [], [], []
+        for number, value in _fields(layer_buf):
+            if number == 1:
+                name = value.decode()
+            elif number == 2:
+                raw.append(value)
+            elif number == 3:
+                keys.append(value.decode())
+            elif number == 4:
+                values.append(_decode_value(value))
+            elif number == 5:
+                assert value == EXTENT
+        features = []
+        for feature_buf in raw:
+            fields = dict(_fields(feature_buf))
+            tags = _packed(fields[2])
+            props = {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2])}
+            features.append((fields[3], _decode_geometry(_packed(fields[4])), props))
+        layers[name] = features
+    return layers
+
+
+def point(lon, lat, **props):
+    return {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": props}
+
+
+def line(coords, **props):
+    return {"type": "Feature", "geometry": {"type": "LineString", "coordinates": coords}, "properties": props}
+
+
+# --- Tests ---
+
+
+def test_point_lands_in_its_tile_with_properties():
+    tiles = build_tiles({"obs": [point(10.0, 20.0, title="Bird", count=3, rare=True, score=0.5)]}, 2, 2)
+    assert list(tiles) == [(2, 2, 1)]
+    ((geom_type, parts, props),) = decode_tile(tiles[(2, 2, 1)])["obs"]
+    assert geom_type == 1
+    x, y = lonlat_to_world([10.0], [20.0], 2)
+    assert parts == [[(round((x[0] - 2) * EXTENT), round((y[0] - 1) * EXTENT))]]
+    assert props == {"title": "Bird", "count": 3, "rare": True, "score": 0.5}
+
+
+def test_null_properties_are_dropped():
+    tiles = build_tiles({"tracks": [line([[0, 0], [1, 1]], transport=None)]}, 0, 0)
+    ((_, _, props),) = decode_tile(tiles[(0, 0, 0)])["tracks"]
+    assert props == {}
+
+
+def test_list_and_object_properties_become_json_strings():
+    props = {"species": [{"common_name": "Mallard"}], "meta": {"a": 1}}
+    tiles = build_tiles({"ebird": [point(10.0, 20.0, **props)]}, 0, 0)
+    ((_, _, decoded),) = decode_tile(tiles[(0, 0, 0)])["ebird"]
+    assert decoded == {"species": '[{"common_name":"Mallard"}]', "meta": '{"a":1}'}
+
+
+def test_close_points_are_thinned_below_max_zoom():
+    features = [point(10.0, 20.0, n=1), point(10.00001, 20.0, n=2)]
+    low = build_tiles({"obs": features}, 3, 4)
+    assert len(decode_tile(low[(3, 4, 3)])["obs"]) == 1
+    assert len(decode_tile(low[(4, 8, 7)])["obs"]) == 2
+
+
+def test_line_is_clipped_to_tile_plus_buffer():
+    tiles = build_tiles({"tracks": [line([[-90.0, 0.0], [90.0, 0.0]])]}, 1, 1)
+    assert set(tiles) == {(1, 0, 0), (1, 1, 0), (1, 0, 1), (1, 1, 1)}
+    ((_, parts, _),) = decode_tile(tiles[(1, 0, 0)])["tracks"]
+    xs = [x for part in parts for x, _ in part]
+    assert min(xs) == EXTENT // 2 and max(xs) == EXTENT + BUFFER
+
+
+def test_antimeridian_crossing_wraps_instead_of_spanning_the_world():
+    tiles = build_tiles({"tracks": [line([[170.0, 10.0], [-170.0, 10.0]])]}, 2, 2)
+    # Only the edge tiles on either side, not every tile in between
+    assert sorted(tiles) == [(2, 0, 1), (2, 3, 1)]
+
+
+def test_lines_are_simplified_below_max_zoom():
+    coords = [[10.0 + i * 0.01, 0.0 + (i % 2) * 1e-6] for i in range(100)]
+    tiles = build_tiles({"tracks": [line(coords)]}, 6, 8)
+    ((_, parts, _),) = decode_tile(tiles[(6, 33, 31)])["tracks"]
+    assert sum(len(p) for p in parts) == 2
+
+
+def test_feature_bounds():
+    features = [point(10.0, 20.0), line([[-5.0, 1.0], [3.0, 40.0]])]
+    assert feature_bounds(features) == (-5.0, 1.0, 10.0, 40.0)
+    assert feature_bounds([]) is None
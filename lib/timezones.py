@@ -0,0 +1,104 @@
+"""
+Cached timezone lookups for arrays of coordinates.
+
+TimezoneFinder.timezone_at runs a point-in-polygon test on every call, and
+photos cluster heavily around the same few places. TimezoneResolver caches
+answers per grid cell: a cell whose corners and center all fall in the same
+zone is resolved once for every point inside it, while cells straddling a
+timezone border fall back to exact per-point lookups (themselves cached by
+rounded coordinate). ZoneInfo objects are cached by name.
+"""
+
+import math
+from functools import lru_cache
+
+import numpy as np
+from numpy.typing import ArrayLike
+from zoneinfo import ZoneInfo
+
+# Marks a grid cell that crosses a timezone border
+_BORDER = object()
+
+
+@lru_cache(maxsize=None)
+def zone_info(name: str) -> ZoneInfo | None:
+    """Cached ZoneInfo for an IANA name; None if the name is unknown."""
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        return None
+
+
+class TimezoneResolver:
+    """
+    IANA timezone name for (lat, lon) pairs.
+
+    cell_degrees is the size of the grid cells answers are cached for (0.01 is
+    ~1 km); points are rounded to exact_decimals places (5 is ~1 m) for the exact
+    lookups used in border cells.
+    """
+
+    def __init__(
+        self,
+        finder=None,
+        cell_degrees: float = 0.01,
+        exact_decimals: int = 5,
+    ) -> None:
+        self._finder = finder
+        self.cell_degrees = cell_degrees
+        self.exact_decimals = exact_decimals
+        self._cells: dict[tuple[int, int], object] = {}
+        self._exact: dict[tuple[float, float], str | None] = {}
+
+    @property
+    def finder(self):
+        # Loading the timezone polygons is slow; defer it until a lookup needs it
+        if self._finder is None:
+            from timezonefinder import TimezoneFinder
+
+            self._finder = TimezoneFinder()
+        return self._finder
+
+    def _exact_at(self, lat: float, lon: float) -> str | None:
+        key = (round(lat, self.exact_decimals), round(lon, self.exact_decimals))
+        if key not in self._exact:
+            self._exact[key] = self.finder.timezone_at(lat=key[0], lng=key[1])
+        return self._exact[key]
+
+    def _cell(self, row: int, col: int) -> object:
+        """The zone covering a whole grid cell, or _BORDER if it has more than one."""
+        if (row, col) not in self._cells:
+            size = self.cell_degrees
+            south, west = row * size, col * size
+            north, east = min(south + size, 90.0), min(west + size, 180.0)
+            samples = {
+                self._exact_at(lat, lon)
+                for lat, lon in (
+                    (south, west),
+                    (south, east),
+                    (north, west),
+                    (north, east),
+                    ((south + north) / 2, (west + east) / 2),
+                )
+            }
+            self._cells[row, col] = samples.pop() if len(samples) == 1 else _BORDER
+        return self._cells[row, col]
+
+    def timezones(self, lats: ArrayLike, lons: ArrayLike) -> list[str | None]:
+        """Timezone name for each (lat, lon) pair; None where there is none or a coordinate is NaN."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        rows = np.floor(lats / self.cell_degrees)
+        cols = np.floor(lons / self.cell_degrees)
+        out: list[str | None] = []
+        for lat, lon, row, col in zip(lats.tolist(), lons.tolist(), rows.tolist(), cols.tolist()):
+            if math.isnan(lat) or math.isnan(lon):
+                out.append(None)
+                continue
+            zone = self._cell(int(row), int(col))
+            out.append(self._exact_at(lat, lon) if zone is _BORDER else zone)
+        return out
+
+    def timezone_at(self, lat: float, lon: float) -> str | None:
+        """Single-point convenience wrapper."""
+        return self.timezones([lat], [lon])[0]
@@ -0,0 +1,327 @@
+"""
+Cut GeoJSON into Mapbox Vector Tiles (MVT 2.1), in pure Python.
+
+Point and LineString features (the only geometry types the map data uses) are
+projected to Web Mercator and cut into tiles for each zoom. Zooms below the
+maximum are thinned so that low-zoom tiles stay small:
+
+  - lines are simplified with Douglas-Peucker to about one screen pixel, and
+  - points collapse to the first point in each small pixel grid cell.
+
+Lines are clipped to each tile plus a small buffer so strokes join up across
+tile edges. A line crossing the antimeridian wraps into the tiles on the other
+side rather than drawing across the whole map.
+
+Spec: https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+
+import json
+import math
+import struct
+from collections import defaultdict
+from typing import Any
+
+import numpy as np
+
+from lib.simplify import douglas_peucker_mask, zoom_tolerance_m
+
+EXTENT = 4096
+BUFFER = 64  # in tile units (EXTENT), i.e. 4 px of a 256 px tile
+POINT_SPACING_PX = 4  # points closer than this (in 256 px tile pixels) are thinned below max zoom
+MAX_LAT = 85.0511287798
+
+_POINT, _LINESTRING = 1, 2
+
+Tile = tuple[int, int, int]
+
+
+# --- Projection ---
+
+
+def lonlat_to_world(lons: np.ndarray, lats: np.ndarray, z: int) -> tuple[np.ndarray, np.ndarray]:
+    """Web Mercator position in tile units at zoom z (tile x = floor(x), tile y = floor(y))."""
+    n = 1 << z
+    lat = np.radians(np.clip(lats, -MAX_LAT, MAX_LAT))
+    x = (np.asarray(lons, dtype=np.float64) + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * n
+    return x, y
+
+
+# --- Protobuf encoding ---
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number: int, wire_type: int) -> bytes:
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes_field(number: int, payload: bytes) -> bytes:
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values: list[int]) -> bytes:
+    return _bytes_field(number, b"".join(_varint(v) for v in values))
+
+
+def tile_property(value: Any) -> str | int | float | bool:
+    """
+    A GeoJSON property as an MVT value. MVT values are scalars only, so lists and
+    objects (e.g. eBird's checklists and species) become compact JSON strings.
+    """
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return value
+
+
+def _encode_value(value: Any) -> bytes:
+    """Encode a property value as an MVT Value message."""
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack("<d", value)
+    return _bytes_field(1, str(value).encode("utf-8"))
+
+
+def _geometry_commands(geom_type: int, parts: list[list[tuple[int, int]]]) -> list[int]:
+    commands: list[int] = []
+    cx = cy = 0
+    if geom_type == _POINT:
+        commands.append((1 & 0x7) | (len(parts) << 3))  # MoveTo, one per point
+    for part in parts:
+        for i, (x, y) in enumerate(part):
+            if geom_type == _LINESTRING and i == 0:
+                commands.append(1 | (1 << 3))  # MoveTo(1)
+            elif geom_type == _LINESTRING and i == 1:
+                commands.append(2 | ((len(part) - 1) << 3))  # LineTo(n - 1)
+            commands += [_zigzag(x - cx), _zigzag(y - cy)]
+            cx, cy = x, y
+    return commands
+
+
+def encode_layer(name: str, features: list[tuple[int, list, dict[str, Any]]]) -> bytes:
+    """
+    Encode one MVT Layer message.
+
+    features: [(geometry type, parts, properties)], where parts are lists of
+    integer tile coordinates (one single-point part per point).
+    """
+    keys: dict[str, int] = {}
+    values: dict[tuple[type, Any], int] = {}
+    body = bytearray()
+
+    for geom_type, parts, properties in features:
+        tags: list[int] = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            value = tile_property(value)
+            # Key on the type too, so 1, 1.0 and True stay distinct values
+            tags.append(values.setdefault((type(value), value), len(values)))
+        feature = (
+            _packed(2, tags)
+            + _field(3, 0) + _varint(geom_type)
+            + _packed(4, _geometry_commands(geom_type, parts))
+        )
+        body += _bytes_field(2, feature)
+
+    layer = _field(15, 0) + _varint(2) + _bytes_field(1, name.encode("utf-8")) + bytes(body)
+    layer += b"".join(_bytes_field(3, k.encode("utf-8")) for k in keys)
+    layer += b"".join(_bytes_field(4, _encode_value(v)) for _, v in values)
+    layer += _field(5, 0) + _varint(EXTENT)
+    return layer
+
+
+def encode_tile(layers: dict[str, list[tuple[int, list, dict[str, Any]]]]) -> bytes:
+    """Encode an MVT Tile message from {layer name: features} (see encode_layer)."""
+    return b"".join(
+        _bytes_field(3, encode_layer(name, features)) for name, features in layers.items() if features
+    )
+
+
+# --- Tiling ---
+
+
+def _clip_segment(
+    x0: float, y0: float, x1: float, y1: float, box: tuple[float, float, float, float]
+) -> tuple[float, float, float, float, bool, bool] | None:
+    """
+    Liang-Barsky clip of one segment to box (xmin, ymin, xmax, ymax).
+
+    Returns the clipped segment plus whether its start / end were cut, or None
+    if the segment misses the box.
+    """
+    xmin, ymin, xmax, ymax = box
+    dx, dy = x1 - x0, y1 - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - xmin), (dx, xmax - x0), (-dy, y0 - ymin), (dy, ymax - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            t0 = max(t0, t)
+        else:
+            t1 = min(t1, t)
+        if t0 > t1:
+            return None
+    return (x0 + t0 * dx, y0 + t0 * dy, x0 + t1 * dx, y0 + t1 * dy, t0 > 0, t1 < 1)
+
+
+def _segment_tiles(
+    x0: float, y0: float, x1: float, y1: float, buffer: float, n: int
+) -> list[tuple[int, int]]:
+    """(tx, ty) of every tile whose buffered box the segment may touch, column by column."""
+    tiles = []
+    lo_x, hi_x = min(x0, x1), max(x0, x1)
+    for tx in range(math.floor(lo_x - buffer), math.floor(hi_x + buffer) + 1):
+        if x0 == x1:
+            ya, yb = y0, y1
+        else:
+            # y at the ends of this column's x-range (clamped to the segment)
+            xa = min(max(tx - buffer, lo_x), hi_x)
+            xb = min(max(tx + 1 + buffer, lo_x), hi_x)
+            ya = y0 + (xa - x0) / (x1 - x0) * (y1 - y0)
+            yb = y0 + (xb - x0) / (x1 - x0) * (y1 - y0)
+        ty_lo = max(math.floor(min(ya, yb) - buffer), 0)
+        ty_hi = min(math.floor(max(ya, yb) + buffer), n - 1)
+        tiles.extend((tx, ty) for ty in range(ty_lo, ty_hi + 1))
+    return tiles
+
+
+def _quantize(points: list[tuple[float, float]], tx: int, ty: int) -> list[tuple[int, int]]:
+    out: list[tuple[int, int]] = []
+    for x, y in points:
+        q = (int(round((x - tx) * EXTENT)), int(round((y - ty) * EXTENT)))
+        if not out or out[-1] != q:
+            out.append(q)
+    return out
+
+
+def _tile_line(
+    lons: np.ndarray, lats: np.ndarray, z: int
+) -> dict[tuple[int, int], list[list[tuple[int, int]]]]:
+    """Cut one line into {(tx, ty): [part, ...]} at zoom z."""
+    n = 1 << z
+    # Unwrap so an antimeridian crossing stays a short segment; tiles past the
+    # edge of the world are wrapped back with tx % n below.
+    x, y = lonlat_to_world(np.unwrap(lons, period=360), lats, z)
+    buffer = BUFFER / EXTENT
+
+    segments_by_tile: dict[tuple[int, int], list[int]] = defaultdict(list)
+    for i in range(len(x) - 1):
+        for tile in _segment_tiles(x[i], y[i], x[i + 1], y[i + 1], buffer, n):
+            segments_by_tile[tile].append(i)
+
+    out: dict[tuple[int, int], list[list[tuple[int, int]]]] = defaultdict(list)
+    for (tx, ty), segments in segments_by_tile.items():
+        box = (tx - buffer, ty - buffer, tx + 1 + buffer, ty + 1 + buffer)
+        parts: list[list[tuple[float, float]]] = []
+        prev_i = None
+        for i in segments:
+            clipped = _clip_segment(x[i], y[i], x[i + 1], y[i + 1], box)
+            if clipped is None:
+                prev_i = None
+                continue
+            cx0, cy0, cx1, cy1, cut_start, cut_end = clipped
+            if prev_i != i - 1 or cut_start or not parts:
+                parts.append([(cx0, cy0)])
+            parts[-1].append((cx1, cy1))
+            prev_i = None if cut_end else i
+        for part in parts:
+            quantized = _quantize(part, tx, ty)
+            if len(quantized) >= 2:
+                out[(tx % n, ty)].append(quantized)
+    return out
+
+
+def tile_features(
+    features: list[dict[str, Any]], z: int, max_zoom: int
+) -> dict[tuple[int, int], list[tuple[int, list, dict[str, Any]]]]:
+    """
+    Cut GeoJSON Point / LineString features into {(x, y): layer features} for
+    zoom z, thinned unless z == max_zoom. Other geometry types are skipped.
+    """
+    n = 1 << z
+    out: dict[tuple[int, int], list[tuple[int, list, dict[str, Any]]]] = defaultdict(list)
+    seen_cells: set[tuple[int, int]] = set()
+    cell = POINT_SPACING_PX * EXTENT // 256
+
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        properties = feature.get("properties") or {}
+        coords = geometry.get("coordinates")
+
+        if geometry.get("type") == "Point":
+            (x,), (y,) = lonlat_to_world(np.array([coords[0]]), np.array([coords[1]]), z)
+            tx, ty = int(math.floor(x)) % n, min(int(math.floor(y)), n - 1)
+            px, py = _quantize([(x % n, y)], tx, ty)[0]
+            if z < max_zoom:
+                key = (int((x % n) * EXTENT) // cell, int(y * EXTENT) // cell)
+                if key in seen_cells:
+                    continue
+                seen_cells.add(key)
+            out[(tx, ty)].append((_POINT, [[(px, py)]], properties))
+
+        elif geometry.get("type") == "LineString" and len(coords) >= 2:
+            lons = np.array([c[0] for c in coords], dtype=np.float64)
+            lats = np.array([c[1] for c in coords], dtype=np.float64)
+            if z < max_zoom:
+                keep = douglas_peucker_mask(lats, lons, zoom_tolerance_m(z))
+                lons, lats = lons[keep], lats[keep]
+            for tile, parts in _tile_line(lons, lats, z).items():
+                out[tile].append((_LINESTRING, parts, properties))
+
+    return out
+
+
+def build_tiles(
+    layers: dict[str, list[dict[str, Any]]], min_zoom: int, max_zoom: int
+) -> dict[Tile, bytes]:
+    """Encode {layer name: GeoJSON features} into uncompressed MVT tiles for each zoom."""
+    tiles: dict[Tile, bytes] = {}
+    for z in range(min_zoom, max_zoom + 1):
+        per_tile: dict[tuple[int, int], dict[str, list]] = defaultdict(dict)
+        for name, features in layers.items():
+            for xy, tile_feats in tile_features(features, z, max_zoom).items():
+                per_tile[xy][name] = tile_feats
+        for (x, y), tile_layers in per_tile.items():
+            # Keep layer order stable (draw order is up to the style, but
+            # deterministic output is easier to diff)
+            ordered = {name: tile_layers[name] for name in layers if name in tile_layers}
+            tiles[(z, x, y)] = encode_tile(ordered)
+    return tiles
+
+
+def feature_bounds(features: list[dict[str, Any]]) -> tuple[float, float, float, float] | None:
+    """(min_lon, min_lat, max_lon, max_lat) over Point / LineString features; None if empty."""
+    lons: list[float] = []
+    lats: list[float] = []
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Point":
+            coords = [geometry["coordinates"]]
+        elif geometry.get("type") == "LineString":
+            coords = geometry["coordinates"]
+        else:
+            continue
+        lons.extend(c[0] for c in coords)
+        lats.extend(c[1] for c in coords)
+    if not lons:
+        return None
+    return min(lons), min(lats), max(lons), max(lats)
@@ -0,0 +1,182 @@
+import gzip
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+import click
+from dotenv import load_dotenv
+from lib.pmtiles import COMPRESSION_GZIP, write_pmtiles
+from lib.vector_tiles import build_tiles, feature_bounds, tile_property
+
+OBSERVATION_FILES = ("inaturalist.geojson", "ebird.geojson")
+OUTPUT_NAME = "travel-log.pmtiles"
+TRACKS_LAYER = "tracks"
+
+# trip.z5.geojson etc., written by process_gpx --zoom; the tiler does its own thinning
+_ZOOM_VARIANT = re.compile(r"\.z\d+\.geojson$")
+
+
+def _load_features(paths: list[str]) -> list[dict]:
+    features = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            features.extend(json.load(f)["features"])
+    return features
+
+
+def _field_type(value) -> str:
+    """TileJSON vector_layers field type of a GeoJSON property value."""
+    value = tile_property(value)
+    # bool is an int subclass, so check it first
+    if isinstance(value, bool):
+        return "Boolean"
+    if isinstance(value, (int, float)):
+        return "Number"
+    return "String"
+
+
+def default_inputs(data_dir: str) -> tuple[list[str], list[str]]:
+    """
+    (track files, observation files) found in data_dir: every process_gpx output,
+    plus the iNaturalist and eBird GeoJSON if present.
+    """
+    tracks = []
+    observations = []
+    for path in sorted(Path(data_dir).glob("*.geojson")):
+        if path.name in OBSERVATION_FILES:
+            observations.append(str(path))
+        elif not _ZOOM_VARIANT.search(path.name):
+            tracks.append(str(path))
+    return tracks, observations
+
+
+def build_archive(
+    output_file: str,
+    track_files: list[str],
+    observation_files: list[str],
+    min_zoom: int,
+    max_zoom: int,
+) -> int:
+    """
+    Tile tracks (one "tracks" layer) and observations (one layer per file, named
+    after it) into a PMTiles archive of gzipped MVT tiles. Returns the tile count.
+    """
+    layers = {}
+    if track_files:
+        layers[TRACKS_LAYER] = _load_features(track_files)
+    for path in observation_files:
+        layers[Path(path).name.removesuffix(".geojson")] = _load_features([path])
+
+    all_features = [f for features in layers.values() for f in features]
+    bounds = feature_bounds(all_features)
+    if bounds is None:
+        raise SystemExit("[ERROR] No Point or LineString features to tile")
+
+    for name, features in layers.items():
+        print(f"  Layer '{name}': {len(features)} features")
+
+    tiles = build_tiles(layers, min_zoom, max_zoom)
+    compressed = {
+        zxy: gzip.compress(data, compresslevel=9, mtime=0) for zxy, data in tiles.items()
+    }
+
+    metadata = {
+        "name": "travel-log",
+        "format": "pbf",
+        "vector_layers": [
+            {
+                "id": name,
+                # Lists and objects are stored as JSON strings (see tile_property)
+                "fields": {
+                    key: _field_type(value)
+                    for f in features
+                    for key, value in (f.get("properties") or {}).items()
+                    if value is not None
+                },
+                "minzoom": min_zoom,
+                "maxzoom": max_zoom,
+            }
+            for name, features in layers.items()
+        ],
+    }
+
+    size = write_pmtiles(
+        output_file, compressed, metadata, bounds, tile_compression=COMPRESSION_GZIP
+    )
+    print(f"Wrote {len(tiles)} tiles (zoom {min_zoom}-{max_zoom}) to {output_file}: {size:,} bytes")
+    return len(tiles)
+
+
+@click.command()
+@click.option(
+    "--tracks",
+    "track_files",
+    type=click.Path(exists=True, dir_okay=False, path_type=str),
+    multiple=True,
+    help="process_gpx GeoJSON to include in the tracks layer. Repeatable. Default: every trip GeoJSON in FINAL_DATA_DIR.",
+)
+@click.option(
+    "--observations",
+    "observation_files",
+    type=click.Path(exists=True, dir_okay=False, path_type=str),
+    multiple=True,
+    help="Observation GeoJSON to include, one layer per file. Repeatable. Default: inaturalist/ebird GeoJSON in FINAL_DATA_DIR.",
+)
+@click.option("--min-zoom", type=click.IntRange(0, 22), default=0, show_default=True)
+@click.option("--max-zoom", type=click.IntRange(0, 22), default=12, show_default=True)
+@click.option(
+    "--deploy-path",
+    type=click.Path(path_type=str),
+    default=None,
+    help='Folder to copy the archive to for deployment. Default: DEPLOY_TARGET/tiles. Pass "" to disable.',
+)
+def run(
+    track_files: tuple[str, ...],
+    observation_files: tuple[str, ...],
+    min_zoom: int,
+    max_zoom: int,
+    deploy_path: str | None,
+) -> None:
+    """
+    Build a single PMTiles archive of vector tiles from the map GeoJSON.
+
+    Combines the outputs of process_gpx, inaturalist_to_geojson and ebird_to_geojson
+    so the frontend only fetches the tiles in view instead of whole files. Lower zooms
+    are thinned (simplified tracks, de-cluttered points). Output is written to
+    FINAL_DATA_DIR/travel-log.pmtiles.
+    """
+    load_dotenv()
+
+    if min_zoom > max_zoom:
+        raise SystemExit("[ERROR] --min-zoom must not be greater than --max-zoom")
+
+    data_dir = os.getenv("FINAL_DATA_DIR")
+    output_file = os.path.join(data_dir, OUTPUT_NAME)
+    default_deploy_path = os.path.join(os.getenv("DEPLOY_TARGET"), "tiles")
+
+    if deploy_path is None:
+        deploy_path = default_deploy_path
+    elif deploy_path == "":
+        deploy_path = None
+
+    if deploy_path and not os.path.exists(deploy_path):
+        raise SystemExit(f"[ERROR] Deploy path not found: {deploy_path}")
+
+    if not track_files and not observation_files:
+        track_files, observation_files = default_inputs(data_dir)
+    print(f"Tiling {len(track_files)} track files and {len(observation_files)} observation files")
+
+    build_archive(output_file, list(track_files), list(observation_files), min_zoom, max_zoom)
+
+    if deploy_path:
+        try:
+            shutil.copy(output_file, deploy_path)
+            print(f"  [SUCCESS] Copied {output_file} -> {deploy_path}")
+        except Exception as e:
+            raise SystemExit(f"  [ERROR] Copy failed: {e}")
+
+
+if __name__ == "__main__":
+    run()
@@ -1,5 +1,4 @@
 import csv
-import json
 import os
 import shutil
 from collections import defaultdict
@@ -7,7 +6,9 @@ from typing import Any
 
 import click
 from dotenv import load_dotenv
-from lib.gps_utils import (compute_obfuscated_location, haversine_distance,
+from lib.geojson_writer import (OutputFormat, output_format_options,
+                                output_paths, size_report, write_geojson)
+from lib.gps_utils import (SensitiveZoneIndex, compute_obfuscated_location,
                            load_sensitive_zones)
 
 # Trip date range filter (inclusive)
@@ -26,12 +27,14 @@ def build_sensitive_zones(sensitive_zones: list[dict[str, Any]]) -> list[dict[st
 
 
 def apply_obfuscation(
-    lat: float, lon: float, zones: list[dict[str, Any]]
+    lat: float, lon: float, zones: SensitiveZoneIndex | list[dict[str, Any]]
 ) -> tuple[float, float]:
     """If (lat, lon) falls within any sensitive zone's radius, displace it by that zone's vector."""
-    for zone in zones:
-        if haversine_distance(lat, lon, zone["lat"], zone["lon"]) <= zone["radius"]:
-            return compute_obfuscated_location(zone, lat, lon)
+    if not isinstance(zones, SensitiveZoneIndex):
+        zones = SensitiveZoneIndex(zones)
+    zone = zones.match(lat, lon)
+    if zone is not None:
+        return compute_obfuscated_location(zone, lat, lon)
     return lat, lon
 
 
@@ -40,6 +43,7 @@ def convert_ebird_csv_to_geojson(
     output_geojson: str,
     sensitive_zones: list[dict[str, Any]] | None = None,
     exclude_merlin: bool = True,
+    fmt: OutputFormat = OutputFormat(),
 ) -> bool:
     """
     Converts an eBird MyEBirdData CSV export into a GeoJSON FeatureCollection.
@@ -53,6 +57,7 @@ def convert_ebird_csv_to_geojson(
         output_geojson: Path where the output GeoJSON file will be saved.
         sensitive_zones: Optional list of obfuscation zones.
         exclude_merlin: If True, filter out likely Merlin passive-detection checklists.
+        fmt: Output encoding (compact, coordinate precision, compressed sidecars).
     """
     print(f"Reading {input_csv}...")
 
@@ -128,11 +133,13 @@ def convert_ebird_csv_to_geojson(
     print(f"Filtering to date range {DATE_MIN} – {DATE_MAX}...")
     hotspots = {lid: hs for lid, hs in hotspots.items() if hs["checklists"]}
 
+    zone_index = SensitiveZoneIndex(sensitive_zones) if sensitive_zones else None
+
     features = []
     for location_id, hs in hotspots.items():
         lat, lon = hs["lat"], hs["lon"]
-        if sensitive_zones:
-            lat, lon = apply_obfuscation(lat, lon, sensitive_zones)
+        if zone_index:
+            lat, lon = apply_obfuscation(lat, lon, zone_index)
 
         checklists = sorted(
             [
@@ -178,10 +185,10 @@ def convert_ebird_csv_to_geojson(
 
     geojson_data = {"type": "FeatureCollection", "features": features}
 
-    with open(output_geojson, "w", encoding="utf-8") as f:
-        json.dump(geojson_data, f, indent=2)
+    written = write_geojson(output_geojson, geojson_data, fmt)
 
     print(f"Successfully wrote {len(features)} hotspot(s) to {output_geojson}")
+    print(f"  {size_report(geojson_data, written, fmt)}")
     return True
 
 
@@ -199,7 +206,15 @@ def convert_ebird_csv_to_geojson(
     default=False,
     help="Include likely Merlin passive-detection checklists (excluded by default).",
 )
-def run(input_csv: str, deploy_path: str | None, include_merlin: bool) -> None:
+@output_format_options
+def run(
+    input_csv: str,
+    deploy_path: str | None,
+    include_merlin: bool,
+    compact: bool,
+    precision: int | None,
+    compress: tuple[str, ...],
+) -> None:
     """
     Convert eBird MyEBirdData CSV export to a GeoJSON FeatureCollection for map view.
 
@@ -225,14 +240,18 @@ def run(input_csv: str, deploy_path: str | None, include_merlin: bool) -> None:
     print("Building sensitive zones for obfuscation...")
     sensitive_zones = build_sensitive_zones(load_sensitive_zones())
 
-    success = convert_ebird_csv_to_geojson(input_csv, output_file, sensitive_zones, exclude_merlin=not include_merlin)
+    fmt = OutputFormat(compact, precision, compress)
+    success = convert_ebird_csv_to_geojson(
+        input_csv, output_file, sensitive_zones, exclude_merlin=not include_merlin, fmt=fmt
+    )
 
     if success and deploy_path:
-        try:
-            shutil.copy(output_file, deploy_path)
-            print(f"  [SUCCESS] Copied {output_file} -> {deploy_path}")
-        except Exception as e:
-            raise SystemExit(f"  [ERROR] Copy failed: {e}")
+        for path in output_paths(output_file, fmt):
+            try:
+                shutil.copy(path, deploy_path)
+                print(f"  [SUCCESS] Copied {path} -> {deploy_path}")
+            except Exception as e:
+                raise SystemExit(f"  [ERROR] Copy failed: {e}")
 
 
 if __name__ == "__main__":
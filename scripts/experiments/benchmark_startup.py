@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Measure how long the embedding scripts take to import, i.e. the startup cost of
+a run that has nothing to embed.
+
+Each module is imported in a fresh interpreter, several times, and the best
+wall time is reported, next to a bare `import sentence_transformers` for
+reference. With --load-model the cost of loading the model and encoding one
+query is measured too.
+
+Usage:
+    python scripts/experiments/benchmark_startup.py
+    python scripts/experiments/benchmark_startup.py --repeat 5 --load-model
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import click
+
+MODULES = (
+    "db.populate_embeddings",
+    "embedding_service.main",
+    "scripts.experiments.search",
+)
+
+_LOAD_MODEL = (
+    "from lib.embedding_model import get_model; "
+    "get_model().encode('ancient temples and history')"
+)
+
+
+def _best_run_seconds(code: str, repeat: int) -> float:
+    # search.py needs PRIVATE_DATA_DIR at import; any value will do here
+    env = {"PRIVATE_DATA_DIR": "/tmp", **os.environ, "PYTHONPATH": os.getcwd()}
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", code],
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@click.command()
+@click.option("--repeat", type=click.IntRange(1), default=3, show_default=True)
+@click.option("--load-model", is_flag=True, help="Also time loading the model and one encode.")
+def run(repeat: int, load_model: bool) -> None:
+    """Report import (and optionally model load) time of the embedding scripts."""
+    cases = [("python (baseline)", "pass")]
+    cases += [(f"import {module}", f"import {module}") for module in MODULES]
+    cases.append(("import sentence_transformers", "import sentence_transformers"))
+    if load_model:
+        cases.append(("load model + encode", _LOAD_MODEL))
+
+    for label, code in cases:
+        print(f"{label:<40} {_best_run_seconds(code, repeat):7.2f}s")
+
+
+if __name__ == "__main__":
+    run()
@@ -4,7 +4,7 @@ from pathlib import Path
 
 import psycopg2
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+from lib.embedding_model import MODEL_NAME, get_model
 
 ### IN PROGRESS ###
 
@@ -13,8 +13,8 @@ load_dotenv()
 DB_CONFIG = os.getenv("DATABASE_CONFIG")
 PHOTOS_BASE_DIR = Path(os.getenv("PRIVATE_DATA_DIR")) / "photos"
 
-# Load the SAME model you used for populating
-model = SentenceTransformer("BAAI/bge-small-en-v1.5")
+# The SAME model you used for populating; loaded on the first query
+model = get_model(MODEL_NAME)
 
 
 def search_waypoints(query_text: str) -> None:
@@ -122,6 +122,9 @@ def search_photos(query_text: str) -> None:
 
 
 if __name__ == "__main__":
+    # Load the model while the first query connects to the database
+    model.warm_up()
+
     # Try different types of queries to test semantic understanding
     search_waypoints("ancient temples and history")
     search_waypoints("relaxing beaches with clear water")
@@ -6,7 +6,9 @@ from typing import Any
 
 import click
 from dotenv import load_dotenv
-from lib.gps_utils import (compute_obfuscated_location, haversine_distance,
+from lib.geojson_writer import (OutputFormat, output_format_options,
+                                output_paths, size_report, write_geojson)
+from lib.gps_utils import (SensitiveZoneIndex, compute_obfuscated_location,
                            load_sensitive_zones)
 
 # Trip date range filter (inclusive)
@@ -25,12 +27,14 @@ def build_sensitive_zones(sensitive_zones: list[dict[str, Any]]) -> list[dict[st
 
 
 def apply_obfuscation(
-    lat: float, lon: float, zones: list[dict[str, Any]]
+    lat: float, lon: float, zones: SensitiveZoneIndex | list[dict[str, Any]]
 ) -> tuple[float, float]:
     """If (lat, lon) falls within any sensitive zone's radius, displace it by that zone's vector."""
-    for zone in zones:
-        if haversine_distance(lat, lon, zone["lat"], zone["lon"]) <= zone["radius"]:
-            return compute_obfuscated_location(zone, lat, lon)
+    if not isinstance(zones, SensitiveZoneIndex):
+        zones = SensitiveZoneIndex(zones)
+    zone = zones.match(lat, lon)
+    if zone is not None:
+        return compute_obfuscated_location(zone, lat, lon)
     return lat, lon
 
 
@@ -39,6 +43,7 @@ def convert_inat_csv_to_geojson(
     output_geojson: str,
     taxa_json: str,
     sensitive_zones: list[dict[str, Any]] | None = None,
+    fmt: OutputFormat = OutputFormat(),
 ) -> bool:
     """
     Converts an iNaturalist CSV export into a GeoJSON FeatureCollection.
@@ -47,6 +52,8 @@ def convert_inat_csv_to_geojson(
         input_csv (str): Path to the input CSV file.
         output_geojson (str): Path where the output GeoJSON file will be saved.
         taxa_json (str): Path to the json file containing inaturalist taxon data
+        sensitive_zones (list): Optional list of obfuscation zones.
+        fmt (OutputFormat): Output encoding (compact, coordinate precision, compressed sidecars).
     """
 
     # Load taxa data for global observation count lookup
@@ -66,6 +73,7 @@ def convert_inat_csv_to_geojson(
         print(f"Warning: {taxa_json} not found. Global counts will be 0.")
 
     features = []
+    zone_index = SensitiveZoneIndex(sensitive_zones) if sensitive_zones else None
 
     print(f"Reading {input_csv}...")
 
@@ -89,8 +97,8 @@ def convert_inat_csv_to_geojson(
             if not (DATE_MIN <= date <= DATE_MAX):
                 continue
 
-            if sensitive_zones:
-                lat, lon = apply_obfuscation(lat, lon, sensitive_zones)
+            if zone_index:
+                lat, lon = apply_obfuscation(lat, lon, zone_index)
 
             # 2. Determine Title (Fallback Strategy)
             # Try Common Name -> Scientific Name -> Species Guess -> "Observation"
@@ -124,10 +132,10 @@ def convert_inat_csv_to_geojson(
     geojson_data = {"type": "FeatureCollection", "features": features}
 
     # 5. Write to File
-    with open(output_geojson, "w", encoding="utf-8") as f:
-        json.dump(geojson_data, f, indent=2)
+    written = write_geojson(output_geojson, geojson_data, fmt)
 
     print(f"Successfully wrote {len(features)} points to {output_geojson}")
+    print(f"  {size_report(geojson_data, written, fmt)}")
     return True
 
 
@@ -139,7 +147,14 @@ def convert_inat_csv_to_geojson(
     default=None,
     help='Folder to copy the output GeoJSON to for deployment. Default: FINAL_DATA_DIR/../DEPLOY_TARGET/observations. Pass "" to disable.',
 )
-def run(input_csv: str, deploy_path: str | None) -> None:
+@output_format_options
+def run(
+    input_csv: str,
+    deploy_path: str | None,
+    compact: bool,
+    precision: int | None,
+    compress: tuple[str, ...],
+) -> None:
     """
     Convert iNaturalist CSV export to a GeoJSON FeatureCollection for map view.
 
@@ -169,14 +184,18 @@ def run(input_csv: str, deploy_path: str | None) -> None:
     print("Building sensitive zones for obfuscation...")
     sensitive_zones = build_sensitive_zones(load_sensitive_zones())
 
-    success = convert_inat_csv_to_geojson(input_csv, output_file, taxa_json_file, sensitive_zones)
+    fmt = OutputFormat(compact, precision, compress)
+    success = convert_inat_csv_to_geojson(
+        input_csv, output_file, taxa_json_file, sensitive_zones, fmt
+    )
 
     if success and deploy_path:
-        try:
-            shutil.copy(output_file, deploy_path)
-            print(f"  [SUCCESS] Copied {output_file} -> {deploy_path}")
-        except Exception as e:
-            raise SystemExit(f"  [ERROR] Copy failed: {e}")
+        for path in output_paths(output_file, fmt):
+            try:
+                shutil.copy(path, deploy_path)
+                print(f"  [SUCCESS] Copied {path} -> {deploy_path}")
+            except Exception as e:
+                raise SystemExit(f"  [ERROR] Copy failed: {e}")
 
 
 if __name__ == "__main__":
@@ -1,10 +1,10 @@
 import json
 import os
-import xml.etree.ElementTree as ET
 from pathlib import Path
 
 import click
 from dotenv import load_dotenv
+from lib.gpx_reader import iter_gpx
 
 
 """
@@ -17,24 +17,18 @@ keeping the _general_ waypoint in each one
 
 
 def extract_waypoints_from_gpx(input_file: str | Path, output_file: str | Path) -> None:
-    # Parse the GPX file
-    tree = ET.parse(input_file)
-    root = tree.getroot()
-
-    # GPX files often use namespaces
-    namespaces = {"gpx": "http://www.topografix.com/GPX/1/1"}
-
     # Start with a placeholder _general_ waypoint
     waypoints_data = [{"name": "_general_", "time": "", "description": ""}]
 
-    # Find all waypoint (wpt) elements
-    for wpt in root.findall("gpx:wpt", namespaces):
-        name_elem = wpt.find("gpx:name", namespaces)
-        time_elem = wpt.find("gpx:time", namespaces)
+    # Stream waypoint (wpt) records; the track points are skipped without being
+    # held in memory.
+    for kind, record in iter_gpx(input_file):
+        if kind != "wpt":
+            continue
 
-        # Extract text if the elements exist
-        name = name_elem.text if name_elem is not None else "Unknown"
-        time = time_elem.text if time_elem is not None else "Unknown"
+        # Fill in placeholders if the elements don't exist
+        name = record["name"] if record["name"] is not None else "Unknown"
+        time = record["time"] if record["time"] is not None else "Unknown"
 
         waypoints_data.append({"name": name, "time": time, "description": ""})
 
@@ -1,191 +1,362 @@
-import json
+import contextlib
+import functools
+import io
 import os
 import shutil
+import tempfile
 import xml.etree.ElementTree as ET
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any
 
 import click
+import numpy as np
 from dotenv import load_dotenv
-from lib.gps_utils import (calculate_destination_point,
-                           compute_obfuscated_location, haversine_distance,
-                           load_sensitive_zones)
+from numpy.typing import ArrayLike
+from lib.gps_utils import (SensitiveZoneIndex, compute_obfuscated_location,
+                           haversine_distance, load_sensitive_zones,
+                           points_within_zone)
+from lib.geojson_writer import (OutputFormat, output_format_options,
+                                size_report, write_geojson)
+from lib.gpx_reader import NS, iter_gpx
+from lib.simplify import douglas_peucker_mask, zoom_tolerance_m
 
 # XML Namespace for GPX 1.1
-NS = {"gpx": "http://www.topografix.com/GPX/1/1"}
 ET.register_namespace("", NS["gpx"])
 
 
-def process_gpx(
-    input_file: str | Path, sensitive_zones: list[dict[str, Any]]
-) -> ET.Element:
-    print(f"Reading GPX: {input_file}")
-    tree = ET.parse(input_file)
-    root = tree.getroot()
+def ghost_zone_index(sensitive_zones: list[dict[str, Any]]) -> SensitiveZoneIndex:
+    """Index of the ghost zones (those without a waypoint name) in sensitive_zones."""
+    return SensitiveZoneIndex([z for z in sensitive_zones if "name" not in z])
 
-    # Sensitive zones come in two flavors:
-    # - Named zones: matched to <wpt> elements by name, so both the waypoint and
-    #   its corresponding track point get transformed to the obfuscated location.
-    # - Ghost zones: no corresponding waypoint — the track just passes through a
-    #   sensitive area. Track points inside the radius are deleted entirely.
-    named_zones = {z["name"]: z for z in sensitive_zones if "name" in z}
-    ghost_zones = [z for z in sensitive_zones if "name" not in z]
 
-    # --- Step 1: Process waypoints (<wpt>) ---
-    # Transform each named waypoint and record its original coordinates so we can
-    # find the corresponding track point later (the track still has the original coords).
-    waypoint_configs: dict[tuple[float, float], dict[str, Any]] = {}
-    updated_waypoint_coords: list[tuple[float, float]] = []
+def _exact_matches(
+    lats: np.ndarray, lons: np.ndarray, coords: set[tuple[float, float]]
+) -> np.ndarray:
+    """Indices of the points whose (lat, lon) is exactly one of coords."""
+    # Filter on latitude first so the tuple lookups only run on the few points
+    # that can match, not on every point of a long segment.
+    maybe = np.flatnonzero(np.isin(lats, [lat for lat, _ in coords]))
+    hits = [coord in coords for coord in zip(lats[maybe].tolist(), lons[maybe].tolist())]
+    return maybe[np.array(hits, dtype=bool)]
 
-    for wpt in root.findall("gpx:wpt", NS):
-        name_el = wpt.find("gpx:name", NS)
-        if name_el is None or name_el.text not in named_zones:
-            continue
 
-        zone = named_zones[name_el.text]
-        orig_lat = float(wpt.get("lat"))
-        orig_lon = float(wpt.get("lon"))
+class _TrackObfuscator:
+    """
+    Obfuscation state for one GPX file, shared by the in-memory (process_gpx) and
+    streaming (process_gpx_to_geojson) paths.
+
+    Sensitive zones come in two flavors:
+    - Named zones: matched to <wpt> elements by name, so both the waypoint and
+      its corresponding track point get transformed to the obfuscated location.
+    - Ghost zones: no corresponding waypoint — the track just passes through a
+      sensitive area. Track points inside the radius are deleted entirely.
+
+    Every waypoint must be added before the first segment is obfuscated.
+    """
+
+    def __init__(
+        self,
+        sensitive_zones: list[dict[str, Any]],
+        ghost_index: SensitiveZoneIndex | None = None,
+    ) -> None:
+        self.named_zones = {z["name"]: z for z in sensitive_zones if "name" in z}
+        self.ghost_zones = [z for z in sensitive_zones if "name" not in z]
+        # Same for every file, so callers converting many files pass one in (see ghost_zone_index)
+        self.ghost_index = ghost_index if ghost_index is not None else ghost_zone_index(sensitive_zones)
+
+        # Original coordinates of each transformed waypoint -> its zone, so we can
+        # find the corresponding track point later (the track still has the original coords).
+        self.waypoint_configs: dict[tuple[float, float], dict[str, Any]] = {}
+        self.updated_waypoint_coords: list[tuple[float, float]] = []
+        self.all_wpt_coords: set[tuple[float, float]] = set()
+        self.matched_waypoints: set[tuple[float, float]] = set()
+
+        self._named_index: SensitiveZoneIndex | None = None
+        self._protected_coords: set[tuple[float, float]] = set()
 
-        waypoint_configs[(orig_lat, orig_lon)] = zone
+    # --- Step 1: Process waypoints (<wpt>) ---
 
-        new_lat, new_lon = compute_obfuscated_location(zone, orig_lat, orig_lon)
-        wpt.set("lat", str(new_lat))
-        wpt.set("lon", str(new_lon))
-        updated_waypoint_coords.append((new_lat, new_lon))
+    def add_waypoint(
+        self, name: str | None, lat: float, lon: float
+    ) -> tuple[float, float] | None:
+        """Record a waypoint; returns its obfuscated coords if it's in a named zone, else None."""
+        if self._named_index is not None:
+            raise SystemExit(
+                f"[ERROR] Waypoint '{name}' appears after the track. "
+                "All <wpt> elements must come before <trk> (GPX 1.1 element order)."
+            )
+
+        if name not in self.named_zones:
+            self.all_wpt_coords.add((lat, lon))
+            return None
+
+        zone = self.named_zones[name]
+        self.waypoint_configs[(lat, lon)] = zone
+
+        new_lat, new_lon = compute_obfuscated_location(zone, lat, lon)
+        self.updated_waypoint_coords.append((new_lat, new_lon))
+        # Include pre-transformation coords too — the track still has them.
+        self.all_wpt_coords.update({(lat, lon), (new_lat, new_lon)})
         print(
-            f"  Obfuscated waypoint '{name_el.text}': "
-            f"({orig_lat}, {orig_lon}) -> ({new_lat}, {new_lon})"
+            f"  Obfuscated waypoint '{name}': "
+            f"({lat}, {lon}) -> ({new_lat}, {new_lon})"
         )
+        return new_lat, new_lon
 
     # --- Step 2: Process track ---
-    # For each sensitive waypoint we: (A) find its exact match in the track,
-    # delete nearby track points that reveal the real location, and move the
-    # match to the obfuscated coords. Then (B) scrub any ghost zones.
-    matched_waypoints: set[tuple[float, float]] = set()
 
-    for trk in root.findall("gpx:trk", NS):
-        for trkseg in trk.findall("gpx:trkseg", NS):
-            # Step 2A: Waypoint visits — one pass per transformed waypoint.
-            for (wpt_lat, wpt_lon), zone in waypoint_configs.items():
-                points = trkseg.findall("gpx:trkpt", NS)
-
-                # Our GPX data duplicates the <wpt> coordinates as a <trkpt>,
-                # so we can find the waypoint's position in the track by exact match.
-                matching_indices = [
-                    i
-                    for i, pt in enumerate(points)
-                    if float(pt.get("lat")) == wpt_lat
-                    and float(pt.get("lon")) == wpt_lon
-                ]
-
-                if len(matching_indices) > 1:
+    def obfuscate_segment(
+        self, lats: np.ndarray, lons: np.ndarray, transports: list[str | None]
+    ) -> tuple[np.ndarray, dict[int, tuple[float, float]]]:
+        """
+        Obfuscate one <trkseg>, given its point coordinates and transport modes.
+
+        For each sensitive waypoint we: (A) find its exact match in the track,
+        delete nearby track points that reveal the real location, and move the
+        match to the obfuscated coords. Then (B) scrub any ghost zones.
+
+        Zone membership is computed with vectorized lookups over the whole segment.
+        Returns (keep, relocations): a boolean mask of points to keep, and
+        {point index: (new_lat, new_lon)} for points to move. lats/lons are updated
+        in place with the relocations.
+        """
+        if self._named_index is None:
+            # Track points at a waypoint's coordinates (before or after transformation)
+            # are never deleted by a named zone — they're transformed in their own pass.
+            self._protected_coords = set(self.waypoint_configs) | set(self.updated_waypoint_coords)
+            self._named_index = SensitiveZoneIndex(
+                list({id(z): z for z in self.waypoint_configs.values()}.values())
+            )
+
+        keep = np.ones(len(lats), dtype=bool)
+
+        # Our GPX data duplicates the <wpt> coordinates as a <trkpt>, so we can
+        # find each waypoint's position in the track by exact match.
+        wpt_indices: dict[tuple[float, float], list[int]] = defaultdict(list)
+        protected = np.zeros(len(lats), dtype=bool)
+        for i in _exact_matches(lats, lons, self._protected_coords).tolist():
+            coord = (float(lats[i]), float(lons[i]))
+            if coord in self.waypoint_configs:
+                wpt_indices[coord].append(i)
+            protected[i] = True
+
+        # Points inside any named zone; each waypoint pass narrows these down
+        # to its own zone.
+        candidates = np.flatnonzero((self._named_index.match_many(lats, lons) >= 0) & ~protected)
+
+        # Step 2A: Waypoint visits — one pass per transformed waypoint.
+        relocations: dict[int, tuple[float, float]] = {}
+        for (wpt_lat, wpt_lon), zone in self.waypoint_configs.items():
+            matching_indices = wpt_indices.get((wpt_lat, wpt_lon), [])
+
+            if len(matching_indices) > 1:
+                raise SystemExit(
+                    f"[ERROR] Multiple track points match waypoint at "
+                    f"({wpt_lat}, {wpt_lon}). Found {len(matching_indices)} matches."
+                )
+
+            if not matching_indices:
+                continue
+
+            self.matched_waypoints.add((wpt_lat, wpt_lon))
+
+            # Delete every track point within the zone radius except the match.
+            # These are approach/departure points that would reveal the real location.
+            to_remove = candidates[points_within_zone(lats[candidates], lons[candidates], zone)]
+            for i in to_remove.tolist():
+                # Points already removed by an earlier pass were checked then.
+                if not keep[i]:
+                    continue
+                # If this error occurs with real-world data, we'll need to
+                # ensure that transport modes are correctly handled.
+                if transports[i] is not None:
                     raise SystemExit(
-                        f"[ERROR] Multiple track points match waypoint at "
-                        f"({wpt_lat}, {wpt_lon}). Found {len(matching_indices)} matches."
+                        f"[ERROR] Track point at ({float(lats[i])}, {float(lons[i])}) near "
+                        f"waypoint ({wpt_lat}, {wpt_lon}) has transport mode "
+                        f"'{transports[i]}'. Transforming points with "
+                        "transport modes is not yet supported."
                     )
+            keep[to_remove] = False
+
+            # Move the matching track point to the obfuscated location so the
+            # track connects to the transformed waypoint rather than the real one.
+            relocations[matching_indices[0]] = compute_obfuscated_location(zone, wpt_lat, wpt_lon)
+
+        for i, (new_lat, new_lon) in relocations.items():
+            lats[i], lons[i] = new_lat, new_lon
+
+        # Step 2B: Ghost zones — sensitive areas with no waypoint.
+        # Unlike named zones, there's no waypoint to relocate, so we simply
+        # delete every track point inside the radius. We need to guard against
+        # accidentally deleting a point that corresponds to a <wpt>, which
+        # would leave the waypoint dangling (not connected to the track).
+        kept = np.flatnonzero(keep)
+        ghost_hits = kept[self.ghost_index.match_many(lats[kept], lons[kept]) >= 0]
+        warnings: list[tuple[int, int, str]] = []
+        for i in ghost_hits.tolist():
+            pt_lat, pt_lon = float(lats[i]), float(lons[i])
+            if (pt_lat, pt_lon) not in self.all_wpt_coords:
+                keep[i] = False
+                continue
+            # TODO: change back to an error once input data is fixed.
+            for zone_idx, zone in enumerate(self.ghost_zones):
+                zone_lat, zone_lon = zone["lat"], zone["lon"]
+                if haversine_distance(zone_lat, zone_lon, pt_lat, pt_lon) <= zone["radius"]:
+                    warnings.append((
+                        zone_idx,
+                        i,
+                        f"[WARNING] Ghost zone at ({zone_lat}, {zone_lon}) "
+                        f"overlaps with waypoint at ({pt_lat}, {pt_lon}). "
+                        "A ghost zone overlapping with a waypoint will result "
+                        "in waypoints that are not connected to the track.",
+                    ))
+        for _, _, message in sorted(warnings):
+            print(message)
+
+        return keep, relocations
+
+    def check_all_matched(self) -> None:
+        """
+        Every transformed waypoint must have a corresponding track point — if one
+        is missing it means the obfuscated <wpt> has no anchor in the track, which
+        will produce a dangling waypoint on the map.
+        """
+        unmatched = set(self.waypoint_configs.keys()) - self.matched_waypoints
+        if unmatched:
+            coords = ", ".join(f"({lat}, {lon})" for lat, lon in unmatched)
+            raise SystemExit(
+                f"[ERROR] Transformed waypoint(s) have no matching track point: {coords}. "
+                "The obfuscated waypoint(s) will not be connected to the track."
+            )
 
-                if not matching_indices:
-                    continue
 
-                matched_waypoints.add((wpt_lat, wpt_lon))
+def process_gpx(
+    input_file: str | Path,
+    sensitive_zones: list[dict[str, Any]],
+    ghost_index: SensitiveZoneIndex | None = None,
+) -> ET.Element:
+    """
+    Obfuscate a GPX file in memory and return the modified root element.
 
-                match_idx = matching_indices[0]
-                zone_lat, zone_lon = zone["lat"], zone["lon"]
-                radius = zone["radius"]
-
-                # Delete every track point within the zone radius except the match.
-                # These are approach/departure points that would reveal the real location.
-                to_remove: list[int] = []
-
-                for i, pt in enumerate(points):
-                    if i == match_idx:
-                        continue
-                    pt_lat = float(pt.get("lat"))
-                    pt_lon = float(pt.get("lon"))
-                    # Don't delete track points that match other waypoints, whether they've been
-                    # transformed yet or not — they'll be transformed in their own pass.
-                    if (pt_lat, pt_lon) in waypoint_configs:
-                        continue
-                    if (pt_lat, pt_lon) in updated_waypoint_coords:
-                        continue
-                    if haversine_distance(zone_lat, zone_lon, pt_lat, pt_lon) <= radius:
-                        # If this error occurs with real-world data, we'll need to
-                        # ensure that transport modes are correctly handled.
-                        if _get_transport_mode(pt) is not None:
-                            raise SystemExit(
-                                f"[ERROR] Track point at ({pt_lat}, {pt_lon}) near "
-                                f"waypoint ({wpt_lat}, {wpt_lon}) has transport mode "
-                                f"'{_get_transport_mode(pt)}'. Transforming points with "
-                                "transport modes is not yet supported."
-                            )
-                        to_remove.append(i)
-
-                for i in sorted(to_remove, reverse=True):
-                    trkseg.remove(points[i])
-
-                # Move the matching track point to the obfuscated location so the
-                # track connects to the transformed waypoint rather than the real one.
-                points = trkseg.findall("gpx:trkpt", NS)
-                earlier_removals = sum(1 for i in to_remove if i < match_idx)
-                new_match_idx = match_idx - earlier_removals
-                match_pt = points[new_match_idx]
-                new_lat, new_lon = compute_obfuscated_location(
-                    zone, wpt_lat, wpt_lon
-                )
-                match_pt.set("lat", str(new_lat))
-                match_pt.set("lon", str(new_lon))
-
-            # Step 2B: Ghost zones — sensitive areas with no waypoint.
-            # Unlike named zones, there's no waypoint to relocate, so we simply
-            # delete every track point inside the radius. We need to guard against
-            # accidentally deleting a point that corresponds to a <wpt>, which
-            # would leave the waypoint dangling (not connected to the track).
-            all_wpt_coords: set[tuple[float, float]] = set()
-            for wpt in root.findall("gpx:wpt", NS):
-                all_wpt_coords.add((float(wpt.get("lat")), float(wpt.get("lon"))))
-            # Include pre-transformation coords too — a waypoint that wasn't in a
-            # named zone still has its original coords in the track.
-            all_wpt_coords.update(waypoint_configs.keys())
-
-            for zone in ghost_zones:
-                zone_lat, zone_lon = zone["lat"], zone["lon"]
-                radius = zone["radius"]
-
-                points = trkseg.findall("gpx:trkpt", NS)
-                to_remove_els: list[ET.Element] = []
-
-                for pt in points:
-                    pt_lat = float(pt.get("lat"))
-                    pt_lon = float(pt.get("lon"))
-                    if haversine_distance(zone_lat, zone_lon, pt_lat, pt_lon) <= radius:
-                        if (pt_lat, pt_lon) in all_wpt_coords:
-                            # TODO: change back to an error once input data is fixed.
-                            print(
-                                f"[WARNING] Ghost zone at ({zone_lat}, {zone_lon}) "
-                                f"overlaps with waypoint at ({pt_lat}, {pt_lon}). "
-                                "A ghost zone overlapping with a waypoint will result "
-                                "in waypoints that are not connected to the track."
-                            )
-                            continue
-                        to_remove_els.append(pt)
-
-                for pt in to_remove_els:
-                    trkseg.remove(pt)
-
-    # Every transformed waypoint must have a corresponding track point — if one
-    # is missing it means the obfuscated <wpt> has no anchor in the track, which
-    # will produce a dangling waypoint on the map.
-    unmatched = set(waypoint_configs.keys()) - matched_waypoints
-    if unmatched:
-        coords = ", ".join(f"({lat}, {lon})" for lat, lon in unmatched)
-        raise SystemExit(
-            f"[ERROR] Transformed waypoint(s) have no matching track point: {coords}. "
-            "The obfuscated waypoint(s) will not be connected to the track."
+    Loads the whole document; see process_gpx_to_geojson for the streaming version
+    used by the CLI.
+    """
+    print(f"Reading GPX: {input_file}")
+    tree = ET.parse(input_file)
+    root = tree.getroot()
+
+    obfuscator = _TrackObfuscator(sensitive_zones, ghost_index)
+
+    for wpt in root.findall("gpx:wpt", NS):
+        name_el = wpt.find("gpx:name", NS)
+        new_coords = obfuscator.add_waypoint(
+            name_el.text if name_el is not None else None,
+            float(wpt.get("lat")),
+            float(wpt.get("lon")),
         )
+        if new_coords is not None:
+            wpt.set("lat", str(new_coords[0]))
+            wpt.set("lon", str(new_coords[1]))
+
+    for trk in root.findall("gpx:trk", NS):
+        for trkseg in trk.findall("gpx:trkseg", NS):
+            points = trkseg.findall("gpx:trkpt", NS)
+            if not points:
+                continue
+
+            keep, relocations = obfuscator.obfuscate_segment(
+                np.array([float(pt.get("lat")) for pt in points]),
+                np.array([float(pt.get("lon")) for pt in points]),
+                [_get_transport_mode(pt) for pt in points],
+            )
+
+            # Rebuild the segment once with all removals and relocations applied.
+            for i, (new_lat, new_lon) in relocations.items():
+                points[i].set("lat", str(new_lat))
+                points[i].set("lon", str(new_lon))
+            removed = {id(points[i]) for i in np.flatnonzero(~keep).tolist()}
+            if removed:
+                trkseg[:] = [child for child in trkseg if id(child) not in removed]
+
+    obfuscator.check_all_matched()
 
     return root
 
 
+def process_gpx_to_geojson(
+    input_file: str | Path,
+    sensitive_zones: list[dict[str, Any]],
+    tolerance_m: float = 0.0,
+    ghost_index: SensitiveZoneIndex | None = None,
+) -> dict:
+    """
+    Streaming equivalent of gpx_to_geojson(process_gpx(input_file, sensitive_zones)).
+
+    Reads the file with iter_gpx, so the document tree is never built. Memory still
+    grows with the output features and with the longest <trkseg>: obfuscation needs
+    a whole segment at once (a waypoint match anywhere in it decides which zone
+    points are deleted), so its coordinates are buffered as float arrays, about 16
+    bytes per point. Requires GPX 1.1 element order (all <wpt> before <trk>). A tolerance_m > 0 simplifies each transport run (see
+    _transport_features).
+    """
+    return process_gpx_to_geojson_variants(
+        input_file, sensitive_zones, {"": tolerance_m}, ghost_index
+    )[""]
+
+
+def process_gpx_to_geojson_variants(
+    input_file: str | Path,
+    sensitive_zones: list[dict[str, Any]],
+    tolerances_m: dict[str, float],
+    ghost_index: SensitiveZoneIndex | None = None,
+) -> dict[str, dict]:
+    """
+    Like process_gpx_to_geojson, but builds one FeatureCollection per entry in
+    tolerances_m ({variant name: tolerance in meters}) from a single read of the file.
+    ghost_index, if given, is ghost_zone_index(sensitive_zones) built once for many files.
+    """
+    print(f"Reading GPX: {input_file}")
+    obfuscator = _TrackObfuscator(sensitive_zones, ghost_index)
+
+    features: dict[str, list[dict]] = {name: [] for name in tolerances_m}
+    lats, lons = array("d"), array("d")
+    transports: list[str | None] = []
+
+    for kind, record in iter_gpx(input_file):
+        if kind == "wpt":
+            obfuscator.add_waypoint(record["name"], record["lat"], record["lon"])
+        elif kind == "trkpt":
+            lats.append(record["lat"])
+            lons.append(record["lon"])
+            transports.append(record["transport"])
+        elif kind == "trkseg_end" and lats:
+            lat_arr, lon_arr = np.frombuffer(lats), np.frombuffer(lons)
+            keep, _ = obfuscator.obfuscate_segment(lat_arr, lon_arr, transports)
+            kept = np.flatnonzero(keep)
+            seg_lats, seg_lons = lat_arr[kept], lon_arr[kept]
+            seg_modes = [transports[i] for i in kept.tolist()]
+            del lat_arr, lon_arr
+            lats, lons, transports = array("d"), array("d"), []
+            # Track points sitting on a (public) waypoint must survive simplification
+            # so the waypoint stays connected to the track.
+            anchors = np.zeros(len(seg_lats), dtype=bool)
+            anchors[_exact_matches(seg_lats, seg_lons, obfuscator.all_wpt_coords)] = True
+            for name, tolerance_m in tolerances_m.items():
+                features[name].extend(
+                    _transport_features(seg_lats, seg_lons, seg_modes, anchors, tolerance_m)
+                )
+
+    obfuscator.check_all_matched()
+
+    return {
+        name: {"type": "FeatureCollection", "features": feats}
+        for name, feats in features.items()
+    }
+
+
 def _get_transport_mode(trkpt: ET.Element) -> str | None:
     """Extract transport mode from <extension><transport>, or None if absent."""
     ext = trkpt.find("gpx:extension/gpx:transport", NS)
@@ -194,6 +365,52 @@ def _get_transport_mode(trkpt: ET.Element) -> str | None:
     return None
 
 
+def _transport_features(
+    lats: ArrayLike,
+    lons: ArrayLike,
+    modes: list[str | None],
+    anchors: ArrayLike | None = None,
+    tolerance_m: float = 0.0,
+) -> list[dict]:
+    """
+    Split one segment's points into LineString features by transport mode (see
+    gpx_to_geojson).
+
+    With tolerance_m > 0 each run is simplified with Douglas-Peucker. Run boundary
+    points (shared between adjacent runs) and points flagged in `anchors` are kept.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    n = len(lats)
+    anchors = np.zeros(n, dtype=bool) if anchors is None else np.asarray(anchors, dtype=bool)
+
+    # A run starts at the first point and at every change of transport mode.
+    starts = [0] + [i for i in range(1, n) if modes[i] != modes[i - 1]] if n else []
+
+    features = []
+    for start, next_start in zip(starts, starts[1:] + [n - 1]):
+        # The transport tag is on the departure point, so each run ends on the
+        # first point of the next one, which is shared as the start of that run.
+        run = slice(start, next_start + 1)
+        if next_start + 1 - start < 2:
+            continue
+        run_lats, run_lons = lats[run], lons[run]
+        if tolerance_m > 0:
+            keep = douglas_peucker_mask(run_lats, run_lons, tolerance_m, anchors[run])
+            run_lats, run_lons = run_lats[keep], run_lons[keep]
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": np.column_stack((run_lons, run_lats)).tolist(),
+                },
+                "properties": {"transport": modes[start]},
+            }
+        )
+    return features
+
+
 def gpx_to_geojson(root: ET.Element) -> dict:
     """
     Convert a GPX track to a GeoJSON FeatureCollection segmented by transport mode.
@@ -210,48 +427,100 @@ def gpx_to_geojson(root: ET.Element) -> dict:
     for trk in root.findall("gpx:trk", NS):
         for trkseg in trk.findall("gpx:trkseg", NS):
             points = trkseg.findall("gpx:trkpt", NS)
-            if not points:
-                continue
-
-            runs: list[tuple[str | None, list[list[float]]]] = []
-            current_mode: str | None = None
-            current_coords: list[list[float]] = []
-
-            for pt in points:
-                lat = float(pt.get("lat"))
-                lon = float(pt.get("lon"))
-                mode = _get_transport_mode(pt)  # None if no transport tag
-
-                if mode != current_mode:
-                    if current_coords:
-                        # The transport tag is on the departure point, so include
-                        # this point in the closing segment, then share it as the
-                        # start of the new segment.
-                        current_coords.append([lon, lat])
-                        runs.append((current_mode, current_coords))
-                        current_coords = [[lon, lat]]
-                    else:
-                        current_coords = [[lon, lat]]
-                    current_mode = mode
-                else:
-                    current_coords.append([lon, lat])
-
-            if current_coords:
-                runs.append((current_mode, current_coords))
-
-            for mode, coords in runs:
-                if len(coords) >= 2:
-                    features.append(
-                        {
-                            "type": "Feature",
-                            "geometry": {"type": "LineString", "coordinates": coords},
-                            "properties": {"transport": mode},
-                        }
-                    )
+            features.extend(
+                _transport_features(
+                    [float(pt.get("lat")) for pt in points],
+                    [float(pt.get("lon")) for pt in points],
+                    [_get_transport_mode(pt) for pt in points],  # None if no transport tag
+                )
+            )
 
     return {"type": "FeatureCollection", "features": features}
 
 
+def _copy_atomic(src: str | Path, dest_dir: str | Path) -> None:
+    """shutil.copy into dest_dir, via a temp file + rename."""
+    dest = Path(dest_dir) / Path(src).name
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=f".{dest.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        # Like shutil.copy: the copy gets src's permissions, not mkstemp's 0600
+        shutil.copymode(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# Sensitive zones (and their ghost zone index) for the current process, set once
+# per pool worker by _init_worker rather than pickled or rebuilt with every task.
+_worker_zones: list[dict[str, Any]] = []
+_worker_ghost_index: SensitiveZoneIndex | None = None
+
+
+def _init_worker(sensitive_zones: list[dict[str, Any]]) -> None:
+    global _worker_zones, _worker_ghost_index
+    _worker_zones = sensitive_zones
+    _worker_ghost_index = ghost_zone_index(sensitive_zones)
+
+
+def _zoom_output_path(geojson_output: str, zoom: int) -> str:
+    """trip.geojson -> trip.z5.geojson"""
+    path = Path(geojson_output)
+    return str(path.with_name(f"{path.stem}.z{zoom}{path.suffix}"))
+
+
+def _point_count(geojson: dict) -> int:
+    return sum(len(f["geometry"]["coordinates"]) for f in geojson["features"])
+
+
+def _convert_file(
+    gpx_path: str,
+    geojson_output: str,
+    fmt: OutputFormat,
+    simplify_m: float = 0.0,
+    zooms: tuple[int, ...] = (),
+) -> tuple[str, list[str], int | None, str | None]:
+    """
+    Convert one GPX file to GeoJSON, capturing everything it prints.
+
+    Writes geojson_output (simplified to simplify_m meters if > 0) plus one
+    pre-simplified variant per zoom level (see _zoom_output_path).
+
+    Returns (log, written paths, feature_count, error). On failure feature_count is
+    None and error holds the SystemExit (or other exception's) message.
+    """
+    variants = {geojson_output: simplify_m}
+    for zoom in zooms:
+        variants[_zoom_output_path(geojson_output, zoom)] = zoom_tolerance_m(zoom)
+
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        print(f"Processing file {gpx_path}")
+        try:
+            geojsons = process_gpx_to_geojson_variants(
+                gpx_path, _worker_zones, variants, _worker_ghost_index
+            )
+            written = {
+                path: write_geojson(path, geojson, fmt) for path, geojson in geojsons.items()
+            }
+        except SystemExit as e:
+            return log.getvalue(), [], None, str(e)
+        except Exception as e:
+            # e.g. a ParseError from a malformed file: fail this file, not the whole run
+            return log.getvalue(), [], None, f"[ERROR] {type(e).__name__}: {e}"
+        for path, geojson in geojsons.items():
+            n_points = _point_count(geojson)
+            print(
+                f"  - GeoJSON saved to: {path} "
+                f"({len(geojson['features'])} features, {n_points} points)"
+            )
+            print(f"    {size_report(geojson, written[path], fmt)}")
+    n_features = len(geojsons[geojson_output]["features"])
+    return log.getvalue(), [p for w in written.values() for p, _ in w], n_features, None
+
+
 @click.command()
 @click.argument(
     "input_gpx",
@@ -263,13 +532,47 @@ def gpx_to_geojson(root: ET.Element) -> dict:
     default=None,
     help='Folder to copy output files to for deployment. Default: DEPLOY_TARGET/gpx. Pass "" to disable.',
 )
-def run(input_gpx: str, deploy_path: str | None) -> None:
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Number of files to process in parallel. 0 uses one worker per CPU.",
+)
+@click.option(
+    "--simplify",
+    "simplify_m",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    help="Simplify the main output's tracks to this tolerance in meters. Default: no simplification.",
+)
+@click.option(
+    "--zoom",
+    "zooms",
+    type=click.IntRange(0, 24),
+    multiple=True,
+    help="Also write a track simplified for this web-map zoom level (trip.z<ZOOM>.geojson). Repeatable.",
+)
+@output_format_options
+def run(
+    input_gpx: str,
+    deploy_path: str | None,
+    jobs: int,
+    simplify_m: float,
+    zooms: tuple[int, ...],
+    compact: bool,
+    precision: int | None,
+    compress: tuple[str, ...],
+) -> None:
     """
     Obfuscate sensitive waypoints in a GPX file and generate a transport-segmented GeoJSON.
 
     Obfuscates coordinates in memory (no GPX file written) and outputs a .geojson file where
     the track is split into LineString features by transport mode. Input can be a single GPX
-    file or a directory (processes all *.gpx files). Output is written to FINAL_DATA_DIR.
+    file or a directory (processes all *.gpx files, optionally in parallel with --jobs).
+    Output is written to FINAL_DATA_DIR. --simplify and --zoom reduce track point counts for
+    the map while keeping transport-mode boundaries and waypoint locations on the line.
 
     INPUT_GPX: Path to the input GPX file or directory containing *.gpx files.
     """
@@ -290,29 +593,59 @@ def run(input_gpx: str, deploy_path: str | None) -> None:
     print(f"Loaded {len(sensitive_zones)} sensitive zones")
 
     if os.path.isdir(input_gpx):
-        inputs = list(Path(input_gpx).glob("*.gpx"))
+        inputs = sorted(str(p) for p in Path(input_gpx).glob("*.gpx"))
         print(f"{inputs}")
     else:
         inputs = [input_gpx]
-
-    for gpx_path in inputs:
-        print(f"Processing file {gpx_path}")
-        stem = Path(gpx_path).stem
-        geojson_output = os.path.join(default_output_path, stem + ".geojson")
-
-        root = process_gpx(gpx_path, sensitive_zones)
-
-        geojson = gpx_to_geojson(root)
-        with open(geojson_output, "w", encoding="utf-8") as f:
-            json.dump(geojson, f, indent=2)
-        print(f"  - GeoJSON saved to: {geojson_output} ({len(geojson['features'])} features)")
-
-        if deploy_path:
-            try:
-                shutil.copy(geojson_output, deploy_path)
-                print(f"  [SUCCESS] Copied {geojson_output} -> {deploy_path}")
-            except Exception as e:
-                raise SystemExit(f"  [ERROR] Copy failed: {e}")
+    outputs = [
+        os.path.join(default_output_path, Path(gpx_path).stem + ".geojson") for gpx_path in inputs
+    ]
+    convert = functools.partial(
+        _convert_file,
+        fmt=OutputFormat(compact, precision, compress),
+        simplify_m=simplify_m,
+        zooms=tuple(dict.fromkeys(zooms)),
+    )
+
+    jobs = min(jobs or os.cpu_count() or 1, len(inputs)) or 1
+    if jobs == 1:
+        _init_worker(sensitive_zones)
+        results = map(convert, inputs, outputs)
+        executor = None
+    else:
+        print(f"Processing {len(inputs)} files with {jobs} workers")
+        executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(sensitive_zones,)
+        )
+        results = executor.map(convert, inputs, outputs)
+
+    # Results come back in input order, so logs print in the same order whether or
+    # not files were processed in parallel.
+    summary: list[tuple[str, int | None, str | None]] = []
+    try:
+        for gpx_path, (log, written, n_features, error) in zip(inputs, results):
+            print(log, end="")
+            if error is None and deploy_path:
+                try:
+                    for path in written:
+                        _copy_atomic(path, deploy_path)
+                        print(f"  [SUCCESS] Copied {path} -> {deploy_path}")
+                except Exception as e:
+                    error = f"  [ERROR] Copy failed: {e}"
+            summary.append((gpx_path, n_features, error))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    failures = [(path, error) for path, _, error in summary if error is not None]
+    if len(inputs) > 1:
+        print(f"\nSummary: {len(inputs) - len(failures)}/{len(inputs)} files converted")
+        for path, n_features, error in summary:
+            status = f"{n_features} features" if error is None else "FAILED"
+            print(f"  {Path(path).name}: {status}")
+
+    if failures:
+        raise SystemExit("\n".join(f"{error} ({path})" for path, error in failures))
 
 
 if __name__ == "__main__":
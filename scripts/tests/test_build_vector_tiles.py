@@ -0,0 +1,104 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from lib.pmtiles import read_metadata, read_tile
+from scripts.build_vector_tiles import default_inputs, run
+
+
+def write_geojson(path: Path, features: list[dict]) -> None:
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+
+
+TRACK = {
+    "type": "Feature",
+    "geometry": {"type": "LineString", "coordinates": [[10.0, 20.0], [11.0, 21.0]]},
+    "properties": {"transport": "bus"},
+}
+OBSERVATION = {
+    "type": "Feature",
+    "geometry": {"type": "Point", "coordinates": [10.5, 20.5]},
+    "properties": {"title": "Bird", "global_count": 12},
+}
+
+
+# Shaped like ebird_to_geojson output: list-of-object properties
+EBIRD_HOTSPOT = {
+    "type": "Feature",
+    "geometry": {"type": "Point", "coordinates": [10.6, 20.6]},
+    "properties": {
+        "title": "Marsh",
+        "checklists": [{"id": "S1", "date": "2024-07-01", "duration_min": None}],
+        "species": [{"common_name": "Mallard", "scientific_name": "Anas platyrhynchos"}],
+        "species_count": 1,
+    },
+}
+
+
+def test_default_inputs_skip_zoom_variants(tmp_path: Path):
+    for name in ("trip.geojson", "trip.z5.geojson", "ebird.geojson", "inaturalist.geojson"):
+        write_geojson(tmp_path / name, [])
+    tracks, observations = default_inputs(str(tmp_path))
+    assert [Path(p).name for p in tracks] == ["trip.geojson"]
+    assert [Path(p).name for p in observations] == ["ebird.geojson", "inaturalist.geojson"]
+
+
+def test_run_builds_archive(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    final, deploy = tmp_path / "final", tmp_path / "tiles"
+    final.mkdir()
+    deploy.mkdir()
+    write_geojson(final / "trip.geojson", [TRACK])
+    write_geojson(final / "ebird.geojson", [OBSERVATION])
+    monkeypatch.setenv("FINAL_DATA_DIR", str(final))
+    monkeypatch.setenv("DEPLOY_TARGET", str(tmp_path))
+
+    result = CliRunner().invoke(run, ["--max-zoom", "4"])
+    assert result.exit_code == 0, result.output
+
+    data = (final / "travel-log.pmtiles").read_bytes()
+    assert (deploy / "travel-log.pmtiles").read_bytes() == data
+    layers = {layer["id"]: layer for layer in read_metadata(data)["vector_layers"]}
+    assert layers["tracks"]["fields"] == {"transport": "String"}
+    assert layers["ebird"]["fields"] == {"title": "String", "global_count": "Number"}
+    tile = gzip.decompress(read_tile(data, 0, 0, 0))
+    assert b"tracks" in tile and b"ebird" in tile
+
+
+def test_list_properties_are_tiled_as_json(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    final = tmp_path / "final"
+    final.mkdir()
+    write_geojson(final / "ebird.geojson", [EBIRD_HOTSPOT])
+    monkeypatch.setenv("FINAL_DATA_DIR", str(final))
+    monkeypatch.setenv("DEPLOY_TARGET", str(tmp_path))
+
+    result = CliRunner().invoke(run, ["--max-zoom", "2", "--deploy-path", ""])
+    assert result.exit_code == 0, result.output
+
+    data = (final / "travel-log.pmtiles").read_bytes()
+    (layer,) = read_metadata(data)["vector_layers"]
+    assert layer["fields"] == {
+        "title": "String",
+        "checklists": "String",
+        "species": "String",
+        "species_count": "Number",
+    }
+    tile = gzip.decompress(read_tile(data, 0, 0, 0))
+    species = json.dumps(EBIRD_HOTSPOT["properties"]["species"], separators=(",", ":"))
+    assert species.encode() in tile
+
+
+def test_bool_properties_are_boolean_fields(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    final = tmp_path / "final"
+    final.mkdir()
+    observation = {**OBSERVATION, "properties": {"title": "Bird", "captive": False, "accuracy": 4.5}}
+    write_geojson(final / "inaturalist.geojson", [observation])
+    monkeypatch.setenv("FINAL_DATA_DIR", str(final))
+    monkeypatch.setenv("DEPLOY_TARGET", str(tmp_path))
+
+    result = CliRunner().invoke(run, ["--max-zoom", "2", "--deploy-path", ""])
+    assert result.exit_code == 0, result.output
+
+    (layer,) = read_metadata((final / "travel-log.pmtiles").read_bytes())["vector_layers"]
+    assert layer["fields"] == {"title": "String", "captive": "Boolean", "accuracy": "Number"}
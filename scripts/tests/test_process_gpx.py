@@ -1,10 +1,12 @@
+import json
 import tempfile
 import xml.etree.ElementTree as ET
 from pathlib import Path
 
 import pytest
+from click.testing import CliRunner
 from lib.gps_utils import calculate_destination_point, haversine_distance
-from scripts.process_gpx import gpx_to_geojson, process_gpx
+from scripts.process_gpx import gpx_to_geojson, process_gpx, process_gpx_to_geojson, run
 
 NS = {"gpx": "http://www.topografix.com/GPX/1/1"}
 
@@ -372,6 +374,216 @@ def test_multi_visit_obfuscated_point_not_deleted_by_second_pass():
     assert obf2 in trkpts, "visit 2's obfuscated track point is missing"
 
 
+# --- process_gpx_to_geojson (streaming) ---
+
+
+def test_streaming_matches_in_memory_pipeline():
+    far_lat, far_lon = calculate_destination_point(ZONE_LAT, ZONE_LON, 10.0, 270)
+    ghost_lat, ghost_lon = calculate_destination_point(ZONE_LAT, ZONE_LON, 20.0, 180)
+    ghost = {**GHOST_ZONE, "lat": ghost_lat, "lon": ghost_lon}
+    gpx = make_gpx(
+        waypoints=[{"lat": WPT_LAT, "lon": WPT_LON, "name": "Test Location"}],
+        track_points=[
+            {"lat": far_lat, "lon": far_lon, "transport": "bus"},
+            {"lat": INSIDE_LAT, "lon": INSIDE_LON},
+            {"lat": WPT_LAT, "lon": WPT_LON},
+            {"lat": OUTSIDE_LAT, "lon": OUTSIDE_LON, "transport": "train"},
+            {"lat": ghost_lat, "lon": ghost_lon, "transport": "train"},
+            {"lat": far_lat, "lon": far_lon},
+        ],
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "input.gpx"
+        input_path.write_text(gpx, encoding="utf-8")
+        expected = gpx_to_geojson(process_gpx(str(input_path), [NAMED_ZONE, ghost]))
+        streamed = process_gpx_to_geojson(str(input_path), [NAMED_ZONE, ghost])
+    assert streamed == expected
+    assert len(streamed["features"]) > 0
+
+
+def test_streaming_errors_on_waypoint_after_track():
+    gpx = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">\n'
+        f'  <trk><trkseg><trkpt lat="{WPT_LAT}" lon="{WPT_LON}"/></trkseg></trk>\n'
+        f'  <wpt lat="{WPT_LAT}" lon="{WPT_LON}"><name>Test Location</name></wpt>\n'
+        "</gpx>"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "input.gpx"
+        input_path.write_text(gpx, encoding="utf-8")
+        with pytest.raises(SystemExit, match="appears after the track"):
+            process_gpx_to_geojson(str(input_path), [NAMED_ZONE])
+
+
+def test_streaming_long_single_segment(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # One <trkseg> of a few hundred thousand points, running north through the ghost zone
+    n = 300_000
+    start_lat = ZONE_LAT - 1.5
+    input_path = tmp_path / "long.gpx"
+    with input_path.open("w", encoding="utf-8") as f:
+        f.write('<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>\n')
+        for i in range(n):
+            f.write(f'<trkpt lat="{start_lat + i * 1e-5:.5f}" lon="{ZONE_LON}"/>\n')
+        f.write("</trkseg></trk></gpx>\n")
+
+    # Watch the parser's <trkseg> element: it must only ever hold the points parsed
+    # from the current read block, never the whole segment
+    iterparse = ET.iterparse
+    most_children = 0
+
+    def watched_iterparse(source, events):
+        nonlocal most_children
+        trkseg = None
+        for event, elem in iterparse(source, events):
+            if event == "start" and elem.tag == f"{{{NS['gpx']}}}trkseg":
+                trkseg = elem
+            if trkseg is not None:
+                most_children = max(most_children, len(trkseg))
+            yield event, elem
+
+    monkeypatch.setattr(ET, "iterparse", watched_iterparse)
+    geojson = process_gpx_to_geojson(str(input_path), [GHOST_ZONE])
+
+    assert 0 < most_children < 1000
+    [feature] = geojson["features"]
+    coords = feature["geometry"]["coordinates"]
+    assert coords[0] == [ZONE_LON, start_lat]
+    assert coords[-1] == [ZONE_LON, round(start_lat + (n - 1) * 1e-5, 5)]
+    # About 1800 points (2 km of track at ~1.1 m spacing) fall inside the ghost zone
+    assert n - 2000 < len(coords) < n - 1600
+    assert all(haversine_distance(ZONE_LAT, ZONE_LON, lat, lon) > RADIUS for lon, lat in coords)
+
+
+# --- run (CLI) ---
+
+
+def _run_cli(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, jobs: int) -> tuple[str, dict[str, str]]:
+    """Convert three GPX files with the CLI; returns (stdout, {output filename: content})."""
+    private, final, deploy, gpx_dir = (tmp_path / d for d in ("private", "final", "deploy", "gpx"))
+    for d in (private, final, deploy, gpx_dir):
+        d.mkdir(parents=True)
+    (private / "sensitive_locations.json").write_text(json.dumps([NAMED_ZONE]))
+    monkeypatch.setenv("PRIVATE_DATA_DIR", str(private))
+    monkeypatch.setenv("FINAL_DATA_DIR", str(final))
+    monkeypatch.setenv("DEPLOY_TARGET", str(tmp_path))
+
+    for name in ("a", "b", "c"):
+        (gpx_dir / f"{name}.gpx").write_text(
+            make_gpx(
+                waypoints=[{"lat": WPT_LAT, "lon": WPT_LON, "name": "Test Location"}],
+                track_points=[
+                    {"lat": OUTSIDE_LAT, "lon": OUTSIDE_LON, "transport": name},
+                    {"lat": WPT_LAT, "lon": WPT_LON},
+                    {"lat": OUTSIDE_LAT, "lon": OUTSIDE_LON},
+                ],
+            ),
+            encoding="utf-8",
+        )
+
+    result = CliRunner().invoke(
+        run, [str(gpx_dir), "--deploy-path", str(deploy), "--jobs", str(jobs)]
+    )
+    assert result.exit_code == 0, result.output
+    outputs = {p.name: p.read_text() for p in sorted(final.iterdir())}
+    assert outputs == {p.name: p.read_text() for p in sorted(deploy.iterdir())}
+    # Deployed copies keep the source's permissions rather than mkstemp's 0600
+    for p in deploy.iterdir():
+        assert p.stat().st_mode == (final / p.name).stat().st_mode
+    return result.output, outputs
+
+
+def test_run_parallel_matches_sequential(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    sequential_log, sequential = _run_cli(tmp_path / "seq", monkeypatch, jobs=1)
+    parallel_log, parallel = _run_cli(tmp_path / "par", monkeypatch, jobs=2)
+
+    assert list(sequential) == ["a.geojson", "b.geojson", "c.geojson"]
+    assert parallel == sequential
+    # Per-file logs come out in input order
+    order = [parallel_log.index(f"{name}.gpx\n") for name in ("a", "b", "c")]
+    assert order == sorted(order)
+    assert "Summary: 3/3 files converted" in sequential_log
+    assert "Summary: 3/3 files converted" in parallel_log
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_continues_past_a_malformed_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, jobs: int
+):
+    final, gpx_dir = tmp_path / "final", tmp_path / "gpx"
+    for d in (final, gpx_dir):
+        d.mkdir()
+    monkeypatch.setenv("PRIVATE_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("FINAL_DATA_DIR", str(final))
+    monkeypatch.setenv("DEPLOY_TARGET", str(tmp_path))
+    (tmp_path / "sensitive_locations.json").write_text("[]")
+    (gpx_dir / "a.gpx").write_text("<gpx><trk>", encoding="utf-8")
+    (gpx_dir / "b.gpx").write_text(
+        make_gpx([], [{"lat": OUTSIDE_LAT, "lon": OUTSIDE_LON, "transport": "bus"}]),
+        encoding="utf-8",
+    )
+
+    result = CliRunner().invoke(
+        run, [str(gpx_dir), "--deploy-path", "", "--jobs", str(jobs)]
+    )
+    assert result.exit_code != 0
+    assert "Summary: 1/2 files converted" in result.output
+    assert "ParseError" in str(result.exception)
+    assert [p.name for p in final.iterdir()] == ["b.geojson"]
+
+
+def test_simplification_keeps_run_boundaries_and_waypoints(tmp_path: Path):
+    # A straight line north: every interior point is redundant except the mode
+    # change and the (public) waypoint the track passes through.
+    track = [
+        {"lat": 1.0 + i * 0.001, "lon": 10.0, "transport": "bus" if i < 12 else "train"}
+        for i in range(20)
+    ]
+    gpx_path = tmp_path / "trip.gpx"
+    gpx_path.write_text(
+        make_gpx(waypoints=[{"lat": 1.005, "lon": 10.0, "name": ""}], track_points=track),
+        encoding="utf-8",
+    )
+
+    full = process_gpx_to_geojson(gpx_path, [])
+    simplified = process_gpx_to_geojson(gpx_path, [], tolerance_m=10.0)
+
+    assert [f["properties"] for f in simplified["features"]] == [
+        f["properties"] for f in full["features"]
+    ]
+    bus, train = (f["geometry"]["coordinates"] for f in simplified["features"])
+    assert bus == [[10.0, 1.0], [10.0, 1.005], [10.0, 1.012]]
+    assert train == [[10.0, 1.012], [10.0, 1.019]]
+
+
+def test_run_writes_zoom_variants(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    final, deploy, gpx_dir = (tmp_path / d for d in ("final", "deploy", "gpx"))
+    for d in (final, deploy, gpx_dir):
+        d.mkdir()
+    (tmp_path / "sensitive_locations.json").write_text("[]")
+    monkeypatch.setenv("PRIVATE_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("FINAL_DATA_DIR", str(final))
+    monkeypatch.setenv("DEPLOY_TARGET", str(tmp_path))
+    track = [{"lat": 1.0 + i * 0.01, "lon": 10.0 + 0.001 * (i % 2)} for i in range(50)]
+    (gpx_dir / "trip.gpx").write_text(make_gpx([], track), encoding="utf-8")
+
+    result = CliRunner().invoke(
+        run,
+        [str(gpx_dir / "trip.gpx"), "--deploy-path", str(deploy), "--zoom", "5", "--zoom", "14"],
+    )
+    assert result.exit_code == 0, result.output
+
+    names = sorted(p.name for p in final.iterdir())
+    assert names == ["trip.geojson", "trip.z14.geojson", "trip.z5.geojson"]
+    assert names == sorted(p.name for p in deploy.iterdir())
+    counts = {
+        name: len(json.loads((final / name).read_text())["features"][0]["geometry"]["coordinates"])
+        for name in names
+    }
+    assert counts["trip.geojson"] == counts["trip.z14.geojson"] == 50
+    assert counts["trip.z5.geojson"] == 2
+
+
 # --- gpx_to_geojson ---
 
 